@@ -12,6 +12,7 @@ from rlcard.utils import (
     get_device,
     set_seed,
     tournament,
+    RolloutPool,
 )
 
 def load_model(model_path, env=None, position=None, device=None):
@@ -50,7 +51,11 @@ def evaluate(args):
     env.set_agents(agents)
 
     # Evaluate
-    rewards = tournament(env, args.num_games)
+    if args.num_workers > 1:
+        with RolloutPool(args.env, agents, args.num_workers, seed=args.seed) as pool:
+            rewards = pool.tournament(args.num_games)
+    else:
+        rewards = tournament(env, args.num_games)
     for position, reward in enumerate(rewards):
         print(position, args.models[position], reward)
 
@@ -94,6 +99,11 @@ if __name__ == '__main__':
         type=int,
         default=10000,
     )
+    parser.add_argument(
+        '--num_workers',
+        type=int,
+        default=1,
+    )
 
     args = parser.parse_args()
 
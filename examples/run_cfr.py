@@ -6,6 +6,8 @@ import argparse
 import rlcard
 from rlcard.agents import (
     CFRAgent,
+    MCCFRAgent,
+    ParallelCFRAgent,
     RandomAgent,
 )
 from rlcard.utils import (
@@ -35,13 +37,34 @@ def train(args):
     set_seed(args.seed)
 
     # Initilize CFR Agent
-    agent = CFRAgent(
-        env,
-        os.path.join(
-            args.log_dir,
-            'cfr_model',
-        ),
-    )
+    if args.num_workers > 0:
+        agent = ParallelCFRAgent(
+            env,
+            os.path.join(
+                args.log_dir,
+                'cfr_model',
+            ),
+            variant=args.variant,
+            num_workers=args.num_workers,
+        )
+    elif args.sampling == 'chance':
+        agent = CFRAgent(
+            env,
+            os.path.join(
+                args.log_dir,
+                'cfr_model',
+            ),
+            variant=args.variant,
+        )
+    else:
+        agent = MCCFRAgent(
+            env,
+            os.path.join(
+                args.log_dir,
+                'cfr_model',
+            ),
+            sampling=args.sampling,
+        )
     agent.load()  # If we have saved model, we first load the model
 
     # Evaluate CFR against random
@@ -54,7 +77,10 @@ def train(args):
     with Logger(args.log_dir) as logger:
         for episode in range(args.num_episodes):
             agent.train()
-            print('\rIteration {}'.format(episode), end='')
+            if args.sampling == 'chance':
+                print('\rIteration {}'.format(episode), end='')
+            else:
+                print('\rIteration {}, {:.1f} iterations/sec'.format(episode, agent.iterations_per_second), end='')
             # Evaluate the performance. Play with Random agents.
             if episode % args.evaluate_every == 0:
                 agent.save() # Save model
@@ -78,6 +104,33 @@ if __name__ == '__main__':
         type=int,
         default=42,
     )
+    parser.add_argument(
+        '--sampling',
+        type=str,
+        default='chance',
+        choices=[
+            'chance',
+            'external',
+            'outcome',
+        ],
+    )
+    parser.add_argument(
+        '--variant',
+        type=str,
+        default='vanilla',
+        choices=[
+            'vanilla',
+            'cfr+',
+            'linear',
+            'dcfr',
+        ],
+    )
+    parser.add_argument(
+        '--num_workers',
+        type=int,
+        default=0,
+        help='Traverse all the deals of each iteration in this many processes',
+    )
     parser.add_argument(
         '--num_episodes',
         type=int,
@@ -100,6 +153,10 @@ if __name__ == '__main__':
     )
 
     args = parser.parse_args()
+    if args.sampling != 'chance' and args.variant != 'vanilla':
+        parser.error('--variant is only supported with --sampling chance')
+    if args.sampling != 'chance' and args.num_workers > 0:
+        parser.error('--num_workers is only supported with --sampling chance')
 
     train(args)
     
@@ -23,6 +23,9 @@ def train(args):
         save_interval=args.save_interval,
         num_actor_devices=args.num_actor_devices,
         num_actors=args.num_actors,
+        num_envs_per_actor=args.num_envs_per_actor,
+        inference_server=args.inference_server,
+        sync_interval=args.sync_interval,
         training_device=args.training_device,
     )
 
@@ -84,6 +87,23 @@ if __name__ == '__main__':
         type=int,
         help='The number of actors for each simulation device',
     )
+    parser.add_argument(
+        '--num_envs_per_actor',
+        default=1,
+        type=int,
+        help='The number of environments run in lockstep by each actor',
+    )
+    parser.add_argument(
+        '--inference_server',
+        action='store_true',
+        help='Evaluate the decisions of the actors of each device in one inference server. Meant for GPUs with many actors; slower on CPU',
+    )
+    parser.add_argument(
+        '--sync_interval',
+        default=1,
+        type=int,
+        help='The number of learner steps between two broadcasts of the weights to the actors',
+    )
     parser.add_argument(
         '--training_device',
         default="0",
@@ -12,6 +12,7 @@ from rlcard.utils import (
     set_seed,
     tournament,
     reorganize,
+    reorganize_arrays,
     Logger,
     plot_curve,
 )
@@ -40,6 +41,8 @@ def train(args):
             state_shape=env.state_shape[0],
             mlp_layers=[64,64],
             device=device,
+            prioritized_replay=args.prioritized_replay,
+            n_step=args.n_step,
         )
     elif args.algorithm == 'nfsp':
         from rlcard.agents import NFSPAgent
@@ -48,6 +51,7 @@ def train(args):
             state_shape=env.state_shape[0],
             hidden_layers_sizes=[64,64],
             q_mlp_layers=[64,64],
+            q_n_step=args.n_step,
             device=device,
         )
     agents = [agent]
@@ -65,14 +69,18 @@ def train(args):
             # Generate data from the environment
             trajectories, payoffs = env.run(is_training=True)
 
-            # Reorganaize the data to be state, action, reward, next_state, done
-            trajectories = reorganize(trajectories, payoffs)
-
             # Feed transitions into agent memory, and train the agent
             # Here, we assume that DQN always plays the first position
             # and the other players play randomly (if any)
-            for ts in trajectories[0]:
-                agent.feed(ts)
+            if args.n_step == 1:
+                # Reorganaize the data to be state, action, reward, next_state, done
+                trajectories = reorganize(trajectories, payoffs)
+                for ts in trajectories[0]:
+                    agent.feed(ts)
+            else:
+                # The n-step returns are computed over the arrays of the whole episode
+                transitions = reorganize_arrays(trajectories, payoffs, env.num_actions)
+                agent.feed_many(transitions[0])
 
             # Evaluate the performance. Play with random agents.
             if episode % args.evaluate_every == 0:
@@ -122,6 +130,17 @@ if __name__ == '__main__':
             'nfsp',
         ],
     )
+    parser.add_argument(
+        '--prioritized_replay',
+        action='store_true',
+        help='Use prioritized experience replay in DQN',
+    )
+    parser.add_argument(
+        '--n_step',
+        type=int,
+        default=1,
+        help='The number of steps of the returns',
+    )
     parser.add_argument(
         '--cuda',
         type=str,
@@ -1,34 +1,71 @@
 import numpy as np
-import collections
 
 import os
 import pickle
 
 from rlcard.utils.utils import *
+from rlcard.agents.cfr_table import CFRTable, TableRows
+
+VARIANTS = ['vanilla', 'cfr+', 'linear', 'dcfr']
 
 class CFRAgent():
-    ''' Implement CFR (chance sampling) algorithm
+    ''' Implement CFR (chance sampling) algorithm, and the CFR+,
+        Linear CFR and Discounted CFR (DCFR) variants
     '''
 
-    def __init__(self, env, model_path='./cfr_model'):
+    def __init__(self, env, model_path='./cfr_model', variant='vanilla', alpha=1.5, beta=0., gamma=2.):
         ''' Initilize Agent
 
         Args:
             env (Env): Env class
+            model_path (str): The path to save and load the model
+            variant (str): The CFR variant. 'vanilla' is CFR with linear averaging;
+              'cfr+' floors the regrets at zero and alternates the updates of the players;
+              'linear' weights the regrets and the average policy of iteration t by t;
+              'dcfr' discounts the positive regrets by t^alpha/(t^alpha+1), the negative
+              regrets by t^beta/(t^beta+1) and the average policy by (t/(t+1))^gamma.
+            alpha (float): The discount exponent of positive regrets in DCFR
+            beta (float): The discount exponent of negative regrets in DCFR
+            gamma (float): The discount exponent of the average policy in DCFR
         '''
+        if variant not in VARIANTS:
+            raise ValueError("'variant' should be one of {}.".format(VARIANTS))
         self.use_raw = False
         self.env = env
         self.model_path = model_path
+        self.variant = variant
 
-        # A policy is a dict state_str -> action probabilities
-        self.policy = collections.defaultdict(list)
-        self.average_policy = collections.defaultdict(np.array)
+        # Linear CFR is DCFR with alpha = beta = gamma = 1
+        if variant == 'linear':
+            alpha, beta, gamma = 1., 1., 1.
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
 
-        # Regret is a dict state_str -> action regrets
-        self.regrets = collections.defaultdict(np.array)
+        # The regrets and policies of all the information sets, indexed by state_str
+        self.table = CFRTable(self.env.num_actions)
 
         self.iteration = 0
 
+    @property
+    def policy(self):
+        ''' The current policy, a dict-like view state_str -> action probabilities.
+            The rows of all the information sets are the array `table.policy`.
+        '''
+        return TableRows(self.table, 'policy')
+
+    @property
+    def average_policy(self):
+        ''' The cumulative policy, a dict-like view state_str -> row
+        '''
+        return TableRows(self.table, 'average_policy')
+
+    @property
+    def regrets(self):
+        ''' The cumulative regrets, a dict-like view state_str -> action regrets
+        '''
+        return TableRows(self.table, 'regrets')
+
     def train(self):
         ''' Do one iteration of CFR
         '''
@@ -40,8 +77,20 @@ class CFRAgent():
             probs = np.ones(self.env.num_players)
             self.traverse_tree(probs, player_id)
 
+            # CFR+ updates the policy after the traversal of each player
+            if self.variant == 'cfr+':
+                self.table.floor_regrets()
+                self.update_policy()
+
+        if self.variant in ['linear', 'dcfr']:
+            t = self.iteration
+            self.table.discount(t**self.alpha / (t**self.alpha + 1),
+                                t**self.beta / (t**self.beta + 1),
+                                (t / (t + 1))**self.gamma)
+
         # Update policy
-        self.update_policy()
+        if self.variant != 'cfr+':
+            self.update_policy()
 
     def traverse_tree(self, probs, player_id):
         ''' Traverse the game tree, update the regrets
@@ -61,7 +110,8 @@ class CFRAgent():
         action_utilities = {}
         state_utility = np.zeros(self.env.num_players)
         obs, legal_actions = self.get_state(current_player)
-        action_probs = self.action_probs(obs, legal_actions, self.policy)
+        idx = self.table.intern(obs)
+        action_probs = remove_illegal(self.table.policy[idx], legal_actions)
 
         for action in legal_actions:
             action_prob = action_probs[action]
@@ -85,63 +135,17 @@ class CFRAgent():
                                 np.prod(probs[current_player + 1:]))
         player_state_utility = state_utility[current_player]
 
-        if obs not in self.regrets:
-            self.regrets[obs] = np.zeros(self.env.num_actions)
-        if obs not in self.average_policy:
-            self.average_policy[obs] = np.zeros(self.env.num_actions)
-        for action in legal_actions:
-            action_prob = action_probs[action]
-            regret = counterfactual_prob * (action_utilities[action][current_player]
-                    - player_state_utility)
-            self.regrets[obs][action] += regret
-            self.average_policy[obs][action] += self.iteration * player_prob * action_prob
+        utilities = np.array([action_utilities[action][current_player] for action in legal_actions])
+        self.table.regrets[idx, legal_actions] += counterfactual_prob * (utilities - player_state_utility)
+        # The discounted variants weight the average policy through discounting
+        weight = 1 if self.variant in ['linear', 'dcfr'] else self.iteration
+        self.table.average_policy[idx, legal_actions] += weight * player_prob * action_probs[legal_actions]
         return state_utility
 
     def update_policy(self):
         ''' Update policy based on the current regrets
         '''
-        for obs in self.regrets:
-            self.policy[obs] = self.regret_matching(obs)
-
-    def regret_matching(self, obs):
-        ''' Apply regret matching
-
-        Args:
-            obs (string): The state_str
-        '''
-        regret = self.regrets[obs]
-        positive_regret_sum = sum([r for r in regret if r > 0])
-
-        action_probs = np.zeros(self.env.num_actions)
-        if positive_regret_sum > 0:
-            for action in range(self.env.num_actions):
-                action_probs[action] = max(0.0, regret[action] / positive_regret_sum)
-        else:
-            for action in range(self.env.num_actions):
-                action_probs[action] = 1.0 / self.env.num_actions
-        return action_probs
-
-    def action_probs(self, obs, legal_actions, policy):
-        ''' Obtain the action probabilities of the current state
-
-        Args:
-            obs (str): state_str
-            legal_actions (list): List of leagel actions
-            player_id (int): The current player
-            policy (dict): The used policy
-
-        Returns:
-            (tuple) that contains:
-                action_probs(numpy.array): The action probabilities
-                legal_actions (list): Indices of legal actions
-        '''
-        if obs not in policy.keys():
-            action_probs = np.array([1.0/self.env.num_actions for _ in range(self.env.num_actions)])
-            self.policy[obs] = action_probs
-        else:
-            action_probs = policy[obs]
-        action_probs = remove_illegal(action_probs, legal_actions)
-        return action_probs
+        self.table.update_policy()
 
     def eval_step(self, state):
         ''' Given a state, predict action based on average policy
@@ -153,7 +157,13 @@ class CFRAgent():
             action (int): Predicted action
             info (dict): A dictionary containing information
         '''
-        probs = self.action_probs(state['obs'].tostring(), list(state['legal_actions'].keys()), self.average_policy)
+        legal_actions = list(state['legal_actions'].keys())
+        idx = self.table.lookup(state['obs'].tobytes())
+        if idx is None:
+            probs = np.ones(self.env.num_actions) / self.env.num_actions
+        else:
+            probs = self.table.average_policy[idx]
+        probs = remove_illegal(probs, legal_actions)
         action = np.random.choice(len(probs), p=probs)
 
         info = {}
@@ -173,49 +183,48 @@ class CFRAgent():
                 legal_actions (list): Indices of legal actions
         '''
         state = self.env.get_state(player_id)
-        return state['obs'].tostring(), list(state['legal_actions'].keys())
-
-    def save(self):
-        ''' Save model
-        '''
-        if not os.path.exists(self.model_path):
-            os.makedirs(self.model_path)
-
-        policy_file = open(os.path.join(self.model_path, 'policy.pkl'),'wb')
-        pickle.dump(self.policy, policy_file)
-        policy_file.close()
-
-        average_policy_file = open(os.path.join(self.model_path, 'average_policy.pkl'),'wb')
-        pickle.dump(self.average_policy, average_policy_file)
-        average_policy_file.close()
+        return state['obs'].tobytes(), list(state['legal_actions'].keys())
 
-        regrets_file = open(os.path.join(self.model_path, 'regrets.pkl'),'wb')
-        pickle.dump(self.regrets, regrets_file)
-        regrets_file.close()
+    def save(self, dtype=np.float64):
+        ''' Save model. Only the rows that changed since the last save are written.
 
-        iteration_file = open(os.path.join(self.model_path, 'iteration.pkl'),'wb')
-        pickle.dump(self.iteration, iteration_file)
-        iteration_file.close()
+        Args:
+            dtype (numpy.dtype): The type of the stored arrays. float32 halves
+              the size of a model exported for serving, but training resumed
+              from it does not match uninterrupted training.
+        '''
+        self.table.save(self.model_path, metadata={'iteration': self.iteration}, dtype=dtype)
 
-    def load(self):
+    def load(self, mmap_mode=None):
         ''' Load model
+
+        Args:
+            mmap_mode (str): None to read the model into memory, or 'r' to map
+              it read-only, e.g., to serve a large model from several processes
         '''
         if not os.path.exists(self.model_path):
             return
 
+        if os.path.exists(os.path.join(self.model_path, 'meta.json')):
+            self.table = CFRTable.load(self.model_path, mmap_mode=mmap_mode)
+            self.iteration = self.table.metadata['iteration']
+            return
+
+        # Models saved as pickled dictionaries by earlier versions
         policy_file = open(os.path.join(self.model_path, 'policy.pkl'),'rb')
-        self.policy = pickle.load(policy_file)
+        policy = pickle.load(policy_file)
         policy_file.close()
 
         average_policy_file = open(os.path.join(self.model_path, 'average_policy.pkl'),'rb')
-        self.average_policy = pickle.load(average_policy_file)
+        average_policy = pickle.load(average_policy_file)
         average_policy_file.close()
 
         regrets_file = open(os.path.join(self.model_path, 'regrets.pkl'),'rb')
-        self.regrets = pickle.load(regrets_file)
+        regrets = pickle.load(regrets_file)
         regrets_file.close()
 
+        self.table = CFRTable.from_dicts(self.env.num_actions, policy, average_policy, regrets)
+
         iteration_file = open(os.path.join(self.model_path, 'iteration.pkl'),'rb')
         self.iteration = pickle.load(iteration_file)
         iteration_file.close()
-
@@ -0,0 +1,394 @@
+import os
+import json
+import hashlib
+from collections.abc import Mapping
+
+import numpy as np
+
+# The arrays of a checkpoint, one row per information set
+ARRAYS = ['regrets', 'average_policy', 'policy']
+
+class CFRTable(object):
+    ''' Tabular storage of the regrets and strategies of CFR
+
+    Each information set key is interned once into a dense integer id.
+    The regrets, the current policy and the cumulative (average) policy of
+    all the information sets are stored as rows of contiguous
+    (num_infosets, num_actions) arrays, which grow by doubling.
+
+    A table is saved as a directory of flat binary files: the keys
+    concatenated with their offsets, a sorted array of key hashes with the
+    matching row ids, one float64 (or float32) file per array and a `meta.json`. Loading
+    with `mmap_mode='r'` maps the files without reading them, so the pages
+    are loaded on demand and shared between the processes that map the
+    same checkpoint. The keys are then looked up by binary search on the
+    hashes, and the table is read-only.
+    '''
+
+    def __init__(self, num_actions, capacity=1024):
+        ''' Initialize the table
+
+        Args:
+            num_actions (int): The number of actions
+            capacity (int): The initial number of rows
+        '''
+        self.num_actions = num_actions
+
+        # Information set key -> row id, and row id -> key
+        self.index = {}
+        self.keys = []
+
+        self.regrets = np.zeros((capacity, num_actions))
+        self.average_policy = np.zeros((capacity, num_actions))
+        self.policy = np.full((capacity, num_actions), 1.0 / num_actions)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def lookup(self, key):
+        ''' Get the row id of an information set without adding it
+
+        Args:
+            key (bytes): The information set key
+
+        Returns:
+            (int): The row id, or None if the information set is not in the table
+        '''
+        return self.index.get(key)
+
+    def intern(self, key):
+        ''' Get the row id of an information set, adding a new row if needed.
+            A new row has zero regrets and a uniform policy.
+
+        Args:
+            key (bytes): The information set key
+
+        Returns:
+            (int): The row id
+        '''
+        idx = self.index.get(key)
+        if idx is None:
+            idx = len(self.keys)
+            self.index[key] = idx
+            if idx == self.regrets.shape[0]:
+                self._grow()
+            self.keys.append(key)
+        return idx
+
+    def update_policy(self):
+        ''' Apply regret matching to all the information sets at once.
+            Information sets without positive regrets get a uniform policy.
+        '''
+        n = len(self.keys)
+        positive_regrets = np.maximum(self.regrets[:n], 0)
+        positive_regret_sums = positive_regrets.sum(axis=1, keepdims=True)
+        has_positive = positive_regret_sums > 0
+        self.policy[:n] = np.where(has_positive,
+                                   positive_regrets / np.where(has_positive, positive_regret_sums, 1),
+                                   1.0 / self.num_actions)
+
+    def regret_matching(self, idx):
+        ''' Apply regret matching to one information set
+
+        Args:
+            idx (int): The row id
+
+        Returns:
+            (numpy.array): The updated policy of the information set
+        '''
+        positive_regrets = np.maximum(self.regrets[idx], 0)
+        positive_regret_sum = positive_regrets.sum()
+        if positive_regret_sum > 0:
+            self.policy[idx] = positive_regrets / positive_regret_sum
+        else:
+            self.policy[idx] = 1.0 / self.num_actions
+        return self.policy[idx]
+
+    def floor_regrets(self):
+        ''' Set the negative regrets to zero, as in CFR+
+        '''
+        n = len(self.keys)
+        np.maximum(self.regrets[:n], 0, out=self.regrets[:n])
+
+    def discount(self, positive_factor, negative_factor, average_factor):
+        ''' Discount the cumulative regrets and policies, as in Linear CFR and DCFR
+
+        Args:
+            positive_factor (float): The factor of the positive regrets
+            negative_factor (float): The factor of the negative regrets
+            average_factor (float): The factor of the cumulative policy
+        '''
+        n = len(self.keys)
+        regrets = self.regrets[:n]
+        regrets *= np.where(regrets > 0, positive_factor, negative_factor)
+        self.average_policy[:n] *= average_factor
+
+    def to_dicts(self):
+        ''' Export the table as dictionaries of key -> row
+
+        Returns:
+            (tuple): The policy, average policy and regrets dictionaries
+        '''
+        policy, average_policy, regrets = {}, {}, {}
+        for idx, key in enumerate(self.keys):
+            policy[key] = self.policy[idx].copy()
+            average_policy[key] = self.average_policy[idx].copy()
+            regrets[key] = self.regrets[idx].copy()
+        return policy, average_policy, regrets
+
+    @classmethod
+    def from_dicts(cls, num_actions, policy, average_policy, regrets):
+        ''' Build a table from dictionaries of key -> row
+
+        Args:
+            num_actions (int): The number of actions
+            policy (dict): The current policy of each information set
+            average_policy (dict): The cumulative policy of each information set
+            regrets (dict): The regrets of each information set
+
+        Returns:
+            (CFRTable): The table
+        '''
+        table = cls(num_actions, capacity=max(len(policy), len(average_policy), len(regrets), 1))
+        for key, probs in policy.items():
+            table.policy[table.intern(key)] = probs
+        for key, probs in average_policy.items():
+            table.average_policy[table.intern(key)] = probs
+        for key, regret in regrets.items():
+            table.regrets[table.intern(key)] = regret
+        return table
+
+    def save(self, path, metadata=None, dtype=np.float64):
+        ''' Save the table to a directory. If the directory holds a checkpoint
+            of an earlier state of the same table, only the rows that changed
+            and the new rows are written.
+
+        Args:
+            path (str): The directory of the checkpoint
+            metadata (dict): Additional JSON-serializable information to store
+            dtype (numpy.dtype): The type of the stored arrays. Training can only
+              be resumed exactly from float64, float32 halves the size of a
+              model that is only served.
+
+        Returns:
+            (int): The number of rows written
+        '''
+        if not os.path.exists(path):
+            os.makedirs(path)
+        n = len(self.keys)
+        dtype = np.dtype(dtype)
+
+        # Rows are only ever appended, so the old rows can be updated in place
+        old_n = 0
+        meta_path = os.path.join(path, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if (meta['num_actions'] == self.num_actions and meta['dtype'] == dtype.str
+                    and 0 < meta['num_rows'] <= n and meta['keys_digest'] == _digest(self.keys, meta['num_rows'])):
+                old_n = meta['num_rows']
+            # The checkpoint is invalid until the new meta.json is written
+            os.remove(meta_path)
+
+        keys = [self.keys[i] for i in range(old_n, n)]
+        lengths = np.array([len(key) for key in keys], dtype=np.int64)
+        if old_n == 0:
+            offsets = np.concatenate([[0], np.cumsum(lengths)])
+            hashes = np.array([_hash(key) for key in keys], dtype=np.uint64)
+            rows = np.arange(n, dtype=np.int64)
+        else:
+            old_offsets = np.fromfile(os.path.join(path, 'key_offsets.bin'), dtype=np.int64, count=old_n+1)
+            offsets = np.concatenate([old_offsets, old_offsets[-1] + np.cumsum(lengths)])
+            hashes = np.concatenate([np.fromfile(os.path.join(path, 'key_hashes.bin'), dtype=np.uint64),
+                                     np.array([_hash(key) for key in keys], dtype=np.uint64)])
+            rows = np.concatenate([np.fromfile(os.path.join(path, 'key_rows.bin'), dtype=np.int64),
+                                   np.arange(old_n, n, dtype=np.int64)])
+        order = np.argsort(hashes, kind='stable')
+
+        _append(os.path.join(path, 'keys.bin'), offsets[old_n], b''.join(keys))
+        offsets.tofile(os.path.join(path, 'key_offsets.bin'))
+        hashes[order].tofile(os.path.join(path, 'key_hashes.bin'))
+        rows[order].tofile(os.path.join(path, 'key_rows.bin'))
+
+        changed = np.zeros(old_n, dtype=bool)
+        for name in ARRAYS:
+            array = getattr(self, name)[:n].astype(dtype)
+            if old_n > 0:
+                stored = np.memmap(os.path.join(path, name + '.bin'), dtype=dtype, mode='r+', shape=(old_n, self.num_actions))
+                rows_changed = np.any(stored != array[:old_n], axis=1)
+                stored[rows_changed] = array[:old_n][rows_changed]
+                stored.flush()
+                del stored
+                changed |= rows_changed
+            _append(os.path.join(path, name + '.bin'), old_n * self.num_actions * dtype.itemsize, array[old_n:].tobytes())
+
+        meta = {
+            'num_rows': n,
+            'num_actions': self.num_actions,
+            'dtype': dtype.str,
+            'keys_digest': _digest(self.keys, n),
+            'metadata': metadata or {},
+        }
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+        return int(changed.sum()) + n - old_n
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        ''' Load a table saved by `save`
+
+        Args:
+            path (str): The directory of the checkpoint
+            mmap_mode (str): None to read the table into memory, or 'r' to
+              map the files read-only
+
+        Returns:
+            (CFRTable): The table. The metadata is in the `metadata` attribute.
+        '''
+        if mmap_mode not in [None, 'r']:
+            raise ValueError("'mmap_mode' should be either None or 'r'.")
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        n, num_actions, dtype = meta['num_rows'], meta['num_actions'], np.dtype(meta['dtype'])
+
+        if mmap_mode is None:
+            table = cls(num_actions, capacity=max(n, 1))
+            offsets = np.fromfile(os.path.join(path, 'key_offsets.bin'), dtype=np.int64)
+            with open(os.path.join(path, 'keys.bin'), 'rb') as f:
+                blob = f.read()
+            for i in range(n):
+                table.intern(blob[offsets[i]:offsets[i+1]])
+            for name in ARRAYS:
+                getattr(table, name)[:n] = np.fromfile(os.path.join(path, name + '.bin'), dtype=dtype).reshape(n, num_actions)
+        else:
+            table = cls.__new__(cls)
+            table.num_actions = num_actions
+            table.keys = _MappedKeys(_map(path, 'keys.bin', np.uint8), _map(path, 'key_offsets.bin', np.int64))
+            table.index = _MappedIndex(_map(path, 'key_hashes.bin', np.uint64), _map(path, 'key_rows.bin', np.int64), table.keys)
+            for name in ARRAYS:
+                setattr(table, name, _map(path, name + '.bin', dtype).reshape(n, num_actions))
+        table.metadata = meta['metadata']
+        return table
+
+    def _grow(self):
+        ''' Double the number of rows
+        '''
+        capacity = self.regrets.shape[0]
+        self.regrets = np.concatenate([self.regrets, np.zeros((capacity, self.num_actions))])
+        self.average_policy = np.concatenate([self.average_policy, np.zeros((capacity, self.num_actions))])
+        self.policy = np.concatenate([self.policy, np.full((capacity, self.num_actions), 1.0 / self.num_actions)])
+
+class TableRows(Mapping):
+    ''' A dict-like view of one array of a table, information set key -> row
+
+    The rows are views of the array, as the values of the dictionaries of
+    the earlier versions of `CFRAgent`, and are looked up with `CFRTable.lookup`.
+    '''
+
+    def __init__(self, table, name):
+        ''' Initialize the view
+
+        Args:
+            table (CFRTable): The table
+            name (str): The name of the array, one of ARRAYS
+        '''
+        self.table = table
+        self.name = name
+
+    def __getitem__(self, key):
+        idx = self.table.lookup(key)
+        if idx is None:
+            raise KeyError(key)
+        return getattr(self.table, self.name)[idx]
+
+    def __setitem__(self, key, row):
+        getattr(self.table, self.name)[self.table.intern(key)] = row
+
+    def __contains__(self, key):
+        return key in self.table
+
+    def __iter__(self):
+        return iter(self.table.keys)
+
+    def __len__(self):
+        return len(self.table)
+
+class _MappedKeys(object):
+    ''' The keys of a mapped checkpoint, read on demand
+    '''
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.blob[self.offsets[i]:self.offsets[i+1]].tobytes()
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+class _MappedIndex(object):
+    ''' The key index of a mapped checkpoint, searching the sorted key hashes
+    '''
+
+    def __init__(self, hashes, rows, keys):
+        self.hashes = hashes
+        self.rows = rows
+        self.keys = keys
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __setitem__(self, key, idx):
+        raise ValueError('A table loaded with mmap_mode is read-only.')
+
+    def get(self, key):
+        h = np.uint64(_hash(key))
+        pos = int(np.searchsorted(self.hashes, h))
+        while pos < len(self.hashes) and self.hashes[pos] == h:
+            idx = int(self.rows[pos])
+            if self.keys[idx] == key:
+                return idx
+            pos += 1
+        return None
+
+def _hash(key):
+    ''' A 64-bit hash of a key that is stable across processes
+    '''
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little')
+
+def _digest(keys, n):
+    ''' A digest of the first n keys, to check that a checkpoint is an earlier state of a table
+    '''
+    digest = hashlib.blake2b(digest_size=16)
+    for i in range(n):
+        digest.update(len(keys[i]).to_bytes(4, 'little'))
+        digest.update(keys[i])
+    return digest.hexdigest()
+
+def _append(filename, size, data):
+    ''' Truncate a file to a size and append data to it
+    '''
+    with open(filename, 'r+b' if size > 0 else 'wb') as f:
+        f.truncate(size)
+        f.seek(size)
+        f.write(data)
+
+def _map(path, filename, dtype):
+    ''' Map a flat binary file read-only
+    '''
+    filename = os.path.join(path, filename)
+    if os.path.getsize(filename) == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(filename, dtype=dtype, mode='r')
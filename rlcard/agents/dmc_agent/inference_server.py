@@ -0,0 +1,198 @@
+# Copyright 2021 RLCard Team of Texas A&M University
+# Copyright 2021 DouZero Team of Kwai
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import queue
+import time
+import traceback
+
+import numpy as np
+
+from .model import DMCAgent
+from .utils import log
+
+class InferenceServer(object):
+    ''' Evaluate the decisions of all the actors of a device in one process.
+
+    The actors send the observations and the legal action ids of their
+    pending decisions to a shared request queue. The server waits for more
+    requests until the batch is full or the oldest request is older than the
+    latency deadline, evaluates each position with one forward pass, and
+    sends the values back to the response queue of each actor. The server
+    holds the model of the device, and pulls the weights of the learner from
+    the parameter store between the batches.
+
+    The server only pays off when the batches of several actors keep a GPU
+    busy, or when many actors on many cores would otherwise each hold a
+    copy of the model. On CPU with one core it is a slowdown: every decision
+    costs a queue round trip (a doudizhu decision took 2.58ms through the
+    server against 2.40ms in the actor), so it is off by default.
+    '''
+    def __init__(self, ctx, model, num_actors, max_batch_size=256, max_latency=0.002, parameter_store=None):
+        ''' Create the queues
+
+        Args:
+            ctx (multiprocessing.context): The multiprocessing context
+            model (DMCModel): The model of the device, with action feature tables
+            num_actors (int): The number of actors
+            max_batch_size (int): The maximum number of states in a batch
+            max_latency (float): The maximum time in seconds to wait for more requests
+            parameter_store (ParameterStore): The weights of the learner. The
+              model is used as is if None.
+        '''
+        self.ctx = ctx
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.parameter_store = parameter_store
+        self.request_queue = ctx.Queue()
+        self.response_queues = [ctx.Queue() for _ in range(num_actors)]
+        self.process = None
+
+    def start(self):
+        ''' Start the server process
+        '''
+        self.process = self.ctx.Process(
+            target=serve,
+            args=(self.model, self.request_queue, self.response_queues, self.max_batch_size, self.max_latency, self.parameter_store),
+            daemon=True,
+        )
+        self.process.start()
+
+    def close(self):
+        ''' Stop the server process
+        '''
+        if self.process is not None:
+            self.request_queue.put(None)
+            self.process.join(timeout=1)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+
+    def get_client(self, actor_id):
+        ''' Get the client of an actor, which can be sent to the actor process
+
+        Args:
+            actor_id (int): The id of the actor
+
+        Returns:
+            (InferenceClient): The client
+        '''
+        return InferenceClient(actor_id, self.request_queue, self.response_queues[actor_id])
+
+class InferenceClient(object):
+    ''' The connection of an actor to the inference server
+    '''
+    def __init__(self, actor_id, request_queue, response_queue):
+        self.actor_id = actor_id
+        self.request_queue = request_queue
+        self.response_queue = response_queue
+
+    def predict_values(self, position, obs, action_keys):
+        ''' Ask the server for the values of the legal actions
+
+        Args:
+            position (int): The position of the player
+            obs (numpy.array): The observations, one row per state
+            action_keys (list): The legal action ids of each state
+
+        Returns:
+            (list): The values of the legal actions of each state
+        '''
+        self.request_queue.put((self.actor_id, position, obs, action_keys))
+        values = self.response_queue.get()
+        if values is None:
+            raise RuntimeError('The inference server failed.')
+        return values
+
+    def get_agents(self, num_players, exp_epsilon):
+        ''' Get the agents of the actor
+
+        Args:
+            num_players (int): The number of players
+            exp_epsilon (float): The probability for exploration
+
+        Returns:
+            (list): A list of RemoteDMCAgent, one for each position
+        '''
+        return [RemoteDMCAgent(self, position, exp_epsilon) for position in range(num_players)]
+
+class RemoteDMCAgent(DMCAgent):
+    ''' A DMC agent whose values are predicted by the inference server
+    '''
+    def __init__(self, client, position, exp_epsilon=0.01):
+        self.use_raw = False
+        self.client = client
+        self.position = position
+        self.exp_epsilon = exp_epsilon
+
+    def predict_batch(self, states):
+        action_keys = [np.fromiter(state['legal_actions'].keys(), dtype=np.int64, count=len(state['legal_actions'])) for state in states]
+        obs = np.stack([state['obs'] for state in states])
+        values = self.client.predict_values(self.position, obs, action_keys)
+        return list(zip(action_keys, values))
+
+def serve(model, request_queue, response_queues, max_batch_size, max_latency, parameter_store=None):
+    ''' The loop of the inference server. Each request is a tuple
+        (actor_id, position, obs, action_keys), and None stops the server.
+    '''
+    try:
+        log.info('Inference server started.')
+        versions = [0 for _ in model.get_agents()]
+        running = True
+        while running:
+            # Wait for the first request, then for more until the deadline
+            requests = [request_queue.get()]
+            if requests[0] is None:
+                break
+            deadline = time.time() + max_latency
+            num_states = len(requests[0][3])
+            while num_states < max_batch_size:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = request_queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    running = False
+                    break
+                requests.append(request)
+                num_states += len(request[3])
+
+            # One forward pass for each position
+            positions = {}
+            for request in requests:
+                positions.setdefault(request[1], []).append(request)
+            for position, _requests in positions.items():
+                if parameter_store is not None:
+                    versions[position] = parameter_store.pull(position, model.get_agent(position), versions[position])
+                obs = np.concatenate([request[2] for request in _requests])
+                action_keys = [keys for request in _requests for keys in request[3]]
+                values = model.get_agent(position).predict_values(obs, action_keys)
+                offset = 0
+                for actor_id, _, _, _action_keys in _requests:
+                    response_queues[actor_id].put(values[offset:offset+len(_action_keys)])
+                    offset += len(_action_keys)
+
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        log.error('Exception in inference server')
+        traceback.print_exc()
+        # Wake up the waiting actors
+        for response_queue in response_queues:
+            response_queue.put(None)
+        raise e
@@ -0,0 +1,183 @@
+# Copyright 2021 RLCard Team of Texas A&M University
+# Copyright 2021 DouZero Team of Kwai
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+
+import numpy as np
+import torch
+
+# The counters of the actors and the learner
+COUNTERS = [
+    'episodes',         # Episodes played by the actors
+    'decisions',        # Decisions taken by the actors
+    'env_time',         # Time in seconds spent by the actors in the games, outside of predict
+    'predict_time',     # Time in seconds spent by the actors in predict
+    'free_gets',        # Buffers taken from the free queues by the actors
+    'full_puts',        # Buffers put in the full queues by the actors
+    'full_gets',        # Buffers taken from the full queues by the learner
+    'free_puts',        # Buffers put back in the free queues by the learner
+]
+
+# The latency histograms, in seconds
+HISTOGRAMS = [
+    'predict',          # One call of predict by an actor
+    'batch_wait',       # Waiting for a batch in get_batch
+    'publish',          # Publishing the weights of a position
+    'pull',             # Copying new weights into an actor model
+]
+
+# The upper edges of the bins of the histograms, from 1us to about 1min
+BIN_EDGES = 2.0 ** np.arange(-20, 7)
+
+class Metrics(object):
+    ''' Counters and latency histograms shared by the processes of DMCTrainer.
+
+    Every writer (an actor or a learner thread) owns one row of the shared
+    arrays, so the counters are updated without locks. The trainer reads
+    the sums of the rows and reports the rates between two reports.
+    '''
+    def __init__(self, num_writers):
+        ''' Allocate the shared arrays
+
+        Args:
+            num_writers (int): The number of writers
+        '''
+        self.counters = torch.zeros((num_writers, len(COUNTERS)), dtype=torch.float64).share_memory_()
+        self.histograms = torch.zeros((num_writers, len(HISTOGRAMS), len(BIN_EDGES)+1), dtype=torch.float64).share_memory_()
+        self._last = self.snapshot()
+
+    def writer(self, row):
+        ''' Get the writer of a row
+
+        Args:
+            row (int): The row of the writer
+
+        Returns:
+            (MetricsWriter): The writer
+        '''
+        return MetricsWriter(self, row)
+
+    def snapshot(self):
+        ''' Read the sums of the rows
+
+        Returns:
+            (tuple): Tuple containing:
+
+                (numpy.array): The counters
+                (numpy.array): The histograms
+                (float): The time of the snapshot
+        '''
+        return self.counters.numpy().sum(axis=0), self.histograms.numpy().sum(axis=0), time.time()
+
+    def report(self, num_buffers):
+        ''' Compute the rates and the latencies since the last report
+
+        Args:
+            num_buffers (int): The number of buffers in the free queues at the start
+
+        Returns:
+            (dict): The metrics
+        '''
+        counters, histograms, now = self.snapshot()
+        last_counters, last_histograms, last_time = self._last
+        self._last = (counters, histograms, now)
+
+        delta = dict(zip(COUNTERS, counters - last_counters))
+        total = dict(zip(COUNTERS, counters))
+        elapsed = max(now - last_time, 1e-9)
+        actor_time = delta['env_time'] + delta['predict_time']
+        metrics = {
+            'episodes_per_second': delta['episodes'] / elapsed,
+            'decisions_per_second': delta['decisions'] / elapsed,
+            'env_time_fraction': delta['env_time'] / actor_time if actor_time > 0 else 0.,
+            'predict_time_fraction': delta['predict_time'] / actor_time if actor_time > 0 else 0.,
+            'free_queue_depth': num_buffers + total['free_puts'] - total['free_gets'],
+            'full_queue_depth': total['full_puts'] - total['full_gets'],
+        }
+        for name, counts in zip(HISTOGRAMS, histograms - last_histograms):
+            metrics[name+'_p50'] = _percentile(counts, 0.5)
+            metrics[name+'_p95'] = _percentile(counts, 0.95)
+        return metrics
+
+class MetricsWriter(object):
+    ''' Update one row of the metrics
+    '''
+    def __init__(self, metrics, row):
+        self.counters = metrics.counters[row].numpy()
+        self.histograms = metrics.histograms[row].numpy()
+
+    def add(self, name, value=1):
+        ''' Add a value to a counter
+
+        Args:
+            name (str): The name of the counter
+            value (float): The value
+        '''
+        self.counters[COUNTERS.index(name)] += value
+
+    def observe(self, name, seconds):
+        ''' Add a latency to a histogram
+
+        Args:
+            name (str): The name of the histogram
+            seconds (float): The latency
+        '''
+        self.histograms[HISTOGRAMS.index(name), np.searchsorted(BIN_EDGES, seconds)] += 1
+
+    def get(self, name):
+        ''' Read a counter
+
+        Args:
+            name (str): The name of the counter
+
+        Returns:
+            (float): The value
+        '''
+        return float(self.counters[COUNTERS.index(name)])
+
+class TimedAgent(object):
+    ''' Measure the predict time and count the decisions of an agent
+    '''
+    def __init__(self, agent, writer):
+        self.agent = agent
+        self.writer = writer
+        self.use_raw = agent.use_raw
+
+    def step(self, state):
+        return self.step_batch([state])[0]
+
+    def step_batch(self, states):
+        start = time.perf_counter()
+        if hasattr(self.agent, 'step_batch'):
+            actions = self.agent.step_batch(states)
+        else:
+            actions = [self.agent.step(state) for state in states]
+        elapsed = time.perf_counter() - start
+        self.writer.add('predict_time', elapsed)
+        self.writer.add('decisions', len(states))
+        self.writer.observe('predict', elapsed)
+        return actions
+
+    def eval_step(self, state):
+        return self.agent.eval_step(state)
+
+def _percentile(counts, q):
+    ''' The upper edge of the bin of a percentile, or 0 if empty
+    '''
+    total = counts.sum()
+    if total == 0:
+        return 0.
+    index = int(np.searchsorted(np.cumsum(counts), q * total))
+    return float(BIN_EDGES[min(index, len(BIN_EDGES)-1)])
@@ -42,6 +42,28 @@ class DMCNet(nn.Module):
         values = self.fc_layers(x).flatten()
         return values
 
+    def forward_repeated(self, obs, actions, repeats):
+        ''' Same as `forward` with each observation repeated for several
+            actions. The observation part of the first layer is computed once
+            per observation instead of once per action.
+
+        Args:
+            obs (torch.Tensor): The observations
+            actions (torch.Tensor): The actions, sum(repeats) rows
+            repeats (torch.Tensor): The number of actions of each observation
+
+        Returns:
+            (torch.Tensor): The values of the actions
+        '''
+        obs = torch.flatten(obs, 1)
+        actions = torch.flatten(actions, 1)
+        first_layer = self.fc_layers[0]
+        obs_dim = obs.shape[1]
+        x = torch.repeat_interleave(obs.matmul(first_layer.weight[:, :obs_dim].t()), repeats, dim=0)
+        x = x + nn.functional.linear(actions, first_layer.weight[:, obs_dim:], first_layer.bias)
+        values = self.fc_layers[1:](x).flatten()
+        return values
+
 class DMCAgent:
     def __init__(
         self,
@@ -50,6 +72,7 @@ class DMCAgent:
         mlp_layers=[512,512,512,512,512],
         exp_epsilon=0.01,
         device="0",
+        action_features=None,
     ):
         self.use_raw = False
         self.device = 'cuda:'+device if device != "cpu" else "cpu"
@@ -57,30 +80,47 @@ class DMCAgent:
         self.exp_epsilon = exp_epsilon
         self.action_shape = action_shape
 
+        # The features of all the actions, gathered by action id. Otherwise
+        # the features are read from the legal actions of the states
+        if action_features is not None:
+            action_features = torch.as_tensor(action_features).to(self.device)
+        self.action_features = action_features
+
     def step(self, state):
-        action_keys, values = self.predict(state)
+        return self.step_batch([state])[0]
 
-        if self.exp_epsilon > 0 and np.random.rand() < self.exp_epsilon:
-            action = np.random.choice(action_keys)
-        else:
-            action_idx = np.argmax(values)
-            action = action_keys[action_idx]
+    def step_batch(self, states):
+        actions = []
+        for action_keys, values in self.predict_batch(states):
+            if self.exp_epsilon > 0 and np.random.rand() < self.exp_epsilon:
+                action = np.random.choice(action_keys)
+            else:
+                action_idx = np.argmax(values)
+                action = action_keys[action_idx]
+            actions.append(action)
 
-        return action
+        return actions
 
     def eval_step(self, state):
-        action_keys, values = self.predict(state)
+        actions, infos = self.eval_step_batch([state])
+        return actions[0], infos[0]
 
-        action_idx = np.argmax(values)
-        action = action_keys[action_idx]
+    def eval_step_batch(self, states):
+        actions, infos = [], []
+        for state, (action_keys, values) in zip(states, self.predict_batch(states)):
+            action_idx = np.argmax(values)
+            actions.append(action_keys[action_idx])
 
-        info = {}
-        info['values'] = {state['raw_legal_actions'][i]: float(values[i]) for i in range(len(action_keys))}
+            info = {}
+            info['values'] = {state['raw_legal_actions'][i]: float(values[i]) for i in range(len(action_keys))}
+            infos.append(info)
 
-        return action, info
+        return actions, infos
 
     def share_memory(self):
         self.net.share_memory()
+        if self.action_features is not None:
+            self.action_features.share_memory_()
 
     def eval(self):
         self.net.eval()
@@ -89,25 +129,81 @@ class DMCAgent:
         return self.net.parameters()
 
     def predict(self, state):
-        # Prepare obs and actions
-        obs = state['obs'].astype(np.float32)
-        legal_actions = state['legal_actions']
-        action_keys = np.array(list(legal_actions.keys()))
-        action_values = list(legal_actions.values())
-        # One-hot encoding if there is no action features
-        for i in range(len(action_values)):
-            if action_values[i] is None:
-                action_values[i] = np.zeros(self.action_shape[0])
-                action_values[i][action_keys[i]] = 1
-        action_values = np.array(action_values, dtype=np.float32)
+        return self.predict_batch([state])[0]
 
-        obs = np.repeat(obs[np.newaxis, :], len(action_keys), axis=0)
+    def predict_batch(self, states):
+        ''' Predict the values of the legal actions of a batch of states
+            with a single forward pass
+
+        Args:
+            states (list): A list of states
+
+        Returns:
+            (list): A list of tuples (action_keys, values), one for each state
+        '''
+        action_keys = [np.fromiter(state['legal_actions'].keys(), dtype=np.int64, count=len(state['legal_actions'])) for state in states]
+        obs = np.stack([state['obs'] for state in states])
+
+        if self.action_features is not None:
+            values = self.predict_values(obs, action_keys)
+        else:
+            actions = self._get_action_features(states, np.concatenate(action_keys))
+            values = self._predict(obs, actions, action_keys)
+
+        return list(zip(action_keys, values))
+
+    def predict_values(self, obs, action_keys):
+        ''' Predict the values of the legal actions from the observations and
+            the action ids, with the features gathered from the action table
+
+        Args:
+            obs (numpy.array): The observations, one row per state
+            action_keys (list): The legal action ids of each state
+
+        Returns:
+            (list): The values of the legal actions of each state
+        '''
+        keys = torch.from_numpy(np.concatenate(action_keys)).to(self.device)
+        return self._predict(obs, self.action_features[keys].float(), action_keys)
+
+    def _predict(self, obs, actions, action_keys):
+        ''' Evaluate the legal actions of all the states with one forward pass
+
+        Args:
+            obs (numpy.array): The observations, one row per state
+            actions (torch.Tensor): The features of the legal actions, one row per action
+            action_keys (list): The legal action ids of each state
+
+        Returns:
+            (list): The values of the legal actions of each state
+        '''
+        counts = [len(keys) for keys in action_keys]
+        obs = torch.from_numpy(np.asarray(obs, dtype=np.float32)).to(self.device)
 
         # Predict Q values
-        values = self.net.forward(torch.from_numpy(obs).to(self.device),
-                                  torch.from_numpy(action_values).to(self.device))
+        with torch.no_grad():
+            values = self.net.forward_repeated(obs, actions, torch.tensor(counts, device=self.device)).cpu().numpy()
+
+        return np.split(values, np.cumsum(counts)[:-1])
+
+    def _get_action_features(self, states, keys):
+        ''' Read the features of the legal actions from the states
 
-        return action_keys, values.cpu().detach().numpy()
+        Args:
+            states (list): A list of states
+            keys (numpy.array): The legal action ids of all the states
+
+        Returns:
+            (torch.Tensor): The features of the legal actions, one row per action
+        '''
+        features = [feature for state in states for feature in state['legal_actions'].values()]
+        # One-hot encoding if there is no action features
+        if features[0] is None:
+            actions = np.zeros((len(keys), self.action_shape[0]), dtype=np.float32)
+            actions[np.arange(len(keys)), keys] = 1
+        else:
+            actions = np.stack(features).astype(np.float32)
+        return torch.from_numpy(actions).to(self.device)
 
     def forward(self, obs, actions):
         return self.net.forward(obs, actions)
@@ -128,7 +224,8 @@ class DMCModel:
         action_shape,
         mlp_layers=[512,512,512,512,512],
         exp_epsilon=0.01,
-        device=0
+        device=0,
+        action_features=None,
     ):
         self.agents = []
         for player_id in range(len(state_shape)):
@@ -138,6 +235,7 @@ class DMCModel:
                 mlp_layers,
                 exp_epsilon,
                 device,
+                action_features,
             )
             self.agents.append(agent)
 
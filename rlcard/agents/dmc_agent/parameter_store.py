@@ -0,0 +1,97 @@
+# Copyright 2021 RLCard Team of Texas A&M University
+# Copyright 2021 DouZero Team of Kwai
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import torch
+from torch.nn.utils import parameters_to_vector, vector_to_parameters
+
+class ParameterStore(object):
+    ''' Broadcast the weights of the learner to the actors without locks.
+
+    The weights of each position are published into one of two flat
+    shared-memory buffers, alternately, and stamped with a version counter.
+    The actors poll the version between episodes and copy the latest buffer
+    into their own model. A copy is retried if the learner started to
+    overwrite the buffer being read, i.e., published twice during the copy.
+    The learner never waits for the actors.
+    '''
+    def __init__(self, model, sync_interval=1):
+        ''' Allocate the shared buffers
+
+        Args:
+            model (DMCModel): A model with the architecture of the learner
+            sync_interval (int): The number of learner steps of a position
+              between two publications of its weights
+        '''
+        self.sync_interval = sync_interval
+        agents = model.get_agents()
+        self.buffers = [torch.zeros((2, sum(p.numel() for p in agent.parameters()))).share_memory_() for agent in agents]
+        # The last published version, and the version being written
+        self.versions = torch.zeros(len(agents), dtype=torch.int64).share_memory_()
+        self.writing = torch.zeros(len(agents), dtype=torch.int64).share_memory_()
+
+        # The number of learner steps of each position, in the learner process
+        self.steps = [0 for _ in agents]
+
+    def update(self, position, agent):
+        ''' Count a learner step, and publish the weights every sync_interval steps.
+            The learner steps of a position should not run concurrently.
+
+        Args:
+            position (int): The position of the agent
+            agent (DMCAgent): The agent of the learner
+
+        Returns:
+            (boolean): True if the weights were published
+        '''
+        self.steps[position] += 1
+        if self.steps[position] % self.sync_interval == 0:
+            self.publish(position, agent)
+            return True
+        return False
+
+    def publish(self, position, agent):
+        ''' Publish the weights of an agent as a new version
+
+        Args:
+            position (int): The position of the agent
+            agent (DMCAgent): The agent
+        '''
+        version = int(self.versions[position]) + 1
+        self.writing[position] = version
+        with torch.no_grad():
+            self.buffers[position][version % 2].copy_(parameters_to_vector(agent.parameters()))
+        self.versions[position] = version
+
+    def pull(self, position, agent, version=0):
+        ''' Load the latest weights into an agent if they are newer
+
+        Args:
+            position (int): The position of the agent
+            agent (DMCAgent): The agent to update
+            version (int): The version of the weights of the agent
+
+        Returns:
+            (int): The version of the weights of the agent
+        '''
+        while True:
+            latest = int(self.versions[position])
+            if latest == version:
+                return version
+            vector = self.buffers[position][latest % 2].clone()
+            if int(self.writing[position]) <= latest + 1:
+                break
+        with torch.no_grad():
+            vector_to_parameters(vector.to(agent.device), agent.parameters())
+        return latest
@@ -1,3 +1,4 @@
+import copy
 import traceback
 
 import numpy as np
@@ -48,10 +49,17 @@ def act_pettingzoo(
     full_queue,
     model,
     buffers,
-    env
+    env,
+    parameter_store=None,
 ):
     log.info('Device %s Actor %i started.', str(device), i)
     try:
+        # The actor has its own copy of the model, updated from the
+        # parameter store between the episodes
+        if parameter_store is not None:
+            model = copy.deepcopy(model)
+        versions = [0 for _ in range(env.num_agents)]
+
         done_buf = [[] for _ in range(env.num_agents)]
         episode_return_buf = [[] for _ in range(env.num_agents)]
         target_buf = [[] for _ in range(env.num_agents)]
@@ -60,6 +68,9 @@ def act_pettingzoo(
         size = [0 for _ in range(env.num_agents)]
 
         while True:
+            if parameter_store is not None:
+                for agent_id in range(env.num_agents):
+                    versions[agent_id] = parameter_store.pull(agent_id, model.get_agent(agent_id), versions[agent_id])
             trajectories = run_game_pettingzoo(env, model.agents, is_training=True)
             for agent_id, agent_name in enumerate(env.possible_agents):
                 traj_size = len(trajectories[agent_name]) // 2
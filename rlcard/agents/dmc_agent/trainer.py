@@ -26,6 +26,9 @@ from torch import nn
 
 from .file_writer import FileWriter
 from .model import DMCModel
+from .inference_server import InferenceServer
+from .parameter_store import ParameterStore
+from .metrics import Metrics
 from .pettingzoo_model import DMCModelPettingZoo
 from .utils import (
     get_batch,
@@ -45,14 +48,15 @@ def compute_loss(logits, targets):
 
 def learn(
     position,
-    actor_models,
+    parameter_store,
     agent,
     batch,
     optimizer,
     training_device,
     max_grad_norm,
     mean_episode_return_buf,
-    lock
+    lock,
+    metrics_writer=None,
 ):
     """Performs a learning (optimization) step."""
     device = "cuda:"+str(training_device) if training_device != "cpu" else "cpu"
@@ -75,8 +79,10 @@ def learn(
         nn.utils.clip_grad_norm_(agent.parameters(), max_grad_norm)
         optimizer.step()
 
-        for actor_model in actor_models.values():
-            actor_model.get_agent(position).load_state_dict(agent.state_dict())
+        # The actors pull the weights between episodes
+        start = time.perf_counter()
+        if parameter_store.update(position, agent) and metrics_writer is not None:
+            metrics_writer.observe('publish', time.perf_counter() - start)
         return stats
 
 
@@ -91,6 +97,16 @@ class DMCTrainer:
         save_interval (int): Time interval (in minutes) at which to save the model
         num_actor_devices (int): The number devices used for simulation
         num_actors (int): Number of actors for each simulation device
+        num_envs_per_actor (int): Number of environments run in lockstep by each actor,
+            whose decisions are evaluated in one forward pass (not for PettingZoo)
+        inference_server (boolean): Whether the decisions of all the actors of a device
+            are evaluated by one inference server process (not for PettingZoo). Off by
+            default, since it is slower than in-actor inference on CPU, see `InferenceServer`
+        inference_batch_size (int): The maximum number of states in a batch of the inference server
+        inference_latency (float): The maximum time in seconds the inference server
+            waits for more requests
+        sync_interval (int): The number of learner steps of a position between
+            two broadcasts of its weights to the actors
         training_device (str): The index of the GPU used for training models, or `cpu`.
         savedir (string): Root dir where experiment data will be saved
         total_frames (int): Total environment frames to train for
@@ -115,6 +131,11 @@ class DMCTrainer:
         save_interval=30,
         num_actor_devices=1,
         num_actors=5,
+        num_envs_per_actor=1,
+        inference_server=False,
+        inference_batch_size=256,
+        inference_latency=0.002,
+        sync_interval=1,
         training_device="0",
         savedir='experiments/dmc_result',
         total_frames=100000000000,
@@ -148,6 +169,11 @@ class DMCTrainer:
         self.save_interval = save_interval
         self.num_actor_devices = num_actor_devices
         self.num_actors = num_actors
+        self.num_envs_per_actor = num_envs_per_actor
+        self.inference_server = inference_server and not is_pettingzoo_env
+        self.inference_batch_size = inference_batch_size
+        self.inference_latency = inference_latency
+        self.sync_interval = sync_interval
         self.training_device = training_device
         self.total_frames = total_frames
         self.exp_epsilon = exp_epsilon
@@ -165,6 +191,8 @@ class DMCTrainer:
             self.action_shape = self.env.action_shape
             if self.action_shape[0] == None:  # One-hot encoding
                 self.action_shape = [[self.env.num_actions] for _ in range(self.num_players)]
+            # The features of the legal actions are gathered from a table by action id
+            self.action_features = self.env.get_action_feature_table()
 
             def model_func(device):
                 return DMCModel(
@@ -172,6 +200,7 @@ class DMCTrainer:
                     self.action_shape,
                     exp_epsilon=self.exp_epsilon,
                     device=str(device),
+                    action_features=self.action_features,
                 )
         else:
             self.num_players = self.env.num_agents
@@ -258,44 +287,85 @@ class DMCTrainer:
             for p in range(self.num_players):
                 learner_model.get_agent(p).load_state_dict(checkpoint_states["model_state_dict"][p])
                 optimizers[p].load_state_dict(checkpoint_states["optimizer_state_dict"][p])
-                for device in self.device_iterator:
-                    models[device].get_agent(p).load_state_dict(learner_model.get_agent(p).state_dict())
             stats = checkpoint_states["stats"]
             frames = checkpoint_states["frames"]
             log.info(f"Resuming preempted job, current stats:\n{stats}")
 
+        # The weights of the learner are broadcast to the actors through the store
+        parameter_store = ParameterStore(learner_model, self.sync_interval)
+        for p in range(self.num_players):
+            parameter_store.publish(p, learner_model.get_agent(p))
+
+        # Counters and latencies, one row for each actor and each learner thread
+        num_devices = len(self.device_iterator)
+        num_actor_rows = num_devices * self.num_actors
+        self.metrics = Metrics(num_actor_rows + num_devices * self.num_threads * self.num_players)
+
+        # Starting inference servers
+        servers = {}
+        if self.inference_server:
+            for device in self.device_iterator:
+                server = InferenceServer(
+                    ctx,
+                    models[device],
+                    self.num_actors,
+                    max_batch_size=self.inference_batch_size,
+                    max_latency=self.inference_latency,
+                    parameter_store=parameter_store,
+                )
+                server.start()
+                servers[device] = server
 
         # Starting actor processes
-        for device in self.device_iterator:
+        for device_index, device in enumerate(self.device_iterator):
             num_actors = self.num_actors
             for i in range(self.num_actors):
-                actor = ctx.Process(
-                    target=act_pettingzoo if self.is_pettingzoo_env else act,
-                    args=(i, device, self.T, free_queue[device], full_queue[device], models[device], buffers[device], self.env))
+                metrics_kwargs = dict(metrics=self.metrics, metrics_row=device_index*self.num_actors+i)
+                if self.is_pettingzoo_env:
+                    actor = ctx.Process(
+                        target=act_pettingzoo,
+                        args=(i, device, self.T, free_queue[device], full_queue[device], models[device], buffers[device], self.env),
+                        kwargs=dict(parameter_store=parameter_store))
+                elif self.inference_server:
+                    actor = ctx.Process(
+                        target=act,
+                        args=(i, device, self.T, free_queue[device], full_queue[device], None, buffers[device], self.env),
+                        kwargs=dict(num_envs=self.num_envs_per_actor, client=servers[device].get_client(i), exp_epsilon=self.exp_epsilon,
+                                    **metrics_kwargs))
+                else:
+                    actor = ctx.Process(
+                        target=act,
+                        args=(i, device, self.T, free_queue[device], full_queue[device], models[device], buffers[device], self.env),
+                        kwargs=dict(num_envs=self.num_envs_per_actor, parameter_store=parameter_store, **metrics_kwargs))
                 actor.start()
                 actor_processes.append(actor)
 
-        def batch_and_learn(i, device, position, local_lock, position_lock, lock=threading.Lock()):
+        log_lock = threading.Lock()
+
+        def batch_and_learn(i, device, position, local_lock, position_lock, metrics_row, lock=log_lock):
             """Thread target for the learning process."""
             nonlocal frames, stats
+            metrics_writer = self.metrics.writer(metrics_row)
             while frames < self.total_frames:
                 batch = get_batch(
                     free_queue[device][position],
                     full_queue[device][position],
                     buffers[device][position],
                     self.B,
-                    local_lock
+                    local_lock,
+                    metrics_writer,
                 )
                 _stats = learn(
                     position,
-                    models,
+                    parameter_store,
                     learner_model.get_agent(position),
                     batch,
                     optimizers[position],
                     self.training_device,
                     self.max_grad_norm,
                     self.mean_episode_return_buf,
-                    position_lock
+                    position_lock,
+                    metrics_writer,
                 )
 
                 with lock:
@@ -315,6 +385,7 @@ class DMCTrainer:
         locks = {device: [threading.Lock() for _ in range(self.num_players)] for device in self.device_iterator}
         position_locks = [threading.Lock() for _ in range(self.num_players)]
 
+        metrics_row = num_actor_rows
         for device in self.device_iterator:
             for i in range(self.num_threads):
                 for position in range(self.num_players):
@@ -326,10 +397,12 @@ class DMCTrainer:
                             device,
                             position,
                             locks[device][position],
-                            position_locks[position])
+                            position_locks[position],
+                            metrics_row)
                         )
                     thread.start()
                     threads.append(thread)
+                    metrics_row += 1
 
         def checkpoint(frames):
             log.info('Saving checkpoint to %s', self.checkpointpath)
@@ -364,11 +437,18 @@ class DMCTrainer:
 
                 end_time = timer()
                 fps = (frames - start_frames) / (end_time - start_time)
+                metrics = self.metrics.report(self.num_buffers * self.num_players * num_devices)
+                metrics['fps'] = fps
+                with log_lock:
+                    to_log = dict(frames=frames)
+                    to_log.update(metrics)
+                    self.plogger.log(to_log)
                 log.info(
-                    'After %i frames: @ %.1f fps Stats:\n%s',
+                    'After %i frames: @ %.1f fps Stats:\n%s\nMetrics:\n%s',
                     frames,
                     fps,
                     pprint.pformat(stats),
+                    pprint.pformat(metrics),
                 )
         except KeyboardInterrupt:
             return
@@ -379,3 +459,5 @@ class DMCTrainer:
 
         checkpoint(frames)
         self.plogger.close()
+        for server in servers.values():
+            server.close()
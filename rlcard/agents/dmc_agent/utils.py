@@ -13,12 +13,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
 import logging
+import time
 import traceback
 
 import numpy as np
 import torch
 
+from rlcard.envs.vec_env import VecEnv
+from .metrics import TimedAgent
+
 shandle = logging.StreamHandler()
 shandle.setFormatter(
     logging.Formatter(
@@ -34,16 +39,23 @@ def get_batch(
     full_queue,
     buffers,
     batch_size,
-    lock
+    lock,
+    metrics_writer=None,
 ):
+    start = time.perf_counter()
     with lock:
         indices = [full_queue.get() for _ in range(batch_size)]
+    if metrics_writer is not None:
+        metrics_writer.observe('batch_wait', time.perf_counter() - start)
+        metrics_writer.add('full_gets', batch_size)
     batch = {
         key: torch.stack([buffers[key][m] for m in indices], dim=1)
         for key in buffers
     }
     for m in indices:
         free_queue.put(m)
+    if metrics_writer is not None:
+        metrics_writer.add('free_puts', batch_size)
     return batch
 
 def create_buffers(
@@ -94,6 +106,60 @@ def create_optimizers(
         optimizers.append(optimizer)
     return optimizers
 
+class StagingBuffer(object):
+    ''' The steps of one player waiting to be copied into the shared buffers.
+        The steps are appended one episode at a time into growing arrays, and
+        read T at a time from a rolling offset, so that a chunk is copied with
+        one slice assignment per key.
+    '''
+    def __init__(self, specs, capacity=1024):
+        ''' Initialize the staging arrays
+
+        Args:
+            specs (dict): The shape of one step (without the time dimension)
+              and the numpy dtype of each key
+            capacity (int): The initial number of steps
+        '''
+        self.arrays = {key: np.zeros((capacity,)+tuple(shape), dtype=dtype) for key, (shape, dtype) in specs.items()}
+        self.offset = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size - self.offset
+
+    def append(self, steps):
+        ''' Append steps
+
+        Args:
+            steps (dict): An array of steps for each key
+        '''
+        n = len(next(iter(steps.values())))
+        capacity = len(next(iter(self.arrays.values())))
+        if self.size + n > capacity:
+            # Move the pending steps to the front, and grow if they do not fit
+            pending = len(self)
+            capacity = max(capacity, 2 * (pending + n))
+            for key, array in self.arrays.items():
+                new_array = array if capacity == len(array) else np.zeros((capacity,)+array.shape[1:], dtype=array.dtype)
+                new_array[:pending] = array[self.offset:self.size]
+                self.arrays[key] = new_array
+            self.offset, self.size = 0, pending
+        for key, values in steps.items():
+            self.arrays[key][self.size:self.size+n] = values
+        self.size += n
+
+    def pop(self, buffers, index, T):
+        ''' Copy the first T pending steps into the shared buffers
+
+        Args:
+            buffers (dict): The shared buffers of each key
+            index (int): The index of the buffer to write
+            T (int): The unroll length
+        '''
+        for key, array in self.arrays.items():
+            buffers[key][index][...] = torch.from_numpy(array[self.offset:self.offset+T])
+        self.offset += T
+
 def act(
     i,
     device,
@@ -102,57 +168,99 @@ def act(
     full_queue,
     model,
     buffers,
-    env
+    env,
+    num_envs=1,
+    client=None,
+    exp_epsilon=0.01,
+    parameter_store=None,
+    metrics=None,
+    metrics_row=0,
 ):
     try:
         log.info('Device %s Actor %i started.', str(device), i)
 
-        # Configure environment
-        env.seed(i)
-        env.set_agents(model.get_agents())
+        # Configure environment. Several instances are run in lockstep so
+        # that the decisions of all of them are evaluated in one forward pass
+        if num_envs > 1:
+            runner = VecEnv.from_envs([env] + [copy.deepcopy(env) for _ in range(num_envs-1)])
+            runner.seed(i * num_envs)
+        else:
+            runner = env
+            runner.seed(i)
+        # With an inference server, the actor only simulates the games.
+        # Otherwise the actor has its own copy of the model, updated from
+        # the parameter store between the episodes
+        if client is not None:
+            runner.set_agents(client.get_agents(env.num_players, exp_epsilon))
+        else:
+            if parameter_store is not None:
+                model = copy.deepcopy(model)
+            runner.set_agents(model.get_agents())
+        versions = [0 for _ in range(env.num_players)]
+
+        # Count the decisions and measure the time spent in predict
+        metrics_writer = None
+        if metrics is not None:
+            metrics_writer = metrics.writer(metrics_row)
+            runner.set_agents([TimedAgent(agent, metrics_writer) for agent in runner.agents])
 
-        done_buf = [[] for _ in range(env.num_players)]
-        episode_return_buf = [[] for _ in range(env.num_players)]
-        target_buf = [[] for _ in range(env.num_players)]
-        state_buf = [[] for _ in range(env.num_players)]
-        action_buf = [[] for _ in range(env.num_players)]
-        size = [0 for _ in range(env.num_players)]
+        # The features of the actions are gathered from a table by action id
+        action_features = env.get_action_feature_table()
+        staging = []
+        for p in range(env.num_players):
+            staging.append(StagingBuffer(dict(
+                done=((), np.bool_),
+                episode_return=((), np.float32),
+                target=((), np.float32),
+                state=(env.state_shape[p], np.int8),
+                action=(action_features.shape[1:], np.int8),
+            )))
 
         while True:
-            trajectories, payoffs = env.run(is_training=True)
-            for p in range(env.num_players):
-                size[p] += len(trajectories[p][:-1]) // 2
-                diff = size[p] - len(target_buf[p])
-                if diff > 0:
-                    done_buf[p].extend([False for _ in range(diff-1)])
-                    done_buf[p].append(True)
-                    episode_return_buf[p].extend([0.0 for _ in range(diff-1)])
-                    episode_return_buf[p].append(float(payoffs[p]))
-                    target_buf[p].extend([float(payoffs[p]) for _ in range(diff)])
-                    # State and action
-                    for i in range(0, len(trajectories[p])-2, 2):
-                        state = trajectories[p][i]['obs']
-                        action = env.get_action_feature(trajectories[p][i+1])
-                        state_buf[p].append(torch.from_numpy(state))
-                        action_buf[p].append(torch.from_numpy(action))
-                
-                while size[p] > T:
-                    index = free_queue[p].get()
-                    if index is None:
-                        break
-                    for t in range(T):
-                        buffers[p]['done'][index][t, ...] = done_buf[p][t]
-                        buffers[p]['episode_return'][index][t, ...] = episode_return_buf[p][t]
-                        buffers[p]['target'][index][t, ...] = target_buf[p][t]
-                        buffers[p]['state'][index][t, ...] = state_buf[p][t]
-                        buffers[p]['action'][index][t, ...] = action_buf[p][t]
-                    full_queue[p].put(index)
-                    done_buf[p] = done_buf[p][T:]
-                    episode_return_buf[p] = episode_return_buf[p][T:]
-                    target_buf[p] = target_buf[p][T:]
-                    state_buf[p] = state_buf[p][T:]
-                    action_buf[p] = action_buf[p][T:]
-                    size[p] -= T
+            if parameter_store is not None:
+                for p in range(env.num_players):
+                    start = time.perf_counter()
+                    version = parameter_store.pull(p, model.get_agent(p), versions[p])
+                    if metrics_writer is not None and version != versions[p]:
+                        metrics_writer.observe('pull', time.perf_counter() - start)
+                    versions[p] = version
+
+            if metrics_writer is not None:
+                start = time.perf_counter()
+                predict_time = metrics_writer.get('predict_time')
+            if num_envs > 1:
+                games = zip(*runner.run(is_training=True))
+            else:
+                games = [runner.run(is_training=True)]
+            if metrics_writer is not None:
+                elapsed = time.perf_counter() - start
+                metrics_writer.add('env_time', elapsed - (metrics_writer.get('predict_time') - predict_time))
+                metrics_writer.add('episodes', num_envs)
+            for trajectories, payoffs in games:
+                for p in range(env.num_players):
+                    n = len(trajectories[p][:-1]) // 2
+                    if n > 0:
+                        done = np.zeros(n, dtype=np.bool_)
+                        done[-1] = True
+                        episode_return = np.zeros(n, dtype=np.float32)
+                        episode_return[-1] = payoffs[p]
+                        staging[p].append(dict(
+                            done=done,
+                            episode_return=episode_return,
+                            target=np.full(n, payoffs[p], dtype=np.float32),
+                            state=np.stack([trajectories[p][i]['obs'] for i in range(0, 2*n, 2)]),
+                            action=action_features[trajectories[p][1:2*n:2]],
+                        ))
+
+                    while len(staging[p]) > T:
+                        index = free_queue[p].get()
+                        if index is None:
+                            break
+                        staging[p].pop(buffers[p], index, T)
+                        full_queue[p].put(index)
+                        if metrics_writer is not None:
+                            metrics_writer.add('free_gets')
+                            metrics_writer.add('full_puts')
 
     except KeyboardInterrupt:
         pass
@@ -32,7 +32,7 @@ import torch.nn as nn
 from collections import namedtuple
 from copy import deepcopy
 
-from rlcard.utils.utils import remove_illegal
+from rlcard.utils.utils import remove_illegal, n_step_returns
 
 Transition = namedtuple('Transition', ['state', 'action', 'reward', 'next_state', 'legal_actions', 'done'])
 
@@ -56,7 +56,13 @@ class DQNAgent(object):
                  train_every=1,
                  mlp_layers=None,
                  learning_rate=0.00005,
-                 device=None):
+                 device=None,
+                 prioritized_replay=False,
+                 prioritized_replay_alpha=0.6,
+                 prioritized_replay_beta_start=0.4,
+                 prioritized_replay_beta_decay_steps=20000,
+                 prioritized_replay_eps=1e-6,
+                 n_step=1):
 
         '''
         Q-Learning algorithm for off-policy TD control using Function Approximation.
@@ -81,6 +87,16 @@ class DQNAgent(object):
             mlp_layers (list): The layer number and the dimension of each layer in MLP
             learning_rate (float): The learning rate of the DQN agent.
             device (torch.device): whether to use the cpu or gpu
+            prioritized_replay (boolean): Sample the transitions with probabilities
+              proportional to their TD errors instead of uniformly
+            prioritized_replay_alpha (float): How much the priorities are used, 0 being uniform
+            prioritized_replay_beta_start (float): The exponent of the importance sampling
+              weights. It is increased to 1 over time and this is the start value
+            prioritized_replay_beta_decay_steps (int): Number of training steps to increase beta over
+            prioritized_replay_eps (float): Added to the TD errors so that every
+              transition can be sampled
+            n_step (int): The number of steps of the returns. With more than one step,
+              the transitions fed one by one are stored at the end of each episode.
         '''
         self.use_raw = False
         self.replay_memory_init_size = replay_memory_init_size
@@ -90,6 +106,7 @@ class DQNAgent(object):
         self.batch_size = batch_size
         self.num_actions = num_actions
         self.train_every = train_every
+        self.n_step = n_step
 
         # Torch device
         if device is None:
@@ -113,7 +130,16 @@ class DQNAgent(object):
             mlp_layers=mlp_layers, device=self.device)
 
         # Create replay memory
-        self.memory = Memory(replay_memory_size, batch_size)
+        self.prioritized_replay = prioritized_replay
+        if prioritized_replay:
+            self.memory = PrioritizedMemory(replay_memory_size, batch_size, num_actions, state_shape,
+                                            alpha=prioritized_replay_alpha, eps=prioritized_replay_eps)
+            self.betas = np.linspace(prioritized_replay_beta_start, 1.0, prioritized_replay_beta_decay_steps)
+        else:
+            self.memory = Memory(replay_memory_size, batch_size, num_actions, state_shape)
+
+        # The transitions of the current episode, for n-step returns
+        self._episode = []
 
     def feed(self, ts):
         ''' Store data in to replay buffer and train the agent. There are two stages.
@@ -124,12 +150,44 @@ class DQNAgent(object):
             ts (list): a list of 5 elements that represent the transition
         '''
         (state, action, reward, next_state, done) = tuple(ts)
+        if self.n_step > 1:
+            self._episode.append((state['obs'], action, reward, next_state['obs'], list(next_state['legal_actions'].keys()), done))
+            if done:
+                states, actions, rewards, next_states, legal_actions, dones = zip(*self._episode)
+                legal_actions_mask = np.zeros((len(legal_actions), self.num_actions), dtype=bool)
+                for i, _legal_actions in enumerate(legal_actions):
+                    legal_actions_mask[i, _legal_actions] = True
+                self._episode = []
+                self.feed_many((np.stack(states), np.array(actions), np.array(rewards, dtype=np.float32),
+                                np.stack(next_states), legal_actions_mask, np.array(dones)))
+            return
         self.feed_memory(state['obs'], action, reward, next_state['obs'], list(next_state['legal_actions'].keys()), done)
         self.total_t += 1
         tmp = self.total_t - self.replay_memory_init_size
         if tmp>=0 and tmp%self.train_every == 0:
             self.train()
 
+    def feed_many(self, transitions):
+        ''' Store the transitions of complete episodes in to replay buffer and
+            train the agent as many times as `feed` would
+
+        Args:
+            transitions (tuple): A tuple of arrays (states, actions, rewards, next_states,
+              legal_actions, dones), see `rlcard.utils.reorganize_arrays`
+        '''
+        states, actions, rewards, next_states, legal_actions, dones = transitions
+        if len(states) == 0:
+            return
+        if self.n_step > 1:
+            rewards, last = n_step_returns(rewards, dones, self.n_step, self.discount_factor)
+            next_states, legal_actions, dones = next_states[last], legal_actions[last], dones[last]
+        self.memory.save_many(states, actions, rewards, next_states, legal_actions, dones)
+        for _ in range(len(states)):
+            self.total_t += 1
+            tmp = self.total_t - self.replay_memory_init_size
+            if tmp>=0 and tmp%self.train_every == 0:
+                self.train()
+
     def step(self, state):
         ''' Predict the action for genrating training data but
             have the predictions disconnected from the computation graph
@@ -168,6 +226,52 @@ class DQNAgent(object):
 
         return best_action, info
 
+    def step_batch(self, states):
+        ''' Batched version of `step`. The Q-values of all the states
+            are computed with a single forward pass
+
+        Args:
+            states (list): A list of states
+
+        Returns:
+            actions (list): A list of action ids
+        '''
+        masked_q_values = self.predict_batch(states)
+        epsilon = self.epsilons[min(self.total_t, self.epsilon_decay_steps-1)]
+        best_actions = np.argmax(masked_q_values, axis=1)
+        explore = np.random.rand(len(states)) < epsilon
+
+        actions = []
+        for i, state in enumerate(states):
+            if explore[i]:
+                actions.append(np.random.choice(list(state['legal_actions'].keys())))
+            else:
+                actions.append(best_actions[i])
+
+        return actions
+
+    def eval_step_batch(self, states):
+        ''' Batched version of `eval_step`
+
+        Args:
+            states (list): A list of states
+
+        Returns:
+            actions (list): A list of action ids
+            infos (list): A list of dictionaries containing information
+        '''
+        masked_q_values = self.predict_batch(states)
+        best_actions = np.argmax(masked_q_values, axis=1)
+
+        infos = []
+        for state, q_values in zip(states, masked_q_values):
+            legal_actions = list(state['legal_actions'].keys())
+            info = {}
+            info['values'] = {state['raw_legal_actions'][i]: float(q_values[legal_actions[i]]) for i in range(len(legal_actions))}
+            infos.append(info)
+
+        return list(best_actions), infos
+
     def predict(self, state):
         ''' Predict the masked Q-values
 
@@ -185,33 +289,55 @@ class DQNAgent(object):
 
         return masked_q_values
 
+    def predict_batch(self, states):
+        ''' Predict the masked Q-values of a batch of states
+
+        Args:
+            states (list): A list of states
+
+        Returns:
+            q_values (numpy.array): a 2-d array of shape (batch_size, num_actions)
+        '''
+        obs = np.stack([state['obs'] for state in states])
+        q_values = self.q_estimator.predict_nograd(obs)
+
+        rows, cols = [], []
+        for i, state in enumerate(states):
+            legal_actions = list(state['legal_actions'].keys())
+            rows.extend([i] * len(legal_actions))
+            cols.extend(legal_actions)
+        masked_q_values = -np.inf * np.ones((len(states), self.num_actions), dtype=float)
+        masked_q_values[rows, cols] = q_values[rows, cols]
+
+        return masked_q_values
+
     def train(self):
         ''' Train the network
 
         Returns:
             loss (float): The loss of the current batch.
         '''
-        state_batch, action_batch, reward_batch, next_state_batch, legal_actions_batch, done_batch = self.memory.sample()
+        if self.prioritized_replay:
+            beta = self.betas[min(self.train_t, len(self.betas)-1)]
+            state_batch, action_batch, reward_batch, next_state_batch, legal_actions_batch, done_batch, weight_batch, indices = self.memory.sample(beta)
+        else:
+            state_batch, action_batch, reward_batch, next_state_batch, legal_actions_batch, done_batch = self.memory.sample()
+            weight_batch = None
 
         # Calculate best next actions using Q-network (Double DQN)
         q_values_next = self.q_estimator.predict_nograd(next_state_batch)
-        legal_actions = []
-        for b in range(self.batch_size):
-            legal_actions.extend([i + b * self.num_actions for i in legal_actions_batch[b]])
-        masked_q_values = -np.inf * np.ones(self.num_actions * self.batch_size, dtype=float)
-        masked_q_values[legal_actions] = q_values_next.flatten()[legal_actions]
-        masked_q_values = masked_q_values.reshape((self.batch_size, self.num_actions))
+        masked_q_values = np.where(legal_actions_batch, q_values_next, -np.inf)
         best_actions = np.argmax(masked_q_values, axis=1)
 
         # Evaluate best next actions using Target-network (Double DQN)
         q_values_next_target = self.target_estimator.predict_nograd(next_state_batch)
         target_batch = reward_batch + np.invert(done_batch).astype(np.float32) * \
-            self.discount_factor * q_values_next_target[np.arange(self.batch_size), best_actions]
+            self.discount_factor ** self.n_step * q_values_next_target[np.arange(self.batch_size), best_actions]
 
         # Perform gradient descent update
-        state_batch = np.array(state_batch)
-
-        loss = self.q_estimator.update(state_batch, action_batch, target_batch)
+        loss = self.q_estimator.update(state_batch, action_batch, target_batch, weight_batch)
+        if self.prioritized_replay:
+            self.memory.update_priorities(indices, self.q_estimator.td_errors)
         print('\rINFO - Step {}, rl-loss: {}'.format(self.total_t, loss), end='')
 
         # Update the target estimator
@@ -297,7 +423,7 @@ class Estimator(object):
             q_as = self.qnet(s).cpu().numpy()
         return q_as
 
-    def update(self, s, a, y):
+    def update(self, s, a, y, w=None):
         ''' Updates the estimator towards the given targets.
             In this case y is the target-network estimated
             value of the Q-network optimal actions, which
@@ -307,9 +433,11 @@ class Estimator(object):
           s (np.ndarray): (batch, state_shape) state representation
           a (np.ndarray): (batch,) integer sampled actions
           y (np.ndarray): (batch,) value of optimal actions according to Q-target
+          w (np.ndarray): (batch,) importance sampling weights of the samples, or None
 
         Returns:
-          The calculated loss on the batch.
+          The calculated loss on the batch. The TD errors of the batch are
+          kept in `td_errors`.
         '''
         self.optimizer.zero_grad()
 
@@ -325,8 +453,14 @@ class Estimator(object):
         # (batch, num_actions) -> (batch, )
         Q = torch.gather(q_as, dim=-1, index=a.unsqueeze(-1)).squeeze(-1)
 
+        self.td_errors = (y - Q).detach().cpu().numpy()
+
         # update model
-        batch_loss = self.mse_loss(Q, y)
+        if w is None:
+            batch_loss = self.mse_loss(Q, y)
+        else:
+            w = torch.from_numpy(w).float().to(self.device)
+            batch_loss = torch.mean(w * (Q - y) ** 2)
         batch_loss.backward()
         self.optimizer.step()
         batch_loss = batch_loss.item()
@@ -375,16 +509,58 @@ class EstimatorNetwork(nn.Module):
 
 class Memory(object):
     ''' Memory for saving transitions
+
+    The transitions are stored in a ring buffer of preallocated arrays, and
+    the legal actions of the next states are stored as bit-packed masks.
     '''
 
-    def __init__(self, memory_size, batch_size):
+    def __init__(self, memory_size, batch_size, num_actions=None, state_shape=None):
         ''' Initialize
         Args:
             memory_size (int): the size of the memroy buffer
+            batch_size (int): the size of the sampled batches
+            num_actions (int): the number of actions. If None, the masks are
+              widened to the largest legal action saved so far.
+            state_shape (list): the shape of the states. The buffer is allocated
+              when the first transition is saved if None.
         '''
         self.memory_size = memory_size
         self.batch_size = batch_size
-        self.memory = []
+        self.num_actions = num_actions
+        self._infer_num_actions = num_actions is None
+
+        # The position of the next transition and the number of stored transitions
+        self.pointer = 0
+        self.size = 0
+
+        self.states = None
+        if state_shape is not None:
+            self._allocate(state_shape)
+
+    def __len__(self):
+        return self.size
+
+    def _allocate(self, state_shape):
+        ''' Allocate the arrays of the buffer
+        '''
+        self.states = np.zeros((self.memory_size, *state_shape), dtype=np.float32)
+        self.actions = np.zeros(self.memory_size, dtype=np.int64)
+        self.rewards = np.zeros(self.memory_size, dtype=np.float32)
+        self.next_states = np.zeros((self.memory_size, *state_shape), dtype=np.float32)
+        self.legal_actions = np.zeros((self.memory_size, ((self.num_actions or 0) + 7) // 8), dtype=np.uint8)
+        self.dones = np.zeros(self.memory_size, dtype=bool)
+
+    def _fit_num_actions(self, num_actions):
+        ''' Widen the masks of the legal actions to num_actions, when the
+            number of actions is inferred
+        '''
+        if not self._infer_num_actions or (self.num_actions is not None and num_actions <= self.num_actions):
+            return
+        self.num_actions = num_actions
+        # The bits are packed from the first column, so the new actions are zero columns at the end
+        width = (num_actions + 7) // 8 - self.legal_actions.shape[1]
+        if width > 0:
+            self.legal_actions = np.pad(self.legal_actions, ((0, 0), (0, width)), 'constant')
 
     def save(self, state, action, reward, next_state, legal_actions, done):
         ''' Save transition into memory
@@ -397,20 +573,168 @@ class Memory(object):
             legal_actions (list): the legal actions of the next state
             done (boolean): whether the episode is finished
         '''
-        if len(self.memory) == self.memory_size:
-            self.memory.pop(0)
-        transition = Transition(state, action, reward, next_state, legal_actions, done)
-        self.memory.append(transition)
+        if self.states is None:
+            self._allocate(np.shape(state))
+        self._fit_num_actions(max(legal_actions, default=-1) + 1)
+        i = self.pointer
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        mask = np.zeros(self.num_actions, dtype=bool)
+        mask[legal_actions] = True
+        self.legal_actions[i] = np.packbits(mask)
+        self.dones[i] = done
+
+        self.pointer = (self.pointer + 1) % self.memory_size
+        self.size = min(self.size + 1, self.memory_size)
+
+    def save_many(self, states, actions, rewards, next_states, legal_actions, dones):
+        ''' Save a batch of transitions into memory
+
+        Args:
+            states (numpy.array): the current states
+            actions (numpy.array): the performed action IDs
+            rewards (numpy.array): the rewards received
+            next_states (numpy.array): the next states after performing the actions
+            legal_actions (numpy.array): boolean masks of the legal actions of the next states
+            dones (numpy.array): whether the episodes are finished
+
+        Returns:
+            (numpy.array): the indices of the transitions in the memory
+        '''
+        if self.states is None:
+            self._allocate(states.shape[1:])
+        self._fit_num_actions(legal_actions.shape[1])
+        # Only the last memory_size transitions fit in the memory
+        start = max(len(states) - self.memory_size, 0)
+        indices = (self.pointer + np.arange(len(states) - start)) % self.memory_size
+        self.states[indices] = states[start:]
+        self.actions[indices] = actions[start:]
+        self.rewards[indices] = rewards[start:]
+        self.next_states[indices] = next_states[start:]
+        self.legal_actions[indices] = np.packbits(legal_actions[start:], axis=1)
+        self.dones[indices] = dones[start:]
+
+        self.pointer = (self.pointer + len(indices)) % self.memory_size
+        self.size = min(self.size + len(indices), self.memory_size)
+        return indices
 
     def sample(self):
         ''' Sample a minibatch from the replay memory
 
         Returns:
-            state_batch (list): a batch of states
-            action_batch (list): a batch of actions
-            reward_batch (list): a batch of rewards
-            next_state_batch (list): a batch of states
-            done_batch (list): a batch of dones
+            state_batch (numpy.array): a batch of states
+            action_batch (numpy.array): a batch of actions
+            reward_batch (numpy.array): a batch of rewards
+            next_state_batch (numpy.array): a batch of states
+            legal_actions_batch (numpy.array): a batch of boolean masks of the legal actions
+            done_batch (numpy.array): a batch of dones
+        '''
+        idx = np.array(random.sample(range(self.size), self.batch_size))
+        legal_actions_batch = np.unpackbits(self.legal_actions[idx], axis=1)[:, :self.num_actions].astype(bool)
+        return self.states[idx], self.actions[idx], self.rewards[idx], self.next_states[idx], legal_actions_batch, self.dones[idx]
+
+class PrioritizedMemory(Memory):
+    ''' Memory for saving transitions that samples them with probabilities
+        proportional to their priorities, see https://arxiv.org/abs/1511.05952
+
+    The priorities are stored in the leaves of an array sum-tree, whose
+    internal nodes hold the sum of their children, so that updating a
+    priority and sampling a transition are O(log n). Both operate on whole
+    batches, one tree level at a time.
+    '''
+
+    def __init__(self, memory_size, batch_size, num_actions=None, state_shape=None, alpha=0.6, eps=1e-6):
+        ''' Initialize
+        Args:
+            memory_size (int): the size of the memroy buffer
+            batch_size (int): the size of the sampled batches
+            num_actions (int): the number of actions, see `Memory`
+            state_shape (list): the shape of the states
+            alpha (float): the exponent of the priorities
+            eps (float): added to the TD errors before computing the priorities
+        '''
+        super().__init__(memory_size, batch_size, num_actions, state_shape)
+        self.alpha = alpha
+        self.eps = eps
+
+        # Node i has children 2i and 2i+1, and the leaves start at the number of leaves
+        self.num_leaves = 1
+        while self.num_leaves < memory_size:
+            self.num_leaves *= 2
+        self.tree = np.zeros(2 * self.num_leaves)
+        self.max_priority = 1.0
+
+    def save(self, state, action, reward, next_state, legal_actions, done):
+        ''' Save transition into memory with the highest priority so far,
+            see `Memory.save`
+        '''
+        i = self.pointer
+        super().save(state, action, reward, next_state, legal_actions, done)
+        self._set_priorities(np.array([i]), np.array([self.max_priority]))
+
+    def save_many(self, states, actions, rewards, next_states, legal_actions, dones):
+        ''' Save a batch of transitions into memory with the highest priority
+            so far, see `Memory.save_many`
+        '''
+        indices = super().save_many(states, actions, rewards, next_states, legal_actions, dones)
+        self._set_priorities(indices, np.full(len(indices), self.max_priority))
+        return indices
+
+    def sample(self, beta):
+        ''' Sample a minibatch from the replay memory
+
+        Args:
+            beta (float): the exponent of the importance sampling weights
+
+        Returns:
+            state_batch (numpy.array): a batch of states
+            action_batch (numpy.array): a batch of actions
+            reward_batch (numpy.array): a batch of rewards
+            next_state_batch (numpy.array): a batch of states
+            legal_actions_batch (numpy.array): a batch of boolean masks of the legal actions
+            done_batch (numpy.array): a batch of dones
+            weight_batch (numpy.array): the importance sampling weights, normalized by their maximum
+            indices (numpy.array): the indices of the transitions, to update their priorities
+        '''
+        # Stratified sampling: one sample from each of batch_size equal segments of the total priority
+        total = self.tree[1]
+        targets = (np.arange(self.batch_size) + np.random.random_sample(self.batch_size)) * total / self.batch_size
+        node = np.ones(self.batch_size, dtype=np.int64)
+        while node[0] < self.num_leaves:
+            left = 2 * node
+            go_right = targets > self.tree[left]
+            targets -= self.tree[left] * go_right
+            node = left + go_right
+        # Rounding errors may reach the empty leaves at the end
+        indices = np.minimum(node - self.num_leaves, self.size - 1)
+
+        probs = self.tree[indices + self.num_leaves] / total
+        weight_batch = (self.size * probs) ** -beta
+        weight_batch /= weight_batch.max()
+
+        legal_actions_batch = np.unpackbits(self.legal_actions[indices], axis=1)[:, :self.num_actions].astype(bool)
+        return (self.states[indices], self.actions[indices], self.rewards[indices], self.next_states[indices],
+                legal_actions_batch, self.dones[indices], weight_batch.astype(np.float32), indices)
+
+    def update_priorities(self, indices, td_errors):
+        ''' Update the priorities of sampled transitions
+
+        Args:
+            indices (numpy.array): the indices returned by `sample`
+            td_errors (numpy.array): the TD errors of the transitions
+        '''
+        priorities = (np.abs(td_errors) + self.eps) ** self.alpha
+        self.max_priority = max(self.max_priority, priorities.max())
+        self._set_priorities(indices, priorities)
+
+    def _set_priorities(self, indices, priorities):
+        ''' Set the leaves and update their ancestors
         '''
-        samples = random.sample(self.memory, self.batch_size)
-        return map(np.array, zip(*samples))
+        node = indices + self.num_leaves
+        self.tree[node] = priorities
+        node = np.unique(node // 2)
+        while len(node) > 0 and node[0] >= 1:
+            self.tree[node] = self.tree[2 * node] + self.tree[2 * node + 1]
+            node = np.unique(node // 2)
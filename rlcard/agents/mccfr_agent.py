@@ -0,0 +1,142 @@
+import time
+
+import numpy as np
+
+from rlcard.agents.cfr_agent import CFRAgent
+from rlcard.utils.utils import *
+
+class MCCFRAgent(CFRAgent):
+    ''' Implement Monte Carlo CFR with external sampling or outcome sampling
+
+    See http://mlanctot.info/files/papers/nips09mccfr.pdf for more details.
+    Instead of expanding every legal action at every node, each iteration
+    walks the tree of one sampled deal and samples the actions of the
+    opponents (external sampling) or of all the players (outcome sampling).
+    The regrets and policies are stored in the same table as CFRAgent, and
+    the policy of an information set is updated when it is visited.
+    '''
+
+    def __init__(self, env, model_path='./mccfr_model', sampling='external', epsilon=0.6):
+        ''' Initilize Agent
+
+        Args:
+            env (Env): Env class
+            model_path (str): The path to save and load the model
+            sampling (str): 'external' or 'outcome'
+            epsilon (float): The exploration of the sampling policy of the
+              traverser in outcome sampling
+        '''
+        if sampling not in ['external', 'outcome']:
+            raise ValueError("'sampling' should be either 'external' or 'outcome'.")
+        super().__init__(env, model_path)
+        self.sampling = sampling
+        self.epsilon = epsilon
+
+        # Total time spent in training, to report the speed
+        self.train_time = 0.
+
+    @property
+    def iterations_per_second(self):
+        ''' The average number of training iterations per second
+        '''
+        if self.train_time == 0:
+            return 0.
+        return self.iteration / self.train_time
+
+    def train(self):
+        ''' Do one iteration of MCCFR
+        '''
+        start = time.time()
+        self.iteration += 1
+        for player_id in range(self.env.num_players):
+            self.env.reset()
+            if self.sampling == 'external':
+                self.traverse_external(player_id)
+            else:
+                self.traverse_outcome(player_id, 1., 1., 1.)
+        self.train_time += time.time() - start
+
+    def traverse_external(self, player_id):
+        ''' Traverse the game tree with external sampling, update the regrets
+            of the player and the average policy of the opponents
+
+        Args:
+            player_id: The player to update the value
+
+        Returns:
+            (float): The sampled utility of the player
+        '''
+        if self.env.is_over():
+            return self.env.get_payoffs()[player_id]
+
+        current_player = self.env.get_player_id()
+        obs, legal_actions = self.get_state(current_player)
+        idx = self.table.intern(obs)
+        action_probs = remove_illegal(self.table.regret_matching(idx), legal_actions)
+
+        if not current_player == player_id:
+            self.table.average_policy[idx, legal_actions] += action_probs[legal_actions]
+            action = np.random.choice(len(action_probs), p=action_probs)
+            self.env.step(action)
+            utility = self.traverse_external(player_id)
+            self.env.step_back()
+            return utility
+
+        utilities = np.zeros(len(legal_actions))
+        for i, action in enumerate(legal_actions):
+            self.env.step(action)
+            utilities[i] = self.traverse_external(player_id)
+            self.env.step_back()
+
+        state_utility = np.dot(action_probs[legal_actions], utilities)
+        self.table.regrets[idx, legal_actions] += utilities - state_utility
+        return state_utility
+
+    def traverse_outcome(self, player_id, my_reach, opp_reach, sample_reach):
+        ''' Sample one path of the game tree with outcome sampling, update the
+            regrets and the average policy of the player
+
+        Args:
+            player_id: The player to update the value
+            my_reach (float): The reach probability of the player
+            opp_reach (float): The reach probability of the opponents
+            sample_reach (float): The probability of sampling the path
+
+        Returns:
+            (float): The estimated utility of the player
+        '''
+        if self.env.is_over():
+            return self.env.get_payoffs()[player_id]
+
+        current_player = self.env.get_player_id()
+        obs, legal_actions = self.get_state(current_player)
+        idx = self.table.intern(obs)
+        action_probs = remove_illegal(self.table.regret_matching(idx), legal_actions)
+
+        # The player explores with probability epsilon
+        if current_player == player_id:
+            sample_probs = np.zeros(len(action_probs))
+            sample_probs[legal_actions] = self.epsilon / len(legal_actions)
+            sample_probs += (1 - self.epsilon) * action_probs
+        else:
+            sample_probs = action_probs
+        action = np.random.choice(len(sample_probs), p=sample_probs)
+
+        if current_player == player_id:
+            new_my_reach, new_opp_reach = my_reach * action_probs[action], opp_reach
+        else:
+            new_my_reach, new_opp_reach = my_reach, opp_reach * action_probs[action]
+        self.env.step(action)
+        utility = self.traverse_outcome(player_id, new_my_reach, new_opp_reach, sample_reach * sample_probs[action])
+        self.env.step_back()
+
+        # Only the sampled action has a non-zero estimated utility
+        action_utility = utility / sample_probs[action]
+        state_utility = action_probs[action] * action_utility
+
+        if current_player == player_id:
+            regrets = -state_utility * np.ones(len(legal_actions))
+            regrets[legal_actions.index(action)] += action_utility
+            self.table.regrets[idx, legal_actions] += regrets * opp_reach / sample_reach
+            self.table.average_policy[idx, legal_actions] += my_reach * action_probs[legal_actions] / sample_reach
+        return state_utility
@@ -45,6 +45,7 @@ class NFSPAgent(object):
                  state_shape=None,
                  hidden_layers_sizes=None,
                  reservoir_buffer_capacity=20000,
+                 reservoir_buffer_probs_dtype=np.float32,
                  anticipatory_param=0.1,
                  batch_size=256,
                  train_every=1,
@@ -61,6 +62,7 @@ class NFSPAgent(object):
                  q_batch_size=32,
                  q_train_every=1,
                  q_mlp_layers=None,
+                 q_n_step=1,
                  evaluate_with='average_policy',
                  device=None):
         ''' Initialize the NFSP agent.
@@ -71,6 +73,8 @@ class NFSPAgent(object):
             hidden_layers_sizes (list): The hidden layers sizes for the layers of
               the average policy.
             reservoir_buffer_capacity (int): The size of the buffer for average policy.
+            reservoir_buffer_probs_dtype (numpy.dtype): The type of the action probabilities
+              stored in the buffer, e.g., np.float16 to halve their memory.
             anticipatory_param (float): The hyper-parameter that balances rl/avarage policy.
             batch_size (int): The batch_size for training average policy.
             train_every (int): Train the SL policy every X steps.
@@ -88,6 +92,7 @@ class NFSPAgent(object):
             q_batch_size (int): The batch size of inner DQN agent.
             q_train_step (int): Train the model every X steps.
             q_mlp_layers (list): The layer sizes of inner DQN agent.
+            q_n_step (int): The number of steps of the returns of inner DQN agent.
             device (torch.device): Whether to use the cpu or gpu
         '''
         self.use_raw = False
@@ -100,7 +105,10 @@ class NFSPAgent(object):
         self._anticipatory_param = anticipatory_param
         self._min_buffer_size_to_learn = min_buffer_size_to_learn
 
-        self._reservoir_buffer = ReservoirBuffer(reservoir_buffer_capacity)
+        self._reservoir_buffer = ReservoirBuffer(reservoir_buffer_capacity, state_shape, num_actions, reservoir_buffer_probs_dtype)
+        # The transitions of the best response policy not yet in the reservoir buffer
+        self._pending_states = []
+        self._pending_probs = []
         self._prev_timestep = None
         self._prev_action = None
         self.evaluate_with = evaluate_with
@@ -120,7 +128,7 @@ class NFSPAgent(object):
         self._rl_agent = DQNAgent(q_replay_memory_size, q_replay_memory_init_size, \
             q_update_target_estimator_every, q_discount_factor, q_epsilon_start, q_epsilon_end, \
             q_epsilon_decay_steps, q_batch_size, num_actions, state_shape, q_train_every, q_mlp_layers, \
-            rl_learning_rate, device)
+            rl_learning_rate, device, n_step=q_n_step)
 
         # Build the average policy supervised model
         self._build_model()
@@ -151,12 +159,27 @@ class NFSPAgent(object):
         Args:
             ts (list): A list of 5 elements that represent the transition.
         '''
+        self._flush_transitions()
         self._rl_agent.feed(ts)
         self.total_t += 1
         if self.total_t>0 and len(self._reservoir_buffer) >= self._min_buffer_size_to_learn and self.total_t%self._train_every == 0:
             sl_loss  = self.train_sl()
             print('\rINFO - Step {}, sl-loss: {}'.format(self.total_t, sl_loss), end='')
 
+    def feed_many(self, transitions):
+        ''' Feed the transitions of complete episodes to inner RL agent
+
+        Args:
+            transitions (tuple): A tuple of arrays, see `DQNAgent.feed_many`
+        '''
+        self._flush_transitions()
+        self._rl_agent.feed_many(transitions)
+        for _ in range(len(transitions[0])):
+            self.total_t += 1
+            if self.total_t>0 and len(self._reservoir_buffer) >= self._min_buffer_size_to_learn and self.total_t%self._train_every == 0:
+                sl_loss  = self.train_sl()
+                print('\rINFO - Step {}, sl-loss: {}'.format(self.total_t, sl_loss), end='')
+
     def step(self, state):
         ''' Returns the action to be taken.
 
@@ -181,6 +204,52 @@ class NFSPAgent(object):
 
         return action
 
+    def step_batch(self, states):
+        ''' Batched version of `step`. The policy of the current
+            episode is evaluated with a single forward pass
+
+        Args:
+            states (list): A list of states
+
+        Returns:
+            actions (list): A list of action ids
+        '''
+        if self._mode == 'best_response':
+            actions = self._rl_agent.step_batch(states)
+            for state, action in zip(states, actions):
+                one_hot = np.zeros(self._num_actions)
+                one_hot[action] = 1
+                self._add_transition(state['obs'], one_hot)
+
+        elif self._mode == 'average_policy':
+            actions = self._average_policy_batch(states)[0]
+
+        return actions
+
+    def eval_step_batch(self, states):
+        ''' Batched version of `eval_step`
+
+        Args:
+            states (list): A list of states
+
+        Returns:
+            actions (list): A list of action ids
+            infos (list): A list of dictionaries containing information
+        '''
+        if self.evaluate_with == 'best_response':
+            return self._rl_agent.eval_step_batch(states)
+        elif self.evaluate_with == 'average_policy':
+            actions, batch_probs = self._average_policy_batch(states)
+            infos = []
+            for state, probs in zip(states, batch_probs):
+                legal_actions = list(state['legal_actions'].keys())
+                info = {}
+                info['probs'] = {state['raw_legal_actions'][i]: float(probs[legal_actions[i]]) for i in range(len(legal_actions))}
+                infos.append(info)
+            return actions, infos
+        else:
+            raise ValueError("'evaluate_with' should be either 'average_policy' or 'best_response'.")
+
     def eval_step(self, state):
         ''' Use the average policy for evaluation purpose
 
@@ -222,18 +291,46 @@ class NFSPAgent(object):
         Returns:
             action_probs (numpy.array): The predicted action probability.
         '''
-        info_state = np.expand_dims(info_state, axis=0)
-        info_state = torch.from_numpy(info_state).float().to(self.device)
+        return self._act_batch(np.expand_dims(info_state, axis=0))[0]
+
+    def _act_batch(self, info_states):
+        ''' Predict action probabilities of a batch of observations
+            Not connected to computation graph
+        Args:
+            info_states (numpy.array): A batch of obervations.
+
+        Returns:
+            action_probs (numpy.array): The predicted action probabilities, of shape (batch_size, num_actions).
+        '''
+        info_states = torch.from_numpy(info_states).float().to(self.device)
 
         with torch.no_grad():
-            log_action_probs = self.policy_network(info_state).cpu().numpy()
+            log_action_probs = self.policy_network(info_states).cpu().numpy()
+
+        return np.exp(log_action_probs)
 
-        action_probs = np.exp(log_action_probs)[0]
+    def _average_policy_batch(self, states):
+        ''' Sample actions from the average policy for a batch of states
 
-        return action_probs
+        Args:
+            states (list): A list of states
+
+        Returns:
+            (tuple) that contains:
+                actions (list): A list of action ids
+                probs (list): The action probabilities without illegal actions
+        '''
+        batch_probs = self._act_batch(np.stack([state['obs'] for state in states]))
+        actions, probs_list = [], []
+        for state, probs in zip(states, batch_probs):
+            probs = remove_illegal(probs, list(state['legal_actions'].keys()))
+            actions.append(np.random.choice(len(probs), p=probs))
+            probs_list.append(probs)
+        return actions, probs_list
 
     def _add_transition(self, state, probs):
-        ''' Adds the new transition to the reservoir buffer.
+        ''' Adds the new transition to the reservoir buffer. The transitions
+            are added in bulk by the next `feed`, or once a batch is pending.
 
         Transitions are in the form (state, probs).
 
@@ -241,10 +338,18 @@ class NFSPAgent(object):
             state (numpy.array): The state.
             probs (numpy.array): The probabilities of each action.
         '''
-        transition = Transition(
-                info_state=state,
-                action_probs=probs)
-        self._reservoir_buffer.add(transition)
+        self._pending_states.append(state)
+        self._pending_probs.append(probs)
+        if len(self._pending_states) >= self._batch_size:
+            self._flush_transitions()
+
+    def _flush_transitions(self):
+        ''' Adds the pending transitions to the reservoir buffer
+        '''
+        if self._pending_states:
+            self._reservoir_buffer.add_many(np.stack(self._pending_states), np.stack(self._pending_probs))
+            self._pending_states = []
+            self._pending_probs = []
 
     def train_sl(self):
         ''' Compute the loss on sampled transitions and perform a avg-network update.
@@ -259,18 +364,16 @@ class NFSPAgent(object):
                 len(self._reservoir_buffer) < self._min_buffer_size_to_learn):
             return None
 
-        transitions = self._reservoir_buffer.sample(self._batch_size)
-        info_states = [t.info_state for t in transitions]
-        action_probs = [t.action_probs for t in transitions]
+        info_states, action_probs = self._reservoir_buffer.sample(self._batch_size)
 
         self.policy_network_optimizer.zero_grad()
         self.policy_network.train()
 
         # (batch, state_size)
-        info_states = torch.from_numpy(np.array(info_states)).float().to(self.device)
+        info_states = torch.from_numpy(info_states).float().to(self.device)
 
         # (batch, num_actions)
-        eval_action_probs = torch.from_numpy(np.array(action_probs)).float().to(self.device)
+        eval_action_probs = torch.from_numpy(action_probs).float().to(self.device)
 
         # (batch, num_actions)
         log_forecast_action_probs = self.policy_network(info_states)
@@ -337,32 +440,74 @@ class AveragePolicyNetwork(nn.Module):
 class ReservoirBuffer(object):
     ''' Allows uniform sampling over a stream of data.
 
-    This class supports the storage of arbitrary elements, such as observation
-    tensors, integer actions, etc.
+    This class stores (observation, action probabilities) transitions in
+    preallocated arrays.
 
     See https://en.wikipedia.org/wiki/Reservoir_sampling for more details.
     '''
 
-    def __init__(self, reservoir_buffer_capacity):
+    def __init__(self, reservoir_buffer_capacity, state_shape=None, num_actions=None, probs_dtype=np.float32):
         ''' Initialize the buffer.
+
+        Args:
+            reservoir_buffer_capacity (int): The maximum number of transitions
+            state_shape (list): The shape of the observations. The arrays are
+              allocated by the first addition if None.
+            num_actions (int): The number of actions
+            probs_dtype (numpy.dtype): The type of the stored action probabilities
         '''
         self._reservoir_buffer_capacity = reservoir_buffer_capacity
-        self._data = []
+        self._probs_dtype = probs_dtype
+        self._num_actions = num_actions
+        self._size = 0
         self._add_calls = 0
 
+        self._info_states = None
+        if state_shape is not None and num_actions is not None:
+            self._allocate(state_shape)
+
+    def _allocate(self, state_shape):
+        ''' Allocate the arrays of the buffer
+        '''
+        self._info_states = np.zeros((self._reservoir_buffer_capacity, *state_shape), dtype=np.float32)
+        self._action_probs = np.zeros((self._reservoir_buffer_capacity, self._num_actions), dtype=self._probs_dtype)
+
     def add(self, element):
         ''' Potentially adds `element` to the reservoir buffer.
 
         Args:
-            element (object): data to be added to the reservoir buffer.
+            element (Transition): data to be added to the reservoir buffer.
         '''
-        if len(self._data) < self._reservoir_buffer_capacity:
-            self._data.append(element)
-        else:
-            idx = np.random.randint(0, self._add_calls + 1)
-            if idx < self._reservoir_buffer_capacity:
-                self._data[idx] = element
-        self._add_calls += 1
+        self.add_many(np.expand_dims(element.info_state, 0), np.expand_dims(element.action_probs, 0))
+
+    def add_many(self, info_states, action_probs):
+        ''' Potentially adds a batch of transitions to the reservoir buffer,
+            as if they were added one by one.
+
+        Args:
+            info_states (numpy.array): The observations, of shape (batch_size, *state_shape)
+            action_probs (numpy.array): The action probabilities, of shape (batch_size, num_actions)
+        '''
+        if self._info_states is None:
+            self._num_actions = action_probs.shape[1]
+            self._allocate(info_states.shape[1:])
+
+        # The first transitions fill the buffer
+        num_free = min(self._reservoir_buffer_capacity - self._size, len(info_states))
+        self._info_states[self._size:self._size+num_free] = info_states[:num_free]
+        self._action_probs[self._size:self._size+num_free] = action_probs[:num_free]
+        self._size += num_free
+
+        # The i-th of the other transitions replaces a random one with probability capacity / (add_calls + i + 1)
+        idx = np.random.randint(0, self._add_calls + np.arange(num_free, len(info_states)) + 1)
+        replaced = np.flatnonzero(idx < self._reservoir_buffer_capacity)
+        if len(replaced) > 0:
+            # Only the last of the transitions replacing the same slot is kept
+            slots, last = np.unique(idx[replaced][::-1], return_index=True)
+            sources = num_free + replaced[::-1][last]
+            self._info_states[slots] = info_states[sources]
+            self._action_probs[slots] = action_probs[sources]
+        self._add_calls += len(info_states)
 
     def sample(self, num_samples):
         ''' Returns `num_samples` uniformly sampled from the buffer.
@@ -371,25 +516,26 @@ class ReservoirBuffer(object):
             num_samples (int): The number of samples to draw.
 
         Returns:
-            An iterable over `num_samples` random elements of the buffer.
+            (tuple): The sampled observations and action probabilities
 
         Raises:
             ValueError: If there are less than `num_samples` elements in the buffer
         '''
-        if len(self._data) < num_samples:
+        if self._size < num_samples:
             raise ValueError("{} elements could not be sampled from size {}".format(
-                    num_samples, len(self._data)))
-        return random.sample(self._data, num_samples)
+                    num_samples, self._size))
+        idx = np.array(random.sample(range(self._size), num_samples))
+        return self._info_states[idx], self._action_probs[idx]
 
     def clear(self):
         ''' Clear the buffer
         '''
-        self._data = []
+        self._size = 0
         self._add_calls = 0
 
     def __len__(self):
-        return len(self._data)
+        return self._size
 
     def __iter__(self):
-        return iter(self._data)
-
+        for i in range(self._size):
+            yield Transition(info_state=self._info_states[i], action_probs=self._action_probs[i])
@@ -0,0 +1,216 @@
+import multiprocessing
+import queue
+import traceback
+
+import numpy as np
+
+from rlcard.agents.cfr_agent import CFRAgent
+from rlcard.utils.exploitability import DEALS
+
+class ParallelCFRAgent(CFRAgent):
+    ''' Run the iterations of CFR in several worker processes
+
+    Each iteration traverses the game tree of every deal (chance outcome at
+    the root) instead of one sampled deal, and the deals are split
+    statically among the workers. Before the workers are forked, all the
+    information sets are added to the table, so that every process agrees on
+    the row ids. The current policy is kept in shared memory and read by the
+    workers. Each worker accumulates the regret and average policy updates of
+    its deals into its own shared-memory arrays, which are summed into the
+    table by the master process at the end of the iteration.
+    '''
+
+    def __init__(self, env, model_path='./cfr_model', variant='vanilla', alpha=1.5, beta=0., gamma=2., num_workers=2, deals=None, poll_interval=1.):
+        ''' Initilize Agent
+
+        Args:
+            env (Env): Env class
+            model_path (str): The path to save and load the model
+            variant (str): The CFR variant, see `CFRAgent`
+            alpha (float): The discount exponent of positive regrets in DCFR
+            beta (float): The discount exponent of negative regrets in DCFR
+            gamma (float): The discount exponent of the average policy in DCFR
+            num_workers (int): The number of worker processes
+            deals (list): A list of (probability, set_deal) tuples, see
+              `rlcard.utils.exploitability.GameTree`. The deals of the game
+              are used if None.
+            poll_interval (float): How many seconds `train` waits for a worker
+              before checking that the workers are alive
+        '''
+        super().__init__(env, model_path, variant, alpha, beta, gamma)
+        if deals is None:
+            if env.name not in DEALS:
+                raise ValueError("The deals of '{}' are unknown, please provide them.".format(env.name))
+            deals = DEALS[env.name](env)
+        self.deals = deals
+        self.num_workers = num_workers
+        self.poll_interval = poll_interval
+
+        # The workers are started by the first iteration, after the model is loaded
+        self._workers = []
+        self._task_queues = []
+
+    def train(self):
+        ''' Do one iteration of CFR over all the deals
+        '''
+        if not self._workers:
+            self._start()
+        self.iteration += 1
+
+        # CFR+ updates the policy after the traversal of each player
+        if self.variant == 'cfr+':
+            phases = [[player_id] for player_id in range(self.env.num_players)]
+        else:
+            phases = [list(range(self.env.num_players))]
+
+        n = self._num_rows
+        for player_ids in phases:
+            for task_queue in self._task_queues:
+                task_queue.put((self.iteration, player_ids))
+            done = [False] * self.num_workers
+            while not all(done):
+                try:
+                    worker_id, result = self._result_queue.get(timeout=self.poll_interval)
+                except queue.Empty:
+                    # A worker killed by a signal or the OOM killer never reports
+                    for worker_id, worker in enumerate(self._workers):
+                        if not done[worker_id] and not worker.is_alive():
+                            exitcode = worker.exitcode
+                            self.close()
+                            raise RuntimeError('Worker {} died with exit code {}'.format(worker_id, exitcode))
+                    continue
+                if result is not None:
+                    self.close()
+                    raise RuntimeError('Worker {} failed:\n{}'.format(worker_id, result))
+                done[worker_id] = True
+
+            self.table.regrets[:n] += self._regret_deltas.sum(axis=0)
+            self.table.average_policy[:n] += self._average_deltas.sum(axis=0)
+            if self.variant == 'cfr+':
+                self.table.floor_regrets()
+                self.update_policy()
+
+        if self.variant in ['linear', 'dcfr']:
+            t = self.iteration
+            self.table.discount(t**self.alpha / (t**self.alpha + 1),
+                                t**self.beta / (t**self.beta + 1),
+                                (t / (t + 1))**self.gamma)
+
+        if self.variant != 'cfr+':
+            self.update_policy()
+
+    def update_policy(self):
+        ''' Update policy based on the current regrets, and share it with the workers
+        '''
+        self.table.update_policy()
+        if self._workers:
+            self._policy[:] = self.table.policy[:self._num_rows]
+
+    def load(self, mmap_mode=None):
+        ''' Load model. The workers are restarted by the next iteration.
+
+        Args:
+            mmap_mode (str): See `CFRAgent.load`
+        '''
+        self.close()
+        super().load(mmap_mode)
+
+    def close(self):
+        ''' Stop the workers
+        '''
+        for task_queue in self._task_queues:
+            task_queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout=1)
+            if worker.is_alive():
+                worker.terminate()
+        self._task_queues = []
+        self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def _start(self):
+        ''' Add all the information sets to the table, allocate the shared
+            arrays and fork the workers
+        '''
+        for _, set_deal in self.deals:
+            self.env.reset()
+            set_deal(self.env)
+            self._intern_tree()
+        self._num_rows = n = len(self.table)
+        shape = (n, self.env.num_actions)
+
+        ctx = multiprocessing.get_context('fork')
+        self._policy = _shared_array(ctx, shape)
+        self._policy[:] = self.table.policy[:n]
+        self._regret_deltas = _shared_array(ctx, (self.num_workers,) + shape)
+        self._average_deltas = _shared_array(ctx, (self.num_workers,) + shape)
+
+        self._result_queue = ctx.Queue()
+        self._task_queues = []
+        for worker_id in range(self.num_workers):
+            task_queue = ctx.Queue()
+            worker = ctx.Process(
+                target=_worker,
+                args=(worker_id, self, self.deals[worker_id::self.num_workers], task_queue, self._result_queue),
+                daemon=True,
+            )
+            worker.start()
+            self._task_queues.append(task_queue)
+            self._workers.append(worker)
+
+    def _intern_tree(self):
+        ''' Add the information sets of the subtree of the current node to the table
+        '''
+        if self.env.is_over():
+            return
+        obs, legal_actions = self.get_state(self.env.get_player_id())
+        self.table.intern(obs)
+        for action in legal_actions:
+            self.env.step(action)
+            self._intern_tree()
+            self.env.step_back()
+
+def _shared_array(ctx, shape):
+    ''' Allocate a zero float64 array in shared memory
+    '''
+    return np.frombuffer(ctx.RawArray('d', int(np.prod(shape))), dtype=np.float64).reshape(shape)
+
+def _worker(worker_id, agent, deals, task_queue, result_queue):
+    ''' The loop of a worker process. Each task is a tuple (iteration, player_ids).
+        The regret and average policy updates of the deals of the worker are
+        written to its shared arrays, then None is put in the result queue.
+    '''
+    try:
+        # The table of the worker reads the shared policy and writes the updates
+        table = agent.table
+        n = agent._num_rows
+        table.policy = agent._policy
+        table.regrets = agent._regret_deltas[worker_id]
+        table.average_policy = agent._average_deltas[worker_id]
+        num_players = agent.env.num_players
+
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            agent.iteration, player_ids = task
+            table.regrets[:] = 0
+            table.average_policy[:] = 0
+            for player_id in player_ids:
+                for prob, set_deal in deals:
+                    agent.env.reset()
+                    set_deal(agent.env)
+                    # The probability of the deal weights the counterfactual reach of the player
+                    probs = np.ones(num_players)
+                    probs[(player_id + 1) % num_players] = prob
+                    agent.traverse_tree(probs, player_id)
+            if len(table) != n:
+                raise RuntimeError('An information set was not found in the table.')
+            result_queue.put((worker_id, None))
+    except Exception:
+        result_queue.put((worker_id, traceback.format_exc()))
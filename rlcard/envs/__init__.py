@@ -2,6 +2,7 @@
 '''
 from rlcard.envs.env import Env
 from rlcard.envs.registration import register, make
+from rlcard.envs.vec_env import VecEnv
 
 register(
     env_id='blackjack',
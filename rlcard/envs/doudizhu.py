@@ -22,6 +22,7 @@ class DoudizhuEnv(Env):
         super().__init__(config)
         self.state_shape = [[790], [901], [901]]
         self.action_shape = [[54] for _ in range(self.num_players)]
+        self._encoder = DoudizhuObsEncoder(self.game, ACTION_2_ID)
 
     def _extract_state(self, state):
         ''' Encode state
@@ -29,65 +30,14 @@ class DoudizhuEnv(Env):
         Args:
             state (dict): dict of original state
         '''
-        current_hand = _cards2array(state['current_hand'])
-        others_hand = _cards2array(state['others_hand'])
-
-        last_action = ''
-        if len(state['trace']) != 0:
-            if state['trace'][-1][1] == 'pass':
-                last_action = state['trace'][-2][1]
-            else:
-                last_action = state['trace'][-1][1]
-        last_action = _cards2array(last_action)
-
-        last_9_actions = _action_seq2array(_process_action_seq(state['trace']))
-
-        if state['self'] == 0: # landlord
-            landlord_up_played_cards = _cards2array(state['played_cards'][2])
-            landlord_down_played_cards = _cards2array(state['played_cards'][1])
-            landlord_up_num_cards_left = _get_one_hot_array(state['num_cards_left'][2], 17) 
-            landlord_down_num_cards_left = _get_one_hot_array(state['num_cards_left'][1], 17)
-            obs = np.concatenate((current_hand,
-                                  others_hand,
-                                  last_action,
-                                  last_9_actions,
-                                  landlord_up_played_cards,
-                                  landlord_down_played_cards,
-                                  landlord_up_num_cards_left,
-                                  landlord_down_num_cards_left))
-        else:
-            landlord_played_cards = _cards2array(state['played_cards'][0])
-            for i, action in reversed(state['trace']):
-                if i == 0:
-                    last_landlord_action = action
-            last_landlord_action = _cards2array(last_landlord_action)
-            landlord_num_cards_left = _get_one_hot_array(state['num_cards_left'][0], 20)
-
-            teammate_id = 3 - state['self']
-            teammate_played_cards = _cards2array(state['played_cards'][teammate_id])
-            last_teammate_action = 'pass'
-            for i, action in reversed(state['trace']):
-                if i == teammate_id:
-                    last_teammate_action = action
-            last_teammate_action = _cards2array(last_teammate_action)
-            teammate_num_cards_left = _get_one_hot_array(state['num_cards_left'][teammate_id], 17)
-            obs = np.concatenate((current_hand,
-                                  others_hand,
-                                  last_action,
-                                  last_9_actions,
-                                  landlord_played_cards,
-                                  teammate_played_cards,
-                                  last_landlord_action,
-                                  last_teammate_action,
-                                  landlord_num_cards_left,
-                                  teammate_num_cards_left))
+        obs = self._encoder.encode(state, self.get_action_feature_table())
 
         extracted_state = OrderedDict({'obs': obs, 'legal_actions': self._get_legal_actions()})
         extracted_state['raw_obs'] = state
         extracted_state['raw_legal_actions'] = [a for a in state['actions']]
         extracted_state['action_record'] = self.action_recorder
         return extracted_state
-            
+
     def get_payoffs(self):
         ''' Get the payoffs of players. Must be implemented in the child class.
 
@@ -113,8 +63,11 @@ class DoudizhuEnv(Env):
         Returns:
             legal_actions (list): a list of legal actions' id
         '''
-        legal_actions = self.game.state['actions']
-        legal_actions = {self._ACTION_2_ID[action]: _cards2array(action) for action in legal_actions}
+        action_features = self.get_action_feature_table()
+        legal_actions = {}
+        for action in self.game.state['actions']:
+            action_id = self._ACTION_2_ID[action]
+            legal_actions[action_id] = action_features[action_id]
         return legal_actions
 
     def get_perfect_information(self):
@@ -139,6 +92,126 @@ class DoudizhuEnv(Env):
         '''
         return _cards2array(self._decode_action(action))
 
+    def get_action_feature_table(self):
+        ''' The features of all the actions, built once and shared by all the environments
+
+        Returns:
+            (numpy.array): The features of the actions, one row per action id
+        '''
+        global _action_feature_table
+        if _action_feature_table is None:
+            _action_feature_table = np.stack([_cards2array(action) for action in self._ID_2_ACTION])
+        return _action_feature_table
+
+class DoudizhuObsEncoder(object):
+    ''' Encode the observations of a doudizhu game into preallocated buffers.
+
+    The encoder follows the trace of the game: the actions are appended to
+    the history when the game steps, and removed when it steps back or
+    restarts. The planes of the action history are kept up to date one
+    action at a time, and the planes of the hands and the played cards are
+    written from the count vectors of the game. The actions are encoded by
+    lookups in the action feature table.
+    '''
+    def __init__(self, game, action_2_id, history_length=9):
+        ''' Allocate the buffers
+
+        Args:
+            game (DoudizhuGame): The game to encode
+            action_2_id (dict): The action ids of the action strings
+            history_length (int): The number of actions in the history
+        '''
+        self.game = game
+        self.action_2_id = action_2_id
+        self.pass_id = action_2_id['pass']
+        self.history_length = history_length
+        # One buffer for the landlord and one for the peasants
+        self.buffers = [np.zeros(790, dtype=np.int8), np.zeros(901, dtype=np.int8)]
+        self.history = np.zeros((history_length, 54), dtype=np.int8)
+        # The trace entries that were encoded, their action ids and, for
+        # each player, the position in the trace of the first action
+        self.trace = []
+        self.action_ids = []
+        self.first_actions = [None for _ in range(3)]
+
+    def encode(self, state, action_features):
+        ''' Encode the observation of a player
+
+        Args:
+            state (dict): The state of the player in the game
+            action_features (numpy.array): The features of the actions, one row per action id
+
+        Returns:
+            (numpy.array): The observation
+        '''
+        self._sync(state['trace'], action_features)
+        players = self.game.players
+        played_cards = self.game.round.played_cards
+        num_cards_left = state['num_cards_left']
+        player_id = state['self']
+        action_ids = self.action_ids
+
+        obs = self.buffers[0 if player_id == 0 else 1]
+        _counts2array(players[player_id].hand_counts, obs[0:54])
+        _counts2array(sum(player.hand_counts for player in players if player.player_id != player_id), obs[54:108])
+        # The last action that is not a pass, among the last two
+        last_action = self.pass_id
+        if action_ids:
+            last_action = action_ids[-1] if action_ids[-1] != self.pass_id or len(action_ids) < 2 else action_ids[-2]
+        obs[108:162] = action_features[last_action]
+        obs[162:648] = self.history.reshape(-1)
+
+        if player_id == 0: # landlord
+            _counts2array(played_cards[2], obs[648:702])
+            _counts2array(played_cards[1], obs[702:756])
+            _one_hot(num_cards_left[2], obs[756:773])
+            _one_hot(num_cards_left[1], obs[773:790])
+        else:
+            teammate_id = 3 - player_id
+            _counts2array(played_cards[0], obs[648:702])
+            _counts2array(played_cards[teammate_id], obs[702:756])
+            # The first actions of the landlord and the teammate
+            obs[756:810] = action_features[self._first_action(0)]
+            obs[810:864] = action_features[self._first_action(teammate_id)]
+            _one_hot(num_cards_left[0], obs[864:884])
+            _one_hot(num_cards_left[teammate_id], obs[884:901])
+        return obs.copy()
+
+    def _first_action(self, player_id):
+        position = self.first_actions[player_id]
+        return self.pass_id if position is None else self.action_ids[position]
+
+    def _sync(self, trace, action_features):
+        ''' Pop the encoded actions that are not in the trace anymore, and
+        push the new ones. The entries of the trace are compared by identity.
+        '''
+        while self.trace and (len(self.trace) > len(trace) or self.trace[-1] is not trace[len(self.trace)-1]):
+            self._pop(action_features)
+        for entry in trace[len(self.trace):]:
+            self._push(entry, action_features)
+
+    def _push(self, entry, action_features):
+        player_id, action = entry
+        position = len(self.action_ids)
+        self.trace.append(entry)
+        self.action_ids.append(self.action_2_id[action])
+        if self.first_actions[player_id] is None:
+            self.first_actions[player_id] = position
+        self.history[:-1] = self.history[1:]
+        self.history[-1] = action_features[self.action_ids[-1]]
+
+    def _pop(self, action_features):
+        player_id, _ = self.trace.pop()
+        self.action_ids.pop()
+        position = len(self.action_ids)
+        if self.first_actions[player_id] == position:
+            self.first_actions[player_id] = None
+        self.history[1:] = self.history[:-1]
+        if position >= self.history_length:
+            self.history[0] = action_features[self.action_ids[position-self.history_length]]
+        else:
+            self.history[0] = 0
+
 Card2Column = {'3': 0, '4': 1, '5': 2, '6': 3, '7': 4, '8': 5, '9': 6, 'T': 7,
                'J': 8, 'Q': 9, 'K': 10, 'A': 11, '2': 12}
 
@@ -148,6 +221,12 @@ NumOnes2Array = {0: np.array([0, 0, 0, 0]),
                  3: np.array([1, 1, 1, 0]),
                  4: np.array([1, 1, 1, 1])}
 
+# The columns of the count of a card, for a count vector
+NumOnes2Plane = np.array([NumOnes2Array[i] for i in range(5)], dtype=np.int8)
+
+# The features of all the actions, see `DoudizhuEnv.get_action_feature_table`
+_action_feature_table = None
+
 def _cards2array(cards):
     if cards == 'pass':
         return np.zeros(54, dtype=np.int8)
@@ -164,23 +243,17 @@ def _cards2array(cards):
             matrix[:, Card2Column[card]] = NumOnes2Array[num_times]
     return np.concatenate((matrix.flatten('F'), jokers))
 
-def _get_one_hot_array(num_left_cards, max_num_cards):
-    one_hot = np.zeros(max_num_cards, dtype=np.int8)
-    one_hot[num_left_cards - 1] = 1
-
-    return one_hot
-
-def _action_seq2array(action_seq_list):
-    action_seq_array = np.zeros((len(action_seq_list), 54), np.int8)
-    for row, cards in enumerate(action_seq_list):
-        action_seq_array[row, :] = _cards2array(cards)
-    action_seq_array = action_seq_array.flatten()
-    return action_seq_array
-
-def _process_action_seq(sequence, length=9):
-    sequence = [action[1] for action in sequence[-length:]]
-    if len(sequence) < length:
-        empty_sequence = ['' for _ in range(length - len(sequence))]
-        empty_sequence.extend(sequence)
-        sequence = empty_sequence
-    return sequence
+def _counts2array(counts, array=None):
+    ''' Encode a count vector of 15 ranks like _cards2array, into array if given
+    '''
+    if array is None:
+        array = np.empty(54, dtype=np.int8)
+    array[:52] = NumOnes2Plane[counts[:13]].ravel()
+    array[52:] = counts[13:] > 0
+    return array
+
+def _one_hot(num_left_cards, array):
+    ''' Encode the number of cards left as a one hot array, into array
+    '''
+    array[:] = 0
+    array[num_left_cards - 1] = 1
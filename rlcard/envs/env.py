@@ -101,6 +101,7 @@ class Env(object):
 
         if not self.game.step_back():
             return False
+        self.action_recorder.pop()
 
         player_id = self.get_player_id()
         state = self.get_state(player_id)
@@ -225,6 +226,16 @@ class Env(object):
         feature[action] = 1
         return feature
 
+    def get_action_feature_table(self):
+        ''' The features of all the actions, so that the features of a batch
+            of action ids can be gathered instead of encoded one by one
+
+        Returns:
+            (numpy.array): The features of the actions, one row per action id
+        '''
+        # By default we use one-hot encoding
+        return np.eye(self.num_actions, dtype=np.int8)
+
     def seed(self, seed=None):
         self.np_random, seed = seeding.np_random(seed)
         self.game.np_random = self.np_random
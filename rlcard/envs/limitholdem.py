@@ -5,6 +5,7 @@ from collections import OrderedDict
 
 import rlcard
 from rlcard.envs import Env
+from rlcard.games.limitholdem.abstraction import CardAbstraction
 from rlcard.games.limitholdem import Game
 
 DEFAULT_GAME_CONFIG = {
@@ -23,7 +24,15 @@ class LimitholdemEnv(Env):
         self.game = Game()
         super().__init__(config)
         self.actions = ['call', 'raise', 'fold', 'check']
-        self.state_shape = [[72] for _ in range(self.num_players)]
+        # The cards are encoded by a card abstraction if 'card_abstraction' is
+        # 'isomorphic', 'bucket' or a CardAbstraction, see `CardAbstraction`
+        self.card_abstraction = config.get('card_abstraction')
+        if isinstance(self.card_abstraction, str):
+            self.card_abstraction = CardAbstraction(self.card_abstraction, num_opponents=self.num_players-1)
+        if self.card_abstraction is None:
+            self.state_shape = [[72] for _ in range(self.num_players)]
+        else:
+            self.state_shape = [[self.card_abstraction.get_encoding_size() + 20] for _ in range(self.num_players)]
         self.action_shape = [None for _ in range(self.num_players)]
 
         with open(os.path.join(rlcard.__path__[0], 'games/limitholdem/card2index.json'), 'r') as file:
@@ -56,12 +65,16 @@ class LimitholdemEnv(Env):
         public_cards = state['public_cards']
         hand = state['hand']
         raise_nums = state['raise_nums']
-        cards = public_cards + hand
-        idx = [self.card2index[card] for card in cards]
-        obs = np.zeros(72)
-        obs[idx] = 1
+        if self.card_abstraction is None:
+            cards = public_cards + hand
+            idx = [self.card2index[card] for card in cards]
+            obs = np.zeros(72)
+            obs[idx] = 1
+        else:
+            obs = np.concatenate([self.card_abstraction.encode(hand, public_cards), np.zeros(20)])
+        offset = len(obs) - 20
         for i, num in enumerate(raise_nums):
-            obs[52 + i * 5 + num] = 1
+            obs[offset + i * 5 + num] = 1
         extracted_state['obs'] = obs
 
         extracted_state['raw_obs'] = state
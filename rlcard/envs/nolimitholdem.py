@@ -5,6 +5,7 @@ from collections import OrderedDict
 
 import rlcard
 from rlcard.envs import Env
+from rlcard.games.limitholdem.abstraction import CardAbstraction
 from rlcard.games.nolimitholdem import Game
 from rlcard.games.nolimitholdem.round import Action
 
@@ -26,7 +27,15 @@ class NolimitholdemEnv(Env):
         self.game = Game()
         super().__init__(config)
         self.actions = Action
-        self.state_shape = [[54] for _ in range(self.num_players)]
+        # The cards are encoded by a card abstraction if 'card_abstraction' is
+        # 'isomorphic', 'bucket' or a CardAbstraction, see `CardAbstraction`
+        self.card_abstraction = config.get('card_abstraction')
+        if isinstance(self.card_abstraction, str):
+            self.card_abstraction = CardAbstraction(self.card_abstraction, num_opponents=self.num_players-1)
+        if self.card_abstraction is None:
+            self.state_shape = [[54] for _ in range(self.num_players)]
+        else:
+            self.state_shape = [[self.card_abstraction.get_encoding_size() + 2] for _ in range(self.num_players)]
         self.action_shape = [None for _ in range(self.num_players)]
         # for raise_amount in range(1, self.game.init_chips+1):
         #     self.actions.append(raise_amount)
@@ -62,12 +71,15 @@ class NolimitholdemEnv(Env):
         hand = state['hand']
         my_chips = state['my_chips']
         all_chips = state['all_chips']
-        cards = public_cards + hand
-        idx = [self.card2index[card] for card in cards]
-        obs = np.zeros(54)
-        obs[idx] = 1
-        obs[52] = float(my_chips)
-        obs[53] = float(max(all_chips))
+        if self.card_abstraction is None:
+            cards = public_cards + hand
+            idx = [self.card2index[card] for card in cards]
+            obs = np.zeros(54)
+            obs[idx] = 1
+        else:
+            obs = np.concatenate([self.card_abstraction.encode(hand, public_cards), np.zeros(2)])
+        obs[-2] = float(my_chips)
+        obs[-1] = float(max(all_chips))
         extracted_state['obs'] = obs
 
         extracted_state['raw_obs'] = state
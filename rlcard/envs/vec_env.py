@@ -0,0 +1,152 @@
+from rlcard.envs.registration import make
+
+class VecEnv(object):
+    '''
+    Run several independent instances of the same environment in lockstep.
+    At every step, the pending decisions of all the instances are grouped
+    by agent, so that an agent implementing `step_batch`/`eval_step_batch`
+    can serve all of them with a single forward pass.
+    '''
+    def __init__(self, env_id, num_envs, config={}):
+        ''' Initialize the vectorized environment
+
+        Args:
+            env_id (string): The name of the environment
+            num_envs (int): The number of game instances
+            config (dict): A config dictionary passed to `rlcard.make`. If
+                'seed' is given, the i-th instance is seeded with seed + i.
+        '''
+        envs = []
+        for i in range(num_envs):
+            _config = config.copy()
+            if _config.get('seed') is not None:
+                _config['seed'] = _config['seed'] + i
+            envs.append(make(env_id, config=_config))
+        self._set_envs(env_id, envs)
+
+    @classmethod
+    def from_envs(cls, envs):
+        ''' Run existing instances of the same environment in lockstep
+
+        Args:
+            envs (list): A list of environments
+
+        Returns:
+            (VecEnv): The vectorized environment
+        '''
+        vec_env = cls.__new__(cls)
+        vec_env._set_envs(envs[0].name, list(envs))
+        return vec_env
+
+    def _set_envs(self, env_id, envs):
+        self.env_id = env_id
+        self.num_envs = len(envs)
+        self.envs = envs
+        self.num_players = self.envs[0].num_players
+        self.num_actions = self.envs[0].num_actions
+        self.state_shape = self.envs[0].state_shape
+        self.action_shape = self.envs[0].action_shape
+
+    @property
+    def timestep(self):
+        ''' The total number of steps taken by all the instances
+        '''
+        return sum([env.timestep for env in self.envs])
+
+    def set_agents(self, agents):
+        '''
+        Set the agents that will interact with the environments.
+        This function must be called before `run`.
+
+        Args:
+            agents (list): List of Agent classes
+        '''
+        self.agents = agents
+        for env in self.envs:
+            env.set_agents(agents)
+
+    def seed(self, seed=None):
+        ''' Seed all the instances. The i-th instance is seeded with seed + i.
+        '''
+        return [env.seed(None if seed is None else seed + i) for i, env in enumerate(self.envs)]
+
+    def run(self, is_training=False):
+        '''
+        Run one complete game in every instance, either for evaluation or training RL agent.
+
+        Args:
+            is_training (boolean): True if for training purpose.
+
+        Returns:
+            (tuple) Tuple containing:
+
+                (list): A list with the trajectories of each instance, in the format of `Env.run`.
+                (list): A list with the payoffs of each instance.
+        '''
+        trajectories = [[[] for _ in range(self.num_players)] for _ in range(self.num_envs)]
+        states = [None for _ in range(self.num_envs)]
+        player_ids = [None for _ in range(self.num_envs)]
+        for i, env in enumerate(self.envs):
+            states[i], player_ids[i] = env.reset()
+            trajectories[i][player_ids[i]].append(states[i])
+
+        active = [i for i, env in enumerate(self.envs) if not env.is_over()]
+        while active:
+            # Group the pending decisions by agent. The same agent object may
+            # play several positions, e.g., in self-play
+            groups = {}
+            for i in active:
+                agent = self.agents[player_ids[i]]
+                groups.setdefault(id(agent), (agent, []))[1].append(i)
+
+            actions = {}
+            for agent, indices in groups.values():
+                batch_actions = self._step_batch(agent, [states[i] for i in indices], is_training)
+                for i, action in zip(indices, batch_actions):
+                    actions[i] = action
+
+            # Environments step
+            for i in active:
+                env = self.envs[i]
+                player_id = player_ids[i]
+                next_state, next_player_id = env.step(actions[i], self.agents[player_id].use_raw)
+                trajectories[i][player_id].append(actions[i])
+
+                states[i] = next_state
+                player_ids[i] = next_player_id
+
+                if not env.game.is_over():
+                    trajectories[i][next_player_id].append(next_state)
+
+            active = [i for i in active if not self.envs[i].is_over()]
+
+        # Add a final state to all the players
+        for i, env in enumerate(self.envs):
+            for player_id in range(self.num_players):
+                trajectories[i][player_id].append(env.get_state(player_id))
+
+        # Payoffs
+        payoffs = [env.get_payoffs() for env in self.envs]
+
+        return trajectories, payoffs
+
+    @staticmethod
+    def _step_batch(agent, states, is_training):
+        ''' Query an agent for a batch of states. Agents without
+            a batched API are queried one state at a time.
+
+        Args:
+            agent (object): The agent
+            states (list): A list of states
+            is_training (boolean): True if for training purpose.
+
+        Returns:
+            (list): A list of actions, one for each state
+        '''
+        if is_training:
+            if hasattr(agent, 'step_batch'):
+                return agent.step_batch(states)
+            return [agent.step(state) for state in states]
+        if hasattr(agent, 'eval_step_batch'):
+            return agent.eval_step_batch(states)[0]
+        return [agent.eval_step(state)[0] for state in states]
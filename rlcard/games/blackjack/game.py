@@ -1,4 +1,3 @@
-from copy import deepcopy
 import numpy as np
 
 from rlcard.games.blackjack import Dealer
@@ -64,22 +63,25 @@ class BlackjackGame:
             int: next plater's id
         '''
         if self.allow_step_back:
-            p = deepcopy(self.players[self.game_pointer])
-            d = deepcopy(self.dealer)
-            w = deepcopy(self.winner)
-            self.history.append((d, p, w))
+            # Record what this step can change, so that it can be undone.
+            # The dealt cards are recorded with their positions in the deck by `_deal_card`,
+            # and the random state is recorded since the cards are drawn at random
+            player = self.players[self.game_pointer]
+            p = (player, player.status, player.score)
+            d = (self.dealer.status, self.dealer.score)
+            self.history.append((p, d, dict(self.winner), self.game_pointer, self.np_random.get_state(), []))
 
         next_state = {}
         # Play hit
         if action != "stand":
-            self.dealer.deal_card(self.players[self.game_pointer])
+            self._deal_card(self.players[self.game_pointer])
             self.players[self.game_pointer].status, self.players[self.game_pointer].score = self.judger.judge_round(
                 self.players[self.game_pointer])
             if self.players[self.game_pointer].status == 'bust':
                 # game over, set up the winner, print out dealer's hand # If bust, pass the game pointer
                 if self.game_pointer >= self.num_players - 1:
                     while self.judger.judge_score(self.dealer.hand) < 17:
-                        self.dealer.deal_card(self.dealer)
+                        self._deal_card(self.dealer)
                     self.dealer.status, self.dealer.score = self.judger.judge_round(self.dealer)
                     for i in range(self.num_players):
                         self.judger.judge_game(self, i) 
@@ -93,7 +95,7 @@ class BlackjackGame:
                 self.players[self.game_pointer])
             if self.game_pointer >= self.num_players - 1:
                 while self.judger.judge_score(self.dealer.hand) < 17:
-                    self.dealer.deal_card(self.dealer)
+                    self._deal_card(self.dealer)
                 self.dealer.status, self.dealer.score = self.judger.judge_round(self.dealer)
                 for i in range(self.num_players):
                     self.judger.judge_game(self, i) 
@@ -130,10 +132,27 @@ class BlackjackGame:
         '''
         #while len(self.history) > 0:
         if len(self.history) > 0:
-            self.dealer, self.players[self.game_pointer], self.winner = self.history.pop()
+            p, d, self.winner, self.game_pointer, random_state, dealt_cards = self.history.pop()
+            self.np_random.set_state(random_state)
+            for player, idx in reversed(dealt_cards):
+                card = player.hand.pop()
+                if idx is not None:
+                    self.dealer.deck.insert(idx, card)
+            player, player.status, player.score = p
+            self.dealer.status, self.dealer.score = d
             return True
         return False
 
+    def _deal_card(self, player):
+        ''' Deal one card to a player (or the dealer) and record it for step back
+
+        Args:
+            player (object): the player or the dealer
+        '''
+        idx = self.dealer.deal_card(player)
+        if self.allow_step_back:
+            self.history[-1][-1].append((player, idx))
+
     def get_num_players(self):
         ''' Return the number of players in blackjack
 
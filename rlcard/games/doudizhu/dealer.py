@@ -1,10 +1,9 @@
 # -*- coding: utf-8 -*-
 ''' Implement Doudizhu Dealer class
 '''
-import functools
 
 from rlcard.utils import init_54_deck
-from rlcard.games.doudizhu.utils import cards2str, doudizhu_sort_card
+from rlcard.games.doudizhu.utils import cards2str, doudizhu_card_key
 
 class DoudizhuDealer:
     ''' Dealer will shuffle, deal cards, and determine players' roles
@@ -17,7 +16,7 @@ class DoudizhuDealer:
         '''
         self.np_random = np_random
         self.deck = init_54_deck()
-        self.deck.sort(key=functools.cmp_to_key(doudizhu_sort_card))
+        self.deck.sort(key=doudizhu_card_key)
         self.landlord = None
 
     def shuffle(self):
@@ -34,9 +33,9 @@ class DoudizhuDealer:
         hand_num = (len(self.deck) - 3) // len(players)
         for index, player in enumerate(players):
             current_hand = self.deck[index*hand_num:(index+1)*hand_num]
-            current_hand.sort(key=functools.cmp_to_key(doudizhu_sort_card))
+            current_hand.sort(key=doudizhu_card_key)
             player.set_current_hand(current_hand)
-            player.initial_hand = cards2str(player.current_hand)
+            player.initial_hand = player.current_hand_str
 
     def determine_role(self, players):
         ''' Determine landlord and peasants according to players' hand
@@ -70,7 +69,8 @@ class DoudizhuDealer:
         #self.landlord.role = 'landlord'
 
         # give the 'landlord' the  three cards
-        self.landlord.current_hand.extend(self.deck[-3:])
-        self.landlord.current_hand.sort(key=functools.cmp_to_key(doudizhu_sort_card))
-        self.landlord.initial_hand = cards2str(self.landlord.current_hand)
+        current_hand = self.landlord.current_hand + self.deck[-3:]
+        current_hand.sort(key=doudizhu_card_key)
+        self.landlord.set_current_hand(current_hand)
+        self.landlord.initial_hand = self.landlord.current_hand_str
         return self.landlord.player_id
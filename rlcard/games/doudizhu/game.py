@@ -1,11 +1,9 @@
 # -*- coding: utf-8 -*-
 ''' Implement Doudizhu Game class
 '''
-import functools
-from heapq import merge
 import numpy as np
 
-from rlcard.games.doudizhu.utils import cards2str, doudizhu_sort_card, CARD_RANK_STR
+from rlcard.games.doudizhu.utils import counts2str, CARD_RANK_STR
 from rlcard.games.doudizhu import Player
 from rlcard.games.doudizhu import Round
 from rlcard.games.doudizhu import Judger
@@ -165,5 +163,4 @@ class DoudizhuGame:
     def _get_others_current_hand(self, player):
         player_up = self.players[(player.player_id+1) % len(self.players)]
         player_down = self.players[(player.player_id-1) % len(self.players)]
-        others_hand = merge(player_up.current_hand, player_down.current_hand, key=functools.cmp_to_key(doudizhu_sort_card))
-        return cards2str(others_hand)
+        return counts2str(player_up.hand_counts + player_down.hand_counts)
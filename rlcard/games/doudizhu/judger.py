@@ -3,13 +3,18 @@
 '''
 import numpy as np
 import collections
+import functools
 from itertools import combinations
 from bisect import bisect_left
 
-from rlcard.games.doudizhu.utils import CARD_RANK_STR, CARD_RANK_STR_INDEX
-from rlcard.games.doudizhu.utils import cards2str, contains_cards
+from rlcard.games.doudizhu.utils import CARD_RANK_STR, CARD_RANK_STR_INDEX, ACTION_2_ID, ID_2_ACTION
+from rlcard.games.doudizhu.utils import get_action_counts, cards2counts, counts2str
 
+# The number of hands whose playable cards are kept in memory
+PLAYABLE_CARDS_CACHE_SIZE = 4096
 
+# The playable cards loaded from disk, see `DoudizhuJudger.load_playable_cards_table`
+_playable_cards_table = None
 
 class DoudizhuJudger:
     ''' Determine what cards a player can play
@@ -257,6 +262,64 @@ class DoudizhuJudger:
             playable_cards.add(CARD_RANK_STR[13] + CARD_RANK_STR[14])
         return playable_cards
 
+    @staticmethod
+    def playable_cards_from_counts(hand_counts):
+        ''' Get playable cards from the count vector of a hand. The hand is
+        looked up in the table loaded with `load_playable_cards_table`, and
+        otherwise the results of the recent hands are cached. The cache only
+        pays off when the same hands are dealt again, e.g., on a fixed set of
+        evaluation deals: on random deals it almost never hits.
+
+        Args:
+            hand_counts (numpy.array): 15 counts, in the order of CARD_RANK_STR
+
+        Returns:
+            tuple: tuple of string of playable cards, in the order of the action ids
+        '''
+        key = np.asarray(hand_counts, dtype=np.int8).tobytes()
+        if _playable_cards_table is not None:
+            row = _lookup_playable_cards_table(key)
+            if row is not None:
+                mask = np.unpackbits(row[len(CARD_RANK_STR):])[:len(ID_2_ACTION)]
+                return tuple(ID_2_ACTION[action_id] for action_id in np.flatnonzero(mask))
+        return _playable_cards(key)
+
+    @staticmethod
+    def save_playable_cards_table(path, hands):
+        ''' Precompute the playable cards of some hands, e.g., the initial hands
+        of a set of evaluation deals, and save them for `load_playable_cards_table`
+
+        Args:
+            path (str): The path of the .npy file
+            hands (list): The hands, as strings or count vectors
+        '''
+        keys = np.unique(np.stack([cards2counts(hand) if isinstance(hand, str) else np.asarray(hand, dtype=np.int8)
+                                   for hand in hands]), axis=0)
+        # One row per hand, sorted by counts: the counts, then one bit per action id
+        table = np.zeros((len(keys), len(CARD_RANK_STR) + (len(ID_2_ACTION) + 7) // 8), dtype=np.uint8)
+        table[:, :len(CARD_RANK_STR)] = keys
+        for row, key in zip(table, keys):
+            mask = np.zeros(len(ID_2_ACTION), dtype=np.bool_)
+            mask[[ACTION_2_ID[cards] for cards in DoudizhuJudger.playable_cards_from_hand(counts2str(key))]] = True
+            row[len(CARD_RANK_STR):] = np.packbits(mask)
+        np.save(path, table)
+
+    @staticmethod
+    def load_playable_cards_table(path):
+        ''' Load a table saved by `save_playable_cards_table`. The table is
+        memory-mapped, so it is shared by the processes that load it, and
+        the hands are found by a binary search on the rows.
+
+        Args:
+            path (str): The path of the .npy file, or None to unload the table
+        '''
+        global _playable_cards_table
+        _playable_cards.cache_clear()
+        if path is None:
+            _playable_cards_table = None
+            return
+        _playable_cards_table = np.load(path, mmap_mode='r')
+
     def __init__(self, players, np_random):
         ''' Initilize the Judger class for Dou Dizhu
         '''
@@ -264,8 +327,12 @@ class DoudizhuJudger:
         self._recorded_removed_playable_cards = [[] for _ in range(3)]
         for player in players:
             player_id = player.player_id
-            current_hand = cards2str(player.current_hand)
-            self.playable_cards[player_id] = self.playable_cards_from_hand(current_hand)
+            # The random deals almost never repeat, so the playable cards are
+            # only looked up when a table is loaded
+            if _playable_cards_table is None:
+                self.playable_cards[player_id] = self.playable_cards_from_hand(player.current_hand_str)
+            else:
+                self.playable_cards[player_id] = set(self.playable_cards_from_counts(player.hand_counts))
 
     def calc_playable_cards(self, player):
         ''' Recalculate all legal cards the player can play according to his
@@ -279,31 +346,14 @@ class DoudizhuJudger:
         Returns:
             list: list of string of playable cards
         '''
-        removed_playable_cards = []
-
         player_id = player.player_id
-        current_hand = cards2str(player.current_hand)
-        missed = None
-        for single in player.singles:
-            if single not in current_hand:
-                missed = single
-                break
-
-        playable_cards = self.playable_cards[player_id].copy()
-
-        if missed is not None:
-            position = player.singles.find(missed)
-            player.singles = player.singles[position+1:]
-            for cards in playable_cards:
-                if missed in cards or (not contains_cards(current_hand, cards)):
-                    removed_playable_cards.append(cards)
-                    self.playable_cards[player_id].remove(cards)
-        else:
-            for cards in playable_cards:
-                if not contains_cards(current_hand, cards):
-                    #del self.playable_cards[player_id][cards]
-                    removed_playable_cards.append(cards)
-                    self.playable_cards[player_id].remove(cards)
+        # The cards that are still in the hand, compared as count vectors
+        playable_cards = list(self.playable_cards[player_id])
+        action_ids = [ACTION_2_ID[cards] for cards in playable_cards]
+        contained = (get_action_counts()[action_ids] <= player.hand_counts).all(axis=1)
+        removed_playable_cards = [cards for cards, keep in zip(playable_cards, contained) if not keep]
+        for cards in removed_playable_cards:
+            self.playable_cards[player_id].remove(cards)
         self._recorded_removed_playable_cards[player_id].append(removed_playable_cards)
         return self.playable_cards[player_id]
 
@@ -357,3 +407,26 @@ class DoudizhuJudger:
                 if index != landlord_id:
                     payoffs[index] = 1
         return payoffs
+
+def _lookup_playable_cards_table(key):
+    ''' Find the row of the hand of count vector key, in bytes, in the loaded
+    table, or None. Only the rows visited by the binary search are read.
+    '''
+    num_ranks = len(CARD_RANK_STR)
+    low, high = 0, len(_playable_cards_table)
+    while low < high:
+        middle = (low + high) // 2
+        if _playable_cards_table[middle, :num_ranks].tobytes() < key:
+            low = middle + 1
+        else:
+            high = middle
+    if low < len(_playable_cards_table) and _playable_cards_table[low, :num_ranks].tobytes() == key:
+        return _playable_cards_table[low]
+    return None
+
+@functools.lru_cache(maxsize=PLAYABLE_CARDS_CACHE_SIZE)
+def _playable_cards(key):
+    ''' The playable cards of the hand of count vector key, in bytes
+    '''
+    playable_cards = DoudizhuJudger.playable_cards_from_hand(counts2str(np.frombuffer(key, dtype=np.int8)))
+    return tuple(sorted(playable_cards, key=ACTION_2_ID.__getitem__))
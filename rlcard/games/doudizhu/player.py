@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*-
 ''' Implement Doudizhu Player class
 '''
-import functools
+
+import numpy as np
 
 from rlcard.games.doudizhu.utils import get_gt_cards
-from rlcard.games.doudizhu.utils import cards2str, doudizhu_sort_card
+from rlcard.games.doudizhu.utils import counts2str, doudizhu_card_key
+from rlcard.games.doudizhu.utils import CARD_RANK_STR, CARD_RANK_STR_INDEX
 
 
 class DoudizhuPlayer:
@@ -23,14 +25,17 @@ class DoudizhuPlayer:
             2. played_cards: The cards played in one round
             3. hand: Initial cards
             4. _current_hand: The rest of the cards after playing some of them
+            5. hand_counts: The number of each rank in _current_hand, in the
+               order of CARD_RANK_STR, updated on play() and play_back()
         '''
         self.np_random = np_random
         self.player_id = player_id
         self.initial_hand = None
         self._current_hand = []
+        self.hand_counts = np.zeros(len(CARD_RANK_STR), dtype=np.int8)
+        self._current_hand_str = ''
         self.role = ''
         self.played_cards = None
-        self.singles = '3456789TJQKA2BR'
 
         #record cards removed from self._current_hand for each play()
         # and restore cards back to self._current_hand when play_back()
@@ -40,8 +45,19 @@ class DoudizhuPlayer:
     def current_hand(self):
         return self._current_hand
 
+    @property
+    def current_hand_str(self):
+        ''' The string of the current hand, built from hand_counts when needed
+        '''
+        if self._current_hand_str is None:
+            self._current_hand_str = counts2str(self.hand_counts)
+        return self._current_hand_str
+
     def set_current_hand(self, value):
         self._current_hand = value
+        indexes = [_card_index(card) for card in value]
+        self.hand_counts = np.bincount(indexes, minlength=len(CARD_RANK_STR)).astype(np.int8)
+        self._current_hand_str = None
 
     def get_state(self, public, others_hands, num_cards_left, actions):
         state = {}
@@ -50,7 +66,7 @@ class DoudizhuPlayer:
         state['trace'] = public['trace'].copy()
         state['played_cards'] = public['played_cards']
         state['self'] = self.player_id
-        state['current_hand'] = cards2str(self._current_hand)
+        state['current_hand'] = self.current_hand_str
         state['others_hand'] = others_hands
         state['num_cards_left'] = num_cards_left
         state['actions'] = actions
@@ -92,6 +108,9 @@ class DoudizhuPlayer:
         else:
             removed_cards = []
             self.played_cards = action
+            for play_card in action:
+                self.hand_counts[CARD_RANK_STR_INDEX[play_card]] -= 1
+            self._current_hand_str = None
             for play_card in action:
                 if play_card in trans:
                     play_card = trans[play_card]
@@ -111,5 +130,15 @@ class DoudizhuPlayer:
         ''' Restore recorded cards back to self._current_hand
         '''
         removed_cards = self._recorded_played_cards.pop()
+        for card in removed_cards:
+            self.hand_counts[_card_index(card)] += 1
+        self._current_hand_str = None
         self._current_hand.extend(removed_cards)
-        self._current_hand.sort(key=functools.cmp_to_key(doudizhu_sort_card))
+        self._current_hand.sort(key=doudizhu_card_key)
+
+def _card_index(card):
+    ''' The index of a Card object in CARD_RANK_STR
+    '''
+    if card.rank == '':
+        return CARD_RANK_STR_INDEX[card.suit[0]]
+    return CARD_RANK_STR_INDEX[card.rank]
@@ -2,11 +2,10 @@
 ''' Implement Doudizhu Round class
 '''
 
-import functools
 import numpy as np
 
 from rlcard.games.doudizhu import Dealer
-from rlcard.games.doudizhu.utils import cards2str, doudizhu_sort_card
+from rlcard.games.doudizhu.utils import cards2str, doudizhu_card_key
 from rlcard.games.doudizhu.utils import CARD_RANK_STR, CARD_RANK_STR_INDEX
 
 
@@ -30,7 +29,7 @@ class DoudizhuRound:
         '''
         landlord_id = self.dealer.determine_role(players)
         seen_cards = self.dealer.deck[-3:]
-        seen_cards.sort(key=functools.cmp_to_key(doudizhu_sort_card))
+        seen_cards.sort(key=doudizhu_card_key)
         self.seen_cards = cards2str(seen_cards)
         self.landlord_id = landlord_id
         self.current_player = landlord_id
@@ -6,6 +6,8 @@ from collections import OrderedDict
 import threading
 import collections
 
+import numpy as np
+
 import rlcard
 
 # Read required docs
@@ -46,6 +48,7 @@ CARD_RANK_STR_INDEX = {'3': 0, '4': 1, '5': 2, '6': 3, '7': 4,
 # rank list
 CARD_RANK = ['3', '4', '5', '6', '7', '8', '9', 'T', 'J', 'Q', 'K',
              'A', '2', 'BJ', 'RJ']
+CARD_RANK_INDEX = {rank: index for index, rank in enumerate(CARD_RANK)}
 
 INDEX = {'3': 0, '4': 1, '5': 2, '6': 3, '7': 4,
          '8': 5, '9': 6, 'T': 7, 'J': 8, 'Q': 9,
@@ -92,6 +95,20 @@ def doudizhu_sort_card(card_1, card_2):
     return 0
 
 
+def doudizhu_card_key(card):
+    ''' The sort key of a Card object, which orders the cards like doudizhu_sort_card
+
+    Args:
+        card (object): object of Card
+
+    Returns:
+        int: the index of the card in CARD_RANK
+    '''
+    if card.rank == '':
+        return CARD_RANK_INDEX[card.suit]
+    return CARD_RANK_INDEX[card.rank]
+
+
 def get_landlord_score(current_hand):
     ''' Roughly judge the quality of the hand, and provide a score as basis to
     bid landlord.
@@ -238,7 +255,6 @@ def get_gt_cards(player, greater_player):
     '''
     # add 'pass' to legal actions
     gt_cards = ['pass']
-    current_hand = cards2str(player.current_hand)
     target_cards = greater_player.played_cards
     target_types = CARD_TYPE[0][target_cards]
     type_dict = {}
@@ -250,13 +266,80 @@ def get_gt_cards(player, greater_player):
     type_dict['rocket'] = -1
     if 'bomb' not in type_dict:
         type_dict['bomb'] = -1
+    hand_counts = player.hand_counts
+    type_index = get_type_index()
+    seen = set(gt_cards)
     for card_type, weight in type_dict.items():
-        candidate = TYPE_CARD[card_type]
-        for can_weight, cards_list in candidate.items():
-            if int(can_weight) > int(weight):
-                for cards in cards_list:
-                    # TODO: improve efficiency
-                    if cards not in gt_cards and contains_cards(current_hand, cards):
-                        # if self.contains_cards(current_hand, cards):
-                        gt_cards.append(cards)
+        weights, counts, cards_list = type_index[card_type]
+        # The weights are sorted, so the greater cards are a suffix
+        start = np.searchsorted(weights, int(weight), side='right')
+        for i in np.flatnonzero((counts[start:] <= hand_counts).all(axis=1)):
+            cards = cards_list[start + i]
+            if cards not in seen:
+                seen.add(cards)
+                gt_cards.append(cards)
     return gt_cards
+
+def cards2counts(cards):
+    ''' Get the number of each rank in cards
+
+    Args:
+        cards (str): string of cards, every character is a solo card
+
+    Returns:
+        numpy.array: 15 counts, in the order of CARD_RANK_STR
+    '''
+    counts = np.zeros(len(CARD_RANK_STR), dtype=np.int8)
+    for card in cards:
+        counts[CARD_RANK_STR_INDEX[card]] += 1
+    return counts
+
+def counts2str(counts):
+    ''' Get the string representation of the cards of count vector
+
+    Args:
+        counts (numpy.array): 15 counts, in the order of CARD_RANK_STR
+
+    Returns:
+        string: string representation of the cards, sorted by rank
+    '''
+    return ''.join([CARD_RANK_STR[i] * int(count) for i, count in enumerate(counts) if count])
+
+# The count vectors of all the actions, see `get_action_counts`
+_action_counts = None
+
+def get_action_counts():
+    ''' Get the count vectors of all the actions, built once from ID_2_ACTION
+
+    Returns:
+        numpy.array: The counts of the cards of each action, one row per action id
+    '''
+    global _action_counts
+    if _action_counts is None:
+        _action_counts = np.stack([cards2counts(action if action != 'pass' else '') for action in ID_2_ACTION])
+    return _action_counts
+
+# The actions of each type as count vectors, see `get_type_index`
+_type_index = None
+
+def get_type_index():
+    ''' Get the actions of each card type as arrays, built once from TYPE_CARD
+
+    Returns:
+        dict: A dictionary of card type to a tuple (weights, counts, cards),
+          with one entry per action in the order of TYPE_CARD, where weights
+          are sorted, counts are the count vectors of the actions, and cards
+          are the strings of the actions
+    '''
+    global _type_index
+    if _type_index is None:
+        type_index = {}
+        for card_type, candidate in TYPE_CARD.items():
+            weights, cards_list = [], []
+            for weight, _cards_list in candidate.items():
+                weights.extend([int(weight)] * len(_cards_list))
+                cards_list.extend(_cards_list)
+            counts = np.stack([cards2counts(cards) for cards in cards_list])
+            type_index[card_type] = (np.array(weights), counts, cards_list)
+        _type_index = type_index
+    return _type_index
@@ -0,0 +1,185 @@
+''' Card abstractions of hold'em for tabular methods such as CFR
+
+Two abstractions are available:
+
+    'isomorphic': The hole cards and the board are replaced by their
+      canonical form under the permutations of the suits, so that the
+      hands that only differ by a renaming of the suits are one hand.
+    'bucket': The hand is replaced by the bucket of its equity against
+      random opponents on each street seen so far. The boundaries of the
+      buckets are the percentiles, or the 1-D k-means clusters, of the
+      equities of random deals, precomputed once and cached in CACHE_DIR.
+'''
+import os
+
+import numpy as np
+
+from rlcard.games.limitholdem.equity import calc_equity, canonicalize
+from rlcard.games.limitholdem.evaluator import CACHE_DIR
+
+# The number of board cards of the streets
+STREET_BOARD_SIZES = [0, 3, 4, 5]
+
+class CardAbstraction(object):
+    ''' Map the cards of a hold'em player to their abstraction
+    '''
+
+    def __init__(self, mode='isomorphic', num_buckets=8, bucket_method='percentile', bucket_path=None,
+                 num_opponents=1, num_samples=1000):
+        ''' Initialize the abstraction
+
+        Args:
+            mode (string): 'isomorphic' or 'bucket'
+            num_buckets (int): The number of buckets of each street
+            bucket_method (string): 'percentile' or 'kmeans'
+            bucket_path (string): The path of the bucket boundaries, see
+              `get_bucket_boundaries`. A file in CACHE_DIR is used if None.
+            num_opponents (int): The number of opponents of the equities
+            num_samples (int): The number of random runouts of the equities
+        '''
+        if mode not in ['isomorphic', 'bucket']:
+            raise ValueError('Unknown card abstraction: {}'.format(mode))
+        self.mode = mode
+        self.num_buckets = num_buckets
+        self.num_opponents = num_opponents
+        self.num_samples = num_samples
+        if mode == 'bucket':
+            self.boundaries = get_bucket_boundaries(num_buckets, bucket_method, bucket_path,
+                                                    num_opponents=num_opponents, num_samples=num_samples)
+
+    def get_card_indices(self, hand, public_cards):
+        ''' Get the canonical cards of a player
+
+        Args:
+            hand (list): The hole cards, as strings such as 'SA'
+            public_cards (list): The board cards
+
+        Returns:
+            (list): The integer cards of the canonical hole cards and board,
+              in the order of `card2index.json`
+        '''
+        hand, public_cards = canonicalize(hand, public_cards)
+        return list(hand + public_cards)
+
+    def get_buckets(self, hand, public_cards):
+        ''' Get the equity bucket of a player on each street seen so far
+
+        Args:
+            hand (list): The hole cards, as strings such as 'SA'
+            public_cards (list): The board cards
+
+        Returns:
+            (list): The bucket of each street, from 0 (lowest equity) to num_buckets - 1
+        '''
+        buckets = []
+        for street, size in enumerate(STREET_BOARD_SIZES):
+            if size > len(public_cards):
+                break
+            equity = _calc_bucket_equity(hand, public_cards[:size], self.num_opponents, self.num_samples)
+            buckets.append(int(np.searchsorted(self.boundaries[street], equity, side='right')))
+        return buckets
+
+    def encode(self, hand, public_cards):
+        ''' Encode the cards of a player
+
+        Args:
+            hand (list): The hole cards, as strings such as 'SA'
+            public_cards (list): The board cards
+
+        Returns:
+            (numpy.array): In 'isomorphic' mode, the 52 one-hot canonical
+              cards. In 'bucket' mode, the one-hot buckets of the 4 streets,
+              which are all zeros for the streets not seen yet.
+        '''
+        if self.mode == 'isomorphic':
+            obs = np.zeros(52)
+            obs[self.get_card_indices(hand, public_cards)] = 1
+        else:
+            obs = np.zeros((len(STREET_BOARD_SIZES), self.num_buckets))
+            for street, bucket in enumerate(self.get_buckets(hand, public_cards)):
+                obs[street, bucket] = 1
+            obs = obs.reshape(-1)
+        return obs
+
+    def get_encoding_size(self):
+        ''' Get the size of the arrays of `encode`
+
+        Returns:
+            (int): The size of the encoding
+        '''
+        if self.mode == 'isomorphic':
+            return 52
+        return len(STREET_BOARD_SIZES) * self.num_buckets
+
+def get_bucket_boundaries(num_buckets, method='percentile', path=None, num_deals=1000,
+                          num_opponents=1, num_samples=1000, seed=0):
+    ''' Get the boundaries of the equity buckets, loaded from path or computed
+        from random deals and saved to path. The file also holds the parameters
+        of the boundaries, and they are computed again if the parameters differ.
+        Computing them takes a few seconds.
+
+    Args:
+        num_buckets (int): The number of buckets of each street
+        method (string): 'percentile' for buckets of equal size, or 'kmeans' for
+          the clusters of the 1-D k-means of the equities
+        path (string): The path of the .npz file. A file in CACHE_DIR named
+          after the parameters is used if None.
+        num_deals (int): The number of random deals of each street
+        num_opponents (int): The number of opponents of the equities
+        num_samples (int): The number of random runouts of the equities
+        seed (int): The seed of the random deals
+
+    Returns:
+        (numpy.array): The boundaries, one row of num_buckets - 1 increasing equities per street
+    '''
+    if method not in ['percentile', 'kmeans']:
+        raise ValueError('Unknown bucket method: {}'.format(method))
+    parameters = np.array([num_buckets, num_deals, num_opponents, num_samples, seed])
+    if path is None:
+        path = os.path.join(CACHE_DIR, 'equity_buckets_{}_{}.npz'.format(method, '_'.join(map(str, parameters))))
+    if os.path.isfile(path):
+        with np.load(path) as data:
+            if str(data['method']) == method and np.array_equal(data['parameters'], parameters):
+                return data['boundaries']
+
+    np_random = np.random.RandomState(seed)
+    boundaries = np.zeros((len(STREET_BOARD_SIZES), num_buckets - 1), dtype=np.float32)
+    for street, size in enumerate(STREET_BOARD_SIZES):
+        equities = []
+        for _ in range(num_deals):
+            cards = np_random.choice(52, 2 + size, replace=False).tolist()
+            equities.append(_calc_bucket_equity(cards[:2], cards[2:], num_opponents, num_samples))
+        equities = np.array(equities)
+        if method == 'percentile':
+            boundaries[street] = np.quantile(equities, np.arange(1, num_buckets) / num_buckets)
+        else:
+            boundaries[street] = _kmeans_boundaries(equities, num_buckets)
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'wb') as f:
+            np.savez(f, boundaries=boundaries, method=method, parameters=parameters)
+    except OSError:
+        pass
+    return boundaries
+
+def _calc_bucket_equity(hand, public_cards, num_opponents, num_samples):
+    ''' The equity of a hand for the buckets. The runouts are seeded, so that
+        a hand is always in the same bucket.
+    '''
+    return calc_equity(hand, public_cards, num_opponents=num_opponents,
+                       num_samples=num_samples, max_exhaustive=num_samples, seed=0)
+
+def _kmeans_boundaries(equities, num_buckets, num_iterations=100):
+    ''' Cluster the equities with Lloyd's algorithm, starting from the
+        percentiles. The boundaries are the midpoints of the sorted centers.
+    '''
+    centers = np.quantile(equities, (np.arange(num_buckets) + 0.5) / num_buckets)
+    for _ in range(num_iterations):
+        boundaries = (centers[1:] + centers[:-1]) / 2
+        labels = np.searchsorted(boundaries, equities, side='right')
+        new_centers = np.array([equities[labels == i].mean() if (labels == i).any() else centers[i]
+                                for i in range(num_buckets)])
+        if np.allclose(new_centers, centers):
+            break
+        centers = np.sort(new_centers)
+    return (centers[1:] + centers[:-1]) / 2
@@ -0,0 +1,277 @@
+''' The equity of a hold'em hand against random or ranged opponents
+
+The equity is the expected share of the pot won by the hand at the
+showdown, where the missing board cards and the hole cards of the opponents
+are dealt uniformly at random among the unknown cards, and a tie splits the
+pot among the winners. It is computed by enumerating all the runouts when
+there are at most `max_exhaustive` of them, and estimated from random
+runouts otherwise. The runouts are ranked in batches by
+`evaluator.evaluate_hands`.
+
+The results are cached by the canonical form of the hand and the board
+under the permutations of the suits, since two hands that only differ by a
+renaming of the suits have the same equity.
+'''
+import functools
+import itertools
+import multiprocessing
+
+import numpy as np
+
+from rlcard.games.limitholdem.evaluator import CARD_RANKS, CARD_SUITS, RANKS, SUITS, evaluate_hands, get_tables
+
+EQUITY_CACHE_SIZE = 65536
+
+# The permutations of the suits of the 52 cards, one row per permutation
+_SUIT_PERMUTATIONS = np.array([[perm[CARD_SUITS[index]] * 13 + index % 13 for index in range(52)]
+                               for perm in itertools.permutations(range(4))])
+
+# The integer card of each card string
+_CARD_INDEX = {SUITS[CARD_SUITS[index]] + RANKS[CARD_RANKS[index]]: index for index in range(52)}
+
+# The number of runouts that are ranked at once
+_BATCH_SIZE = 65536
+
+def get_card_indices(cards):
+    ''' Get the integer cards of cards
+
+    Args:
+        cards (list): The cards, as strings such as 'SA' or integers
+
+    Returns:
+        (list): The integer cards, in the order of `card2index.json`
+    '''
+    indices = []
+    for card in cards:
+        if isinstance(card, str):
+            if card not in _CARD_INDEX:
+                raise ValueError('Unknown card: {}'.format(card))
+            card = _CARD_INDEX[card]
+        elif not 0 <= card < 52:
+            raise ValueError('Unknown card: {}'.format(card))
+        indices.append(int(card))
+    return indices
+
+def canonicalize(*groups):
+    ''' Get the canonical form of groups of cards under the permutations of
+        the suits. The order of the cards within a group does not matter.
+
+    Args:
+        groups (list): Each group is a list of cards, as strings or integers,
+          e.g., the hole cards and the board
+
+    Returns:
+        (tuple): A tuple of sorted tuples of integer cards, one per group,
+          which is the same for all the suit permutations of the groups
+    '''
+    indices = [get_card_indices(group) for group in groups]
+    sizes = [len(group) for group in indices]
+    # Sort each group under every permutation, and take the smallest
+    permuted = _SUIT_PERMUTATIONS[:, sum(indices, [])]
+    offset = 0
+    for size in sizes:
+        permuted[:, offset:offset+size].sort(axis=1)
+        offset += size
+    best = min(map(tuple, permuted.tolist()))
+    canonical, offset = [], 0
+    for size in sizes:
+        canonical.append(best[offset:offset+size])
+        offset += size
+    return tuple(canonical)
+
+def calc_equity(hole_cards, board=(), num_opponents=1, opponent_range=None,
+                num_samples=100000, max_exhaustive=200000, num_processes=1, seed=None):
+    ''' Compute the equity of a hand
+
+    Args:
+        hole_cards (list): The 2 hole cards, as strings such as 'SA' or integers
+        board (list): The 0 to 5 board cards
+        num_opponents (int): The number of opponents
+        opponent_range (list): The possible hole cards of each opponent, as a
+          list of pairs of cards. Any two unknown cards if None.
+        num_samples (int): The number of random runouts of the estimate
+        max_exhaustive (int): The largest number of runouts that are enumerated
+        num_processes (int): The number of processes that deal the random runouts
+        seed (int): The seed of the random runouts, or None to use the global
+          random state of numpy
+
+    Returns:
+        (float): The equity, between 0 and 1
+    '''
+    if len(hole_cards) != 2 or len(board) > 5 or num_opponents < 1:
+        raise ValueError('Expected 2 hole cards, at most 5 board cards and at least one opponent')
+    if opponent_range is not None:
+        opponent_range = tuple(tuple(sorted(get_card_indices(hand))) for hand in opponent_range)
+        return _calc_equity(tuple(get_card_indices(hole_cards)), tuple(get_card_indices(board)),
+                            num_opponents, opponent_range, num_samples, max_exhaustive, num_processes, seed)
+    hole_cards, board = canonicalize(hole_cards, board)
+    return _cached_equity(hole_cards, board, num_opponents, num_samples, max_exhaustive, num_processes, seed)
+
+def clear_equity_cache():
+    ''' Clear the cache of the equities computed by `calc_equity`
+    '''
+    _cached_equity.cache_clear()
+
+def count_runouts(num_unknown, num_board_cards, num_opponents, range_size=None):
+    ''' Count the runouts of a hand
+
+    Args:
+        num_unknown (int): The number of unknown cards
+        num_board_cards (int): The number of known board cards
+        num_opponents (int): The number of opponents
+        range_size (int): The number of hands in the range of the opponents,
+          or None for random opponents. The runouts are overestimated.
+
+    Returns:
+        (int): The number of runouts
+    '''
+    num_missing = 5 - num_board_cards
+    count = _comb(num_unknown, num_missing)
+    for i in range(num_opponents):
+        if range_size is None:
+            count *= _comb(num_unknown - num_missing - 2 * i, 2)
+        else:
+            count *= range_size
+    return count
+
+def _comb(n, k):
+    ''' The binomial coefficient, as `math.comb` which needs Python 3.8
+    '''
+    if not 0 <= k <= n:
+        return 0
+    count = 1
+    for i in range(min(k, n - k)):
+        count = count * (n - i) // (i + 1)
+    return count
+
+@functools.lru_cache(maxsize=EQUITY_CACHE_SIZE)
+def _cached_equity(hole_cards, board, num_opponents, num_samples, max_exhaustive, num_processes, seed):
+    return _calc_equity(hole_cards, board, num_opponents, None, num_samples, max_exhaustive, num_processes, seed)
+
+def _calc_equity(hole_cards, board, num_opponents, opponent_range, num_samples, max_exhaustive, num_processes, seed):
+    known = list(hole_cards) + list(board)
+    if len(set(known)) != len(known):
+        raise ValueError('The hole cards and the board share a card')
+    unknown = [card for card in range(52) if card not in known]
+    if opponent_range is not None:
+        opponent_range = [hand for hand in opponent_range if hand[0] != hand[1] and not set(hand) & set(known)]
+        if not opponent_range:
+            raise ValueError('No hand of the range is possible')
+    range_size = None if opponent_range is None else len(opponent_range)
+    if count_runouts(len(unknown), len(board), num_opponents, range_size) <= max_exhaustive:
+        return _exhaustive_equity(hole_cards, board, unknown, num_opponents, opponent_range)
+
+    get_tables(batched=True)
+    args = (hole_cards, board, num_opponents, opponent_range)
+    np_random = np.random if seed is None else np.random.RandomState(seed)
+    if num_processes <= 1:
+        total, count = _monte_carlo_equity(args, num_samples, np_random)
+    else:
+        seeds = np_random.randint(2**31, size=num_processes)
+        sizes = [num_samples // num_processes + (i < num_samples % num_processes) for i in range(num_processes)]
+        with multiprocessing.get_context('fork').Pool(num_processes) as pool:
+            results = pool.map(_monte_carlo_worker, [(args, size, seed) for size, seed in zip(sizes, seeds)])
+        total, count = map(sum, zip(*results))
+    if count == 0:
+        raise ValueError('No runout is consistent with the range of the opponents')
+    return total / count
+
+def _exhaustive_equity(hole_cards, board, unknown, num_opponents, opponent_range):
+    ''' Enumerate the runouts: the missing board cards, then the hole cards
+        of the opponents among the cards that are left
+    '''
+    num_missing = 5 - len(board)
+    deals = list(itertools.combinations(unknown, num_missing))
+    deals = np.array(deals, dtype=np.int64).reshape(len(deals), num_missing)
+    if opponent_range is None:
+        hands = np.array(list(itertools.combinations(unknown, 2)), dtype=np.int64)
+    else:
+        hands = np.array(opponent_range, dtype=np.int64)
+    hand_masks = (1 << hands).sum(axis=1)
+    for _ in range(num_opponents):
+        deal_masks = (1 << deals).sum(axis=1)
+        rows, columns = np.nonzero((deal_masks[:, None] & hand_masks[None, :]) == 0)
+        deals = np.concatenate([deals[rows], hands[columns]], axis=1)
+    if len(deals) == 0:
+        raise ValueError('No runout is consistent with the range of the opponents')
+    total = sum(_share_of_pot(hole_cards, board, num_opponents, deals[start:start+_BATCH_SIZE])
+                for start in range(0, len(deals), _BATCH_SIZE))
+    return total / len(deals)
+
+def _monte_carlo_worker(args):
+    args, num_samples, seed = args
+    return _monte_carlo_equity(args, num_samples, np.random.RandomState(seed))
+
+def _monte_carlo_equity(args, num_samples, np_random):
+    ''' Deal random runouts in batches
+
+    Returns:
+        (tuple): The sum of the shares of the pot won by the hand, and the number of runouts
+    '''
+    hole_cards, board, num_opponents, opponent_range = args
+    num_missing = 5 - len(board)
+    known = list(hole_cards) + list(board)
+    unknown = np.array([card for card in range(52) if card not in known])
+    total, count = 0., 0
+    while count < num_samples:
+        size = min(_BATCH_SIZE, num_samples - count)
+        if opponent_range is None:
+            # The cards of the board come first, then the hole cards
+            deals = _deal(unknown, num_missing + 2 * num_opponents, size, np_random)
+        else:
+            hands = np.array(opponent_range)[np_random.randint(len(opponent_range), size=(size, num_opponents))]
+            hands = hands.reshape(size, 2 * num_opponents)
+            # Discard the runouts where the opponents share a card
+            hands = hands[(np.sort(hands, axis=1)[:, 1:] != np.sort(hands, axis=1)[:, :-1]).all(axis=1)]
+            # The missing board cards are the cards with the smallest random keys
+            keys = np_random.random_sample((len(hands), 52))
+            keys[:, known] = 2.
+            np.put_along_axis(keys, hands, 2., axis=1)
+            deals = np.concatenate([np.argsort(keys, axis=1)[:, :num_missing], hands], axis=1)
+        # Every runout of the batch was discarded, the range is too
+        # narrow for the opponents to hold disjoint hands
+        if len(deals) == 0:
+            break
+        total += _share_of_pot(hole_cards, board, num_opponents, deals)
+        count += len(deals)
+    return total, count
+
+def _deal(cards, num_dealt, size, np_random):
+    ''' Deal cards at random with a partial Fisher-Yates shuffle of each row
+
+    Returns:
+        (numpy.array): One row of num_dealt distinct cards per deal
+    '''
+    num_cards = len(cards)
+    decks = np.tile(cards, size)
+    offsets = np.arange(size) * num_cards
+    for i in range(num_dealt):
+        j = offsets + i + (np_random.random_sample(size) * (num_cards - i)).astype(np.int64)
+        swapped = decks[offsets + i]
+        decks[offsets + i] = decks[j]
+        decks[j] = swapped
+    return decks.reshape(size, num_cards)[:, :num_dealt]
+
+def _share_of_pot(hole_cards, board, num_opponents, deals):
+    ''' Rank the hands of the runouts
+
+    Args:
+        deals (numpy.array): One row per runout: the missing board cards,
+          then the 2 hole cards of each opponent
+
+    Returns:
+        (float): The sum over the runouts of the share of the pot won by the hand
+    '''
+    num_missing = 5 - len(board)
+    size = len(deals)
+    public = np.concatenate([np.broadcast_to(np.array(board, dtype=np.int64), (size, len(board))),
+                             deals[:, :num_missing]], axis=1)
+    cards = np.empty((size, num_opponents + 1, 7), dtype=np.int64)
+    cards[:, :, 2:] = public[:, None, :]
+    cards[:, 0, :2] = hole_cards
+    cards[:, 1:, :2] = deals[:, num_missing:].reshape(size, num_opponents, 2)
+    values = evaluate_hands(cards)
+    best = values[:, 1:].max(axis=1)
+    wins = values[:, 0] >= best
+    num_winners = 1 + (values[:, 1:] == values[:, :1]).sum(axis=1)
+    return float((wins / num_winners).sum())
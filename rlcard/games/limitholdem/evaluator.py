@@ -0,0 +1,240 @@
+''' A lookup-table evaluator of poker hands of 5 to 7 cards
+
+Every hand is ranked by a single integer, and a greater integer is a better
+hand. The category of the hand (1 for high card to 9 for straight flush, as
+`Hand.category`) is in the bits above HAND_CATEGORY_SHIFT, and the ranks that
+break the ties within the category, from the most to the least significant,
+are in the 4-bit groups below.
+
+The hands without a flush are ranked by the counts of their 13 ranks, which
+are hashed into a base-5 key and looked up in a table of all the possible
+counts. The flushes are ranked by the 13-bit mask of the ranks of the flush
+suit. Since a hand of at most 7 cards with a flush can not have a full house
+or a four of a kind, the flush rank is the rank of the hand. The tables are
+built at the first use and cached on disk, in CACHE_DIR.
+
+The cards are strings such as 'SA' or 'H9', or integers in the order of
+`card2index.json`, i.e., suit * 13 + (rank + 1) % 13, with the suits in the
+order 'SHDC' and the ranks in the order '23456789TJQKA'.
+'''
+import os
+
+import numpy as np
+
+HAND_CATEGORY_SHIFT = 20
+HIGH_CARD, ONE_PAIR, TWO_PAIR, THREE_OF_A_KIND, STRAIGHT, FLUSH, FULL_HOUSE, FOUR_OF_A_KIND, STRAIGHT_FLUSH = range(1, 10)
+
+RANKS = '23456789TJQKA'
+SUITS = 'SHDC'
+
+# The rank and the suit of the integer cards
+CARD_RANKS = np.array([(index % 13 - 1) % 13 for index in range(52)])
+CARD_SUITS = np.array([index // 13 for index in range(52)])
+
+# The directory of the files computed once and cached, outside of the package
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'rlcard')
+
+TABLES_PATH = os.path.join(CACHE_DIR, 'evaluator_tables.npz')
+
+# The tables, see `get_tables`
+_tables = None
+
+# The code of a card is its base-5 key in the low 32 bits, plus its count
+# in the 4-bit group of its suit above, so that the codes of the cards of a
+# hand are summed at once
+_POWERS_OF_5 = np.array([5 ** rank for rank in range(13)], dtype=np.int64)
+_card_codes = {}
+# The suit of a card and the bit of its rank, for the flushes
+_card_bits = {}
+for _index in range(52):
+    _rank, _suit = int(CARD_RANKS[_index]), int(CARD_SUITS[_index])
+    _card_codes[_index] = _card_codes[SUITS[_suit] + RANKS[_rank]] = 5 ** _rank | 1 << (32 + 4 * _suit)
+    _card_bits[_index] = _card_bits[SUITS[_suit] + RANKS[_rank]] = (_suit, 1 << _rank)
+_CARD_CODES = np.array([_card_codes[index] for index in range(52)], dtype=np.int64)
+
+def evaluate_hand(cards):
+    ''' Rank one hand
+
+    Args:
+        cards (list): 5 to 7 cards, as strings or integers
+
+    Returns:
+        (int): The rank of the hand, greater is better
+    '''
+    if _tables is None:
+        get_tables()
+    try:
+        code = sum(map(_card_codes.__getitem__, cards))
+    except KeyError:
+        code = sum(map(_get_card_code, cards))
+    value = _tables[1][code & 0xFFFFFFFF]
+    # A group of 4 bits reaches 8 after adding 3 only if the suit has 5 cards
+    flush = ((code >> 32) + 0x3333) & 0x8888
+    if flush:
+        suit = flush.bit_length() // 4 - 1
+        mask = 0
+        for card in cards:
+            card_suit, bit = _card_bits.get(card, (-1, 0))
+            if card_suit == suit:
+                mask |= bit
+        value = max(value, _tables[2][mask])
+    return value
+
+def evaluate_hands(cards):
+    ''' Rank a batch of hands of integer cards
+
+    Args:
+        cards (numpy.array): The cards, one row of 5 to 7 integer cards per hand
+
+    Returns:
+        (numpy.array): The ranks of the hands
+    '''
+    rank_keys, _, flush_values, rank_table = get_tables(batched=True)
+    cards = np.asarray(cards)
+    codes = _CARD_CODES[cards].sum(axis=-1)
+    values = rank_table[np.searchsorted(rank_keys, codes & 0xFFFFFFFF)]
+    flush = np.flatnonzero(((codes >> 32) + 0x3333) & 0x8888)
+    if len(flush) > 0:
+        # The flushes are rare, so they are ranked one suit at a time
+        flush_cards = cards.reshape(-1, cards.shape[-1])[flush]
+        suits = CARD_SUITS[flush_cards]
+        rank_bits = 1 << CARD_RANKS[flush_cards]
+        for suit in range(4):
+            in_suit = suits == suit
+            rows = in_suit.sum(axis=-1) >= 5
+            mask = (rank_bits * in_suit)[rows].sum(axis=-1)
+            values.reshape(-1)[flush[rows]] = np.maximum(values.reshape(-1)[flush[rows]], flush_values[mask])
+    return values
+
+def get_hand_category(value):
+    ''' Get the category of a hand from its rank
+
+    Args:
+        value (int): The rank of the hand
+
+    Returns:
+        (int): The category, from 1 (high card) to 9 (straight flush)
+    '''
+    return value >> HAND_CATEGORY_SHIFT
+
+def get_tables(batched=False):
+    ''' Get the lookup tables, loaded from the disk cache or built at the first use
+
+    Args:
+        batched (boolean): Also return the table of ranks in the order of the keys
+
+    Returns:
+        (tuple): Tuple containing:
+
+            (numpy.array): The sorted base-5 keys of the counts of the ranks
+            (dict): The rank of the hand of each key
+            (numpy.array): The rank of the flush of each 13-bit mask of ranks
+            (numpy.array): The rank of the hand of each key, in the order of the keys, if batched
+    '''
+    global _tables
+    if _tables is None:
+        try:
+            with np.load(TABLES_PATH) as data:
+                rank_keys, rank_table, flush_values = data['rank_keys'], data['rank_values'], data['flush_values']
+        except (OSError, KeyError, ValueError):
+            rank_keys, rank_table, flush_values = _build_tables()
+            try:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                with open(TABLES_PATH, 'wb') as f:
+                    np.savez(f, rank_keys=rank_keys, rank_values=rank_table, flush_values=flush_values)
+            except OSError:
+                pass
+        rank_values = dict(zip(rank_keys.tolist(), rank_table.tolist()))
+        _tables = (rank_keys, rank_values, flush_values.tolist(), rank_table, flush_values)
+    if batched:
+        return _tables[0], _tables[1], _tables[4], _tables[3]
+    return _tables[:3]
+
+def _get_card_code(card):
+    ''' The code of a card. A card string with a suit that is not in SUITS
+        counts for the ranks but never makes a flush.
+    '''
+    if card in _card_codes:
+        return _card_codes[card]
+    return 5 ** RANKS.index(card[1])
+
+def _build_tables():
+    ''' Rank all the counts of ranks of 5 to 7 cards, and all the flushes
+    '''
+    keys, values = [], []
+    counts = [0] * 13
+
+    def enumerate_counts(rank, num_cards):
+        if rank == 13:
+            if 5 <= num_cards <= 7:
+                keys.append(sum(count * 5 ** r for r, count in enumerate(counts)))
+                values.append(_rank_counts(counts))
+            return
+        for count in range(min(4, 7 - num_cards) + 1):
+            counts[rank] = count
+            enumerate_counts(rank + 1, num_cards + count)
+        counts[rank] = 0
+
+    enumerate_counts(0, 0)
+    order = np.argsort(keys)
+    rank_keys = np.array(keys, dtype=np.int64)[order]
+    rank_values = np.array(values, dtype=np.int32)[order]
+
+    flush_values = np.zeros(1 << 13, dtype=np.int32)
+    for mask in range(1 << 13):
+        if bin(mask).count('1') >= 5:
+            ranks = [rank for rank in reversed(range(13)) if mask >> rank & 1]
+            top = _straight_top(mask)
+            if top is not None:
+                flush_values[mask] = _encode(STRAIGHT_FLUSH, [top])
+            else:
+                flush_values[mask] = _encode(FLUSH, ranks[:5])
+    return rank_keys, rank_values, flush_values
+
+def _rank_counts(counts):
+    ''' Rank a hand without flush from the counts of its ranks
+    '''
+    ranks = [rank for rank in reversed(range(13)) if counts[rank]]
+    groups = {4: [], 3: [], 2: [], 1: []}
+    for rank in ranks:
+        groups[counts[rank]].append(rank)
+    mask = sum(1 << rank for rank in ranks)
+
+    if groups[4]:
+        quads = groups[4][0]
+        return _encode(FOUR_OF_A_KIND, [quads] + [rank for rank in ranks if rank != quads][:1])
+    if groups[3] and len(groups[3]) + len(groups[2]) >= 2:
+        trips = groups[3][0]
+        return _encode(FULL_HOUSE, [trips, max(groups[3][1:] + groups[2])])
+    top = _straight_top(mask)
+    if top is not None:
+        return _encode(STRAIGHT, [top])
+    if groups[3]:
+        trips = groups[3][0]
+        return _encode(THREE_OF_A_KIND, [trips] + [rank for rank in ranks if rank != trips][:2])
+    if len(groups[2]) >= 2:
+        pairs = groups[2][:2]
+        return _encode(TWO_PAIR, pairs + [rank for rank in ranks if rank not in pairs][:1])
+    if groups[2]:
+        pair = groups[2][0]
+        return _encode(ONE_PAIR, [pair] + [rank for rank in ranks if rank != pair][:3])
+    return _encode(HIGH_CARD, ranks[:5])
+
+def _straight_top(mask):
+    ''' The highest rank of the best straight in a 13-bit mask of ranks, or None
+    '''
+    for top in range(12, 3, -1):
+        if (mask >> (top - 4)) & 0b11111 == 0b11111:
+            return top
+    # The wheel, A2345
+    if mask & 0b1000000001111 == 0b1000000001111:
+        return 3
+    return None
+
+def _encode(category, ranks):
+    ''' Pack a category and the ranks that break the ties into an integer
+    '''
+    value = category
+    for i in range(5):
+        value = value << 4 | (ranks[i] if i < len(ranks) else 0)
+    return value
@@ -1,4 +1,3 @@
-from copy import deepcopy, copy
 import numpy as np
 
 from rlcard.games.limitholdem import Dealer
@@ -116,15 +115,14 @@ class LimitHoldemGame:
                 (int): next player id
         """
         if self.allow_step_back:
-            # First snapshot the current state
-            r = deepcopy(self.round)
-            b = self.game_pointer
-            r_c = self.round_counter
-            d = deepcopy(self.dealer)
-            p = deepcopy(self.public_cards)
-            ps = deepcopy(self.players)
-            rn = copy(self.history_raise_nums)
-            self.history.append((r, b, r_c, d, p, ps, rn))
+            # Record what this step can change, so that it can be undone.
+            # Cards are never copied, the dealt public cards are moved back to the deck.
+            player = self.players[self.game_pointer]
+            r = (self.round.game_pointer, self.round.have_raised, self.round.not_raise_num,
+                 self.round.raise_amount, self.round.player_folded, list(self.round.raised))
+            ps = (player, player.in_chips, player.status)
+            rn = self.history_raise_nums[self.round_counter]
+            self.history.append((r, ps, self.game_pointer, self.round_counter, rn, len(self.public_cards)))
 
         # Then we proceed to the next round
         self.game_pointer = self.round.proceed_round(self.players, action)
@@ -163,8 +161,13 @@ class LimitHoldemGame:
             (bool): True if the game steps back successfully
         """
         if len(self.history) > 0:
-            self.round, self.game_pointer, self.round_counter, self.dealer, self.public_cards, \
-                self.players, self.history_raises_nums = self.history.pop()
+            r, ps, self.game_pointer, self.round_counter, rn, num_public_cards = self.history.pop()
+            self.round.game_pointer, self.round.have_raised, self.round.not_raise_num, \
+                self.round.raise_amount, self.round.player_folded, self.round.raised = r
+            player, player.in_chips, player.status = ps
+            self.history_raise_nums[self.round_counter] = rn
+            while len(self.public_cards) > num_public_cards:
+                self.dealer.deck.append(self.public_cards.pop())
             return True
         return False
 
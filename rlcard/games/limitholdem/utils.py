@@ -1,5 +1,7 @@
 import numpy as np
 
+from rlcard.games.limitholdem.evaluator import evaluate_hand
+
 class Hand:
     def __init__(self, all_cards):
         self.all_cards = all_cards # two hand cards + five public cards
@@ -535,38 +537,28 @@ def compare_hands(hands):
         [1, 1, 1]: draw
         [1, 1, 0]: player1 and player0 draws
 
-    if hands[0] == None:
-        return [0, 1]
-    elif hands[1] == None:
-        return [1, 0]
+    Each hand is ranked once by the lookup tables of `evaluator.evaluate_hand`
     '''
-    hand_category = [] #such as high_card, straight_flush, etc
     all_players = [0]*len(hands) #all the players in this round, 0 for losing and 1 for winning or draw
-    if None in hands:
-        fold_players = [i for i, j in enumerate(hands) if j is None]
-        if len(fold_players) == len(all_players) - 1:
-            for _ in enumerate(hands):
-                if _[0] in fold_players:
-                    all_players[_[0]] = 0
-                else:
-                    all_players[_[0]] = 1
-            return all_players
+    fold_players = [i for i, j in enumerate(hands) if j is None]
+    if len(fold_players) == len(all_players) - 1:
+        for i, hand in enumerate(hands):
+            all_players[i] = 0 if hand is None else 1
+        return all_players
+    values = []
+    for hand in hands:
+        if hand is None:
+            values.append(-1)
+        elif len(hand) != 7:
+            raise Exception(
+                "There are not enough 7 cards in this hand, quit evaluation now ! ")
         else:
-            for _ in enumerate(hands):
-                if hands[_[0]] is not None:
-                    hand = Hand(hands[_[0]])
-                    hand.evaluateHand()
-                    hand_category.append(hand.category)
-                elif hands[_[0]] is None:
-                    hand_category.append(0)
-    else:
-            for i in enumerate(hands):
-                hand = Hand(hands[i[0]])
-                hand.evaluateHand()
-                hand_category.append(hand.category)
-    potential_winner_index = [i for i, j in enumerate(hand_category) if j == max(hand_category)]# potential winner are those with same max card_catagory
-
-    return final_compare(hands, potential_winner_index, all_players)
+            values.append(evaluate_hand(hand))
+    best_value = max(values)
+    for i, value in enumerate(values):
+        if value == best_value:
+            all_players[i] = 1
+    return all_players
 
 def final_compare(hands, potential_winner_index, all_players):
     '''
@@ -1,5 +1,4 @@
 import numpy as np
-from copy import deepcopy
 
 from rlcard.games.mahjong import Dealer
 from rlcard.games.mahjong import Player
@@ -59,12 +58,18 @@ class MahjongGame:
                 (dict): next player's state
                 (int): next plater's id
         '''
-        # First snapshot the current state
         if self.allow_step_back:
-            hist_dealer = deepcopy(self.dealer)
-            hist_round = deepcopy(self.round)
-            hist_players = deepcopy(self.players)
-            self.history.append((hist_dealer, hist_players, hist_round))
+            # Record what this step can change, so that it can be undone.
+            # A step changes the hand and pile of the current player, the last card
+            # on the table, and deals at most one card from the deck to another player.
+            r = (self.round.current_player, self.round.last_player, self.round.player_before_act,
+                 self.round.valid_act, self.round.last_cards)
+            player = self.players[self.round.current_player]
+            ps = (player, list(player.hand), len(player.pile))
+            table = self.dealer.table
+            t = (len(table), table[-1] if table else None)
+            self.history.append((r, ps, t, len(self.dealer.deck), self.cur_state))
+
         self.round.proceed_round(self.players, action)
         state = self.get_state(self.round.current_player)
         self.cur_state = state
@@ -78,7 +83,17 @@ class MahjongGame:
         '''
         if not self.history:
             return False
-        self.dealer, self.players, self.round = self.history.pop()
+        r, ps, t, deck_len, self.cur_state = self.history.pop()
+        if len(self.dealer.deck) < deck_len:
+            self.dealer.deck.append(self.players[self.round.current_player].hand.pop())
+        self.round.current_player, self.round.last_player, self.round.player_before_act, \
+            self.round.valid_act, self.round.last_cards = r
+        player, player.hand[:], pile_len = ps
+        del player.pile[pile_len:]
+        table_len, table_top = t
+        del self.dealer.table[max(table_len-1, 0):]
+        if table_len > 0:
+            self.dealer.table.append(table_top)
         return True
 
     def get_state(self, player_id):
@@ -1,7 +1,6 @@
 from enum import Enum
 
 import numpy as np
-from copy import deepcopy
 from rlcard.games.limitholdem import Game
 from rlcard.games.limitholdem import PlayerStatus
 
@@ -133,14 +132,13 @@ class NolimitholdemGame(Game):
             raise Exception('Action not allowed')
 
         if self.allow_step_back:
-            # First snapshot the current state
-            r = deepcopy(self.round)
-            b = self.game_pointer
-            r_c = self.round_counter
-            d = deepcopy(self.dealer)
-            p = deepcopy(self.public_cards)
-            ps = deepcopy(self.players)
-            self.history.append((r, b, r_c, d, p, ps))
+            # Record what this step can change, so that it can be undone.
+            # Cards are never copied, the dealt public cards are moved back to the deck.
+            player = self.players[self.game_pointer]
+            r = (self.round.game_pointer, self.round.not_raise_num, self.round.not_playing_num, list(self.round.raised))
+            ps = (player, player.in_chips, player.remained_chips, player.status)
+            self.history.append((r, ps, self.game_pointer, self.round_counter, self.stage,
+                                 self.dealer.pot, len(self.public_cards)))
 
         # Then we proceed to the next round
         self.game_pointer = self.round.proceed_round(self.players, action)
@@ -216,8 +214,12 @@ class NolimitholdemGame(Game):
             (bool): True if the game steps back successfully
         """
         if len(self.history) > 0:
-            self.round, self.game_pointer, self.round_counter, self.dealer, self.public_cards, self.players = self.history.pop()
-            self.stage = Stage(self.round_counter)
+            r, ps, self.game_pointer, self.round_counter, self.stage, \
+                self.dealer.pot, num_public_cards = self.history.pop()
+            self.round.game_pointer, self.round.not_raise_num, self.round.not_playing_num, self.round.raised = r
+            player, player.in_chips, player.remained_chips, player.status = ps
+            while len(self.public_cards) > num_public_cards:
+                self.dealer.deck.append(self.public_cards.pop())
             return True
         return False
 
@@ -1,4 +1,3 @@
-from copy import deepcopy
 import numpy as np
 
 from rlcard.games.uno import Dealer
@@ -69,11 +68,21 @@ class UnoGame:
         '''
 
         if self.allow_step_back:
-            # First snapshot the current state
-            his_dealer = deepcopy(self.dealer)
-            his_round = deepcopy(self.round)
-            his_players = deepcopy(self.players)
-            self.history.append((his_dealer, his_players, his_round))
+            # Record what this step can change, so that it can be undone.
+            # A step takes at most 5 cards from the top of the deck, so only the top
+            # is recorded, unless the played cards may be shuffled back into the deck.
+            # The random state is recorded for the shuffles and the colors of the wild cards.
+            deck = self.dealer.deck
+            top = (deck[-1], deck[-1].color) if deck else None
+            if len(deck) <= 5:
+                deck_record = (list(deck), list(self.round.played_cards))
+            else:
+                deck_record = (len(deck), deck[-5:])
+            r = (self.round.target, self.round.current_player, self.round.direction,
+                 self.round.is_over, self.round.winner, len(self.round.played_cards))
+            hand = list(self.players[self.round.current_player].hand)
+            num_cards = [len(player.hand) for player in self.players]
+            self.history.append((r, hand, num_cards, top, deck_record, self.np_random.get_state()))
 
         self.round.proceed_round(self.players, action)
         player_id = self.round.current_player
@@ -88,7 +97,21 @@ class UnoGame:
         '''
         if not self.history:
             return False
-        self.dealer, self.players, self.round = self.history.pop()
+        r, hand, num_cards, top, deck_record, random_state = self.history.pop()
+        self.np_random.set_state(random_state)
+        self.round.target, self.round.current_player, self.round.direction, \
+            self.round.is_over, self.round.winner, num_played_cards = r
+        for player, num in zip(self.players, num_cards):
+            del player.hand[num:]
+        self.players[self.round.current_player].hand[:] = hand
+        if isinstance(deck_record[0], list):
+            self.dealer.deck[:], self.round.played_cards = deck_record
+        else:
+            deck_len, deck_top = deck_record
+            self.dealer.deck[deck_len-len(deck_top):] = deck_top
+            del self.round.played_cards[num_played_cards:]
+        if top is not None:
+            card, card.color = top
         return True
 
     def get_state(self, player_id):
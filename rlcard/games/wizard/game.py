@@ -1,5 +1,4 @@
 import random
-from copy import deepcopy
 from typing import Any
 
 import numpy as np
@@ -160,20 +159,12 @@ class WizardGame:
         '''
 
         if self.allow_step_back:
-            # save current state for potential step back
-            the_round = deepcopy(self.round)
-            the_players = deepcopy(self.players)
-            the_dealer = deepcopy(self.dealer)
-            the_round_counter = deepcopy(self.trick_amount_counter)
-            the_trick_history = deepcopy(self.trick_history)
-            the_trick_winner_card_history = deepcopy(
-                self.trick_winner_card_history)
-            the_playoffs = deepcopy(self.points)
-            the_reward = deepcopy(self.judge_points)
-            the_last_round_winner = deepcopy(self.last_round_winner_idx)
+            # record what this step can change, so that it can be undone
+            the_round = (dict(vars(self.round)), list(self.round.points), len(self.round.trick))
+            the_player = list(self.players[self.round.current_player_idx].hand)
             self.history.append(
-                (the_round, the_players, the_dealer, the_round_counter, the_trick_history, the_playoffs,
-                 the_last_round_winner, the_trick_winner_card_history))
+                (the_round, the_player, self.trick_amount_counter, len(self.trick_history), list(self.points),
+                 self.judge_points, self.last_round_winner_idx))
 
         # playing of a single step
         self.round.proceed_round(self.players, action)
@@ -206,9 +197,14 @@ class WizardGame:
 
     def step_back(self) -> bool:
         if len(self.history) > 0:
-            self.round, self.players, self.dealer, \
-            self.trick_amount_counter, self.trick_history, self.points, self.judge_points, \
-            self.last_round_winner_idx, self.trick_winner_card_history = self.history.pop()
+            the_round, the_player, self.trick_amount_counter, trick_history_len, self.points[:], \
+            self.judge_points, self.last_round_winner_idx = self.history.pop()
+            round_vars, points, trick_len = the_round
+            vars(self.round).update(round_vars)
+            self.round.points[:] = points
+            del self.round.trick[trick_len:]
+            self.players[self.round.current_player_idx].hand[:] = the_player
+            del self.trick_history[trick_history_len:]
             return True
         return False
 
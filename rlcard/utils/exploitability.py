@@ -0,0 +1,330 @@
+''' Exact best responses, NashConv and exploitability for small games
+'''
+import weakref
+
+import numpy as np
+
+from rlcard.games.base import Card
+
+class GameTree(object):
+    ''' The full game tree of an environment, walked once and cached as arrays.
+
+    The tree is built by enumerating the deals (the outcomes of chance) and
+    expanding every legal action with `step` and `step_back`, so the
+    environment must be made with `allow_step_back`. Every decision node
+    stores two keys:
+
+        - the policy key (player, obs, legal actions), which is what an agent
+          sees, and is used to query the evaluated policy once per key
+        - the best response key (player, obs, action history), which is the
+          information of a player with perfect recall in a game where all the
+          actions are public, such as poker
+
+    Once built, evaluating a policy does not touch the environment: the
+    reach probabilities are propagated forward and the values backward one
+    depth at a time with array operations, and the best response picks one
+    action per best response key by summing the counterfactual values of all
+    the nodes sharing the key.
+    '''
+
+    def __init__(self, env, deals=None):
+        ''' Walk the game tree of the environment
+
+        Args:
+            env (Env): The environment. It is reset by the walk, and the random
+              state of its game is restored afterwards.
+            deals (list): A list of (probability, set_deal) tuples, where set_deal
+              is a function that sets the cards of a freshly reset environment.
+              The deals of the game are used if None, see `DEALS`.
+        '''
+        if not env.allow_step_back:
+            raise ValueError("The game tree can only be walked in an environment with 'allow_step_back'.")
+        if deals is None:
+            if env.name not in DEALS:
+                raise ValueError("The deals of '{}' are unknown, please provide them.".format(env.name))
+            deals = DEALS[env.name](env)
+
+        self.num_players = env.num_players
+        self.num_actions = env.num_actions
+
+        # Nodes, edges and keys as lists while walking
+        self._depth, self._player, self._key, self._br_key, self._payoffs = [], [], [], [], {}
+        self._parent, self._child, self._action = [], [], []
+        self._key_index, self._br_key_index = {}, {}
+        # One state of each policy key, to query the agents
+        self.states = []
+
+        random_state = env.game.np_random.get_state()
+        timestep = env.timestep
+        roots, probs = [], []
+        for prob, set_deal in deals:
+            env.reset()
+            set_deal(env)
+            roots.append(self._walk(env, 0))
+            probs.append(prob)
+        env.game.np_random.set_state(random_state)
+        env.timestep = timestep
+
+        self.roots = np.array(roots)
+        self.root_probs = np.array(probs, dtype=float)
+        self.depth = np.array(self._depth)
+        self.player = np.array(self._player)
+        self.key = np.array(self._key)
+        self.br_key = np.array(self._br_key)
+        self.payoffs = np.zeros((len(self._player), self.num_players))
+        for node, payoffs in self._payoffs.items():
+            self.payoffs[node] = payoffs
+        self.num_keys = len(self._key_index)
+        self.num_br_keys = len(self._br_key_index)
+
+        # Sort the edges by the depth of the parent
+        parent, child, action = np.array(self._parent), np.array(self._child), np.array(self._action)
+        order = np.argsort(self.depth[parent], kind='stable')
+        self.parent, self.child, self.action = parent[order], child[order], action[order]
+        bounds = np.searchsorted(self.depth[self.parent], np.arange(self.depth.max() + 1))
+        self.levels = [slice(start, end) for start, end in zip(bounds, list(bounds[1:]) + [len(self.parent)])]
+
+        # The probability of chance to reach each node
+        self.chance_reach = np.zeros(len(self.depth))
+        self.chance_reach[self.roots] = self.root_probs
+        for level in self.levels:
+            self.chance_reach[self.child[level]] = self.chance_reach[self.parent[level]]
+
+        del self._depth, self._player, self._key, self._br_key, self._payoffs
+        del self._parent, self._child, self._action, self._key_index, self._br_key_index
+
+    def __len__(self):
+        return len(self.depth)
+
+    def _walk(self, env, depth):
+        ''' Add the current node and its subtree
+
+        Args:
+            env (Env): The environment
+            depth (int): The depth of the current node
+
+        Returns:
+            (int): The id of the current node
+        '''
+        node = len(self._player)
+        self._depth.append(depth)
+        if env.is_over():
+            self._player.append(-1)
+            self._key.append(-1)
+            self._br_key.append(-1)
+            self._payoffs[node] = env.get_payoffs()
+            return node
+
+        player = env.get_player_id()
+        state = env.get_state(player)
+        obs = state['obs'].tobytes()
+        legal_actions = list(state['legal_actions'].keys())
+
+        key = (player, obs, tuple(legal_actions))
+        if key not in self._key_index:
+            self._key_index[key] = len(self._key_index)
+            state['action_record'] = list(state['action_record'])
+            self.states.append((player, state))
+        br_key = (player, obs, tuple(env.action_recorder))
+        if br_key not in self._br_key_index:
+            self._br_key_index[br_key] = len(self._br_key_index)
+        self._player.append(player)
+        self._key.append(self._key_index[key])
+        self._br_key.append(self._br_key_index[br_key])
+
+        for action in legal_actions:
+            env.step(action)
+            child = self._walk(env, depth + 1)
+            env.step_back()
+            self._parent.append(node)
+            self._child.append(child)
+            self._action.append(action)
+        return node
+
+    def policy(self, agents):
+        ''' Query the action probabilities of the agents at every policy key
+
+        Args:
+            agents (list): List of Agent classes, one for each player. The agents
+              should report the probabilities of the legal actions in
+              info['probs'] of `eval_step`.
+
+        Returns:
+            (numpy.array): The probabilities of the actions, one row per policy key
+        '''
+        policy = np.zeros((self.num_keys, self.num_actions))
+        for key, (player, state) in enumerate(self.states):
+            _, info = agents[player].eval_step(state)
+            if 'probs' not in info:
+                raise ValueError('The agent of player {} does not report the action probabilities.'.format(player))
+            for action, raw_action in zip(state['legal_actions'], state['raw_legal_actions']):
+                policy[key, action] = info['probs'][raw_action]
+        return policy
+
+    def values(self, policy):
+        ''' Compute the expected payoffs when all the players follow the policy
+
+        Args:
+            policy (numpy.array): The action probabilities, see `policy`
+
+        Returns:
+            (numpy.array): The expected payoff of each player
+        '''
+        weights = policy[self.key[self.parent], self.action]
+        values = self.payoffs.copy()
+        for level in reversed(self.levels):
+            np.add.at(values, self.parent[level], weights[level, None] * values[self.child[level]])
+        return self.root_probs.dot(values[self.roots])
+
+    def best_response_values(self, policy):
+        ''' Compute the expected payoff of a best response of each player
+            against the other players following the policy
+
+        Args:
+            policy (numpy.array): The action probabilities, see `policy`
+
+        Returns:
+            (numpy.array): The expected payoff of the best response of each player
+        '''
+        weights = policy[self.key[self.parent], self.action]
+
+        # The reach probability of each node contributed by each player
+        reach = np.ones((len(self), self.num_players))
+        for level in self.levels:
+            parent, child = self.parent[level], self.child[level]
+            reach[child] = reach[parent]
+            reach[child, self.player[parent]] *= weights[level]
+
+        br_values = np.zeros(self.num_players)
+        for player_id in range(self.num_players):
+            opponent_reach = self.chance_reach * np.prod(np.delete(reach, player_id, axis=1), axis=1)
+            values = self.payoffs[:, player_id].copy()
+            action_values = np.full((self.num_br_keys, self.num_actions), -np.inf)
+            for level in reversed(self.levels):
+                parent, child, action = self.parent[level], self.child[level], self.action[level]
+                child_values = values[child]
+                mine = self.player[parent] == player_id
+
+                # The opponents follow the policy
+                np.add.at(values, parent[~mine], weights[level][~mine] * child_values[~mine])
+
+                # The player takes the action with the highest counterfactual value
+                parent, action, child_values = parent[mine], action[mine], child_values[mine]
+                br_key = self.br_key[parent]
+                action_values[br_key, action] = 0
+                np.add.at(action_values, (br_key, action), opponent_reach[parent] * child_values)
+                best = action == np.argmax(action_values[br_key], axis=1)
+                values[parent[best]] = child_values[best]
+            br_values[player_id] = self.root_probs.dot(values[self.roots])
+        return br_values
+
+    def nash_conv(self, agents):
+        ''' Compute the NashConv of the agents, i.e., the sum over the players
+            of the gain of a best response against the other agents
+
+        Args:
+            agents (list): List of Agent classes, one for each player
+
+        Returns:
+            (float): The NashConv
+        '''
+        policy = self.policy(agents)
+        return float(np.sum(self.best_response_values(policy) - self.values(policy)))
+
+    def exploitability(self, agents):
+        ''' Compute the exploitability of the agents, i.e., NashConv divided
+            by the number of players
+
+        Args:
+            agents (list): List of Agent classes, one for each player
+
+        Returns:
+            (float): The exploitability
+        '''
+        return self.nash_conv(agents) / self.num_players
+
+def leduc_holdem_deals(env):
+    ''' Enumerate the deals of Leduc Hold'em: the hands of the players, the
+        public card and the small blind
+
+    Args:
+        env (Env): The Leduc Hold'em environment
+
+    Returns:
+        (list): A list of (probability, set_deal) tuples
+    '''
+    deck = [Card(suit, rank) for rank in ['J', 'Q', 'K'] for suit in ['S', 'H']]
+    num_players = env.num_players
+
+    def deal(cards, public_card, small_blind):
+        def set_deal(env):
+            game = env.game
+            big_blind = (small_blind + 1) % num_players
+            for player, card in zip(game.players, cards):
+                player.hand = card
+                player.in_chips = 0
+            game.players[big_blind].in_chips = game.big_blind
+            game.players[small_blind].in_chips = game.small_blind
+            game.dealer.deck = [public_card]
+            game.game_pointer = small_blind
+            game.round.start_new_round(game_pointer=small_blind, raised=[p.in_chips for p in game.players])
+        return set_deal
+
+    deals = []
+    for cards in _permutations(deck, num_players + 1):
+        for small_blind in range(num_players):
+            deals.append(deal(cards[:-1], cards[-1], small_blind))
+    return [(1.0 / len(deals), set_deal) for set_deal in deals]
+
+def _permutations(items, k):
+    ''' Enumerate the ordered selections of k distinct items
+    '''
+    if k == 0:
+        return [[]]
+    return [[item] + rest for i, item in enumerate(items) for rest in _permutations(items[:i] + items[i+1:], k - 1)]
+
+# The deals of the games whose trees are small enough to be walked
+DEALS = {
+    'leduc-holdem': leduc_holdem_deals,
+}
+
+# The game trees built by `nash_conv` and `exploitability`
+_trees = weakref.WeakKeyDictionary()
+
+def _get_tree(env):
+    if env not in _trees:
+        _trees[env] = GameTree(env)
+    return _trees[env]
+
+def _as_list(agents, env):
+    if isinstance(agents, (list, tuple)):
+        return list(agents)
+    return [agents for _ in range(env.num_players)]
+
+def nash_conv(env, agents):
+    ''' Compute the NashConv of the agents in an environment. The game tree
+        is built by the first call and cached for the environment.
+
+    Args:
+        env (Env): The environment, made with `allow_step_back`
+        agents (list): List of Agent classes, one for each player, or one
+          agent playing all the seats
+
+    Returns:
+        (float): The NashConv
+    '''
+    return _get_tree(env).nash_conv(_as_list(agents, env))
+
+def exploitability(env, agents):
+    ''' Compute the exploitability of the agents in an environment. The game
+        tree is built by the first call and cached for the environment.
+
+    Args:
+        env (Env): The environment, made with `allow_step_back`
+        agents (list): List of Agent classes, one for each player, or one
+          agent playing all the seats
+
+    Returns:
+        (float): The exploitability
+    '''
+    return _get_tree(env).exploitability(_as_list(agents, env))
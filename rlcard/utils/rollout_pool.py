@@ -0,0 +1,195 @@
+''' A pool of worker processes that play games in parallel
+'''
+import multiprocessing
+import queue
+import traceback
+
+import numpy as np
+
+from rlcard.utils import seeding
+from rlcard.utils.utils import set_seed
+
+class RolloutPool(object):
+    ''' Play games of an environment in several worker processes.
+
+    Each worker holds its own environment created by `rlcard.make` and a
+    copy of the agents. The parameters of PyTorch models reachable from the
+    agents are moved to shared memory before the workers are started, so
+    in-place updates done by the master process (e.g., optimizer steps)
+    are seen by the workers without copying the weights. Other attributes
+    of the agents are a snapshot taken when the pool is created.
+
+    The games of every call are split statically among the workers and the
+    results are returned in worker order, so that the output only depends
+    on the master seed and the number of workers.
+    '''
+
+    def __init__(self, env_id, agents, num_workers, config={}, seed=None, start_method='fork', poll_interval=1.):
+        ''' Initialize the pool and start the workers
+
+        Args:
+            env_id (string): The name of the environment
+            agents (list): List of Agent classes, one for each player
+            num_workers (int): The number of worker processes
+            config (dict): A config dictionary passed to `rlcard.make`. The 'seed'
+                field is overwritten with the seed of each worker.
+            seed (int): The master seed. Worker i is seeded with a hash of seed + i,
+                or from the operating system if seed is None.
+            start_method (string): The multiprocessing start method
+            poll_interval (float): How many seconds `run` waits for a result
+                before checking that the workers are alive
+        '''
+        self.env_id = env_id
+        self.poll_interval = poll_interval
+        self.agents = agents
+        self.num_workers = num_workers
+        self.num_players = len(agents)
+
+        for agent in agents:
+            _share_memory(agent)
+
+        ctx = multiprocessing.get_context(start_method)
+        self._result_queue = ctx.Queue()
+        self._task_queues = []
+        self._workers = []
+        for worker_id in range(num_workers):
+            # Workers are always seeded, otherwise forked workers would share the random state
+            if seed is None:
+                worker_seed = seeding.create_seed(max_bytes=4)
+            else:
+                worker_seed = seeding.hash_seed(seed + worker_id, max_bytes=4)
+            _config = config.copy()
+            _config['seed'] = worker_seed
+            task_queue = ctx.Queue()
+            worker = ctx.Process(
+                target=_worker,
+                args=(worker_id, env_id, _config, agents, worker_seed, task_queue, self._result_queue),
+                daemon=True,
+            )
+            worker.start()
+            self._task_queues.append(task_queue)
+            self._workers.append(worker)
+
+    def run(self, num_games, is_training=False):
+        ''' Play games in the workers
+
+        Args:
+            num_games (int): The total number of games to play
+            is_training (boolean): True if for training purpose.
+
+        Returns:
+            (tuple) Tuple containing:
+
+                (list): A list with the trajectories of each game, in the format of `Env.run`.
+                (list): A list with the payoffs of each game.
+        '''
+        counts = [num_games // self.num_workers] * self.num_workers
+        for worker_id in range(num_games % self.num_workers):
+            counts[worker_id] += 1
+        for task_queue, count in zip(self._task_queues, counts):
+            task_queue.put((count, is_training))
+
+        results = [[] for _ in range(self.num_workers)]
+        done = [False] * self.num_workers
+        while not all(done):
+            try:
+                worker_id, result = self._result_queue.get(timeout=self.poll_interval)
+            except queue.Empty:
+                # A worker killed by a signal or the OOM killer never reports
+                for worker_id, worker in enumerate(self._workers):
+                    if not done[worker_id] and not worker.is_alive():
+                        exitcode = worker.exitcode
+                        self.close()
+                        raise RuntimeError('Worker {} died with exit code {}'.format(worker_id, exitcode))
+                continue
+            if isinstance(result, str):
+                self.close()
+                raise RuntimeError('Worker {} failed:\n{}'.format(worker_id, result))
+            if result is None:
+                done[worker_id] = True
+            else:
+                results[worker_id].append(result)
+
+        trajectories, payoffs = [], []
+        for worker_results in results:
+            for _trajectories, _payoffs in worker_results:
+                trajectories.append(_trajectories)
+                payoffs.append(_payoffs)
+
+        return trajectories, payoffs
+
+    def tournament(self, num):
+        ''' Evaluate the performance of the agents, see `rlcard.utils.tournament`
+
+        Args:
+            num (int): The number of games to play.
+
+        Returns:
+            A list of avrage payoffs for each player
+        '''
+        _, payoffs = self.run(num, is_training=False)
+        return list(np.mean(np.array(payoffs, dtype=float), axis=0))
+
+    def close(self):
+        ''' Stop the workers
+        '''
+        for task_queue in self._task_queues:
+            task_queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout=1)
+            if worker.is_alive():
+                worker.terminate()
+        self._task_queues = []
+        self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+def _worker(worker_id, env_id, config, agents, seed, task_queue, result_queue):
+    ''' The loop of a worker process. Each task is a tuple (num_games, is_training).
+        The results of the games are put in the result queue one by one,
+        followed by None when the task is done.
+    '''
+    from rlcard.envs import make
+
+    try:
+        try:
+            import torch
+            torch.set_num_threads(1)
+        except ImportError:
+            pass
+        set_seed(seed)
+        env = make(env_id, config=config)
+        env.set_agents(agents)
+
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            num_games, is_training = task
+            for _ in range(num_games):
+                result_queue.put((worker_id, env.run(is_training=is_training)))
+            result_queue.put((worker_id, None))
+    except Exception:
+        result_queue.put((worker_id, traceback.format_exc()))
+
+def _share_memory(obj, depth=3):
+    ''' Move the parameters of the PyTorch models reachable from an object
+        to shared memory
+
+    Args:
+        obj (object): An agent, or an attribute of an agent
+        depth (int): How many levels of attributes to search
+    '''
+    try:
+        import torch
+    except ImportError:
+        return
+    if isinstance(obj, torch.nn.Module):
+        obj.share_memory()
+    elif depth > 0 and hasattr(obj, '__dict__'):
+        for value in vars(obj).values():
+            _share_memory(value, depth-1)
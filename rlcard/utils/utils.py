@@ -175,6 +175,74 @@ def reorganize(trajectories, payoffs):
             new_trajectories[player].append(transition)
     return new_trajectories
 
+def reorganize_arrays(trajectories, payoffs, num_actions):
+    ''' Reorganize the trajectory into arrays of transitions, a vectorized
+        version of `reorganize`
+
+    Args:
+        trajectories (list): A list of trajectories
+        payoffs (list): A list of payoffs for the players. Each entry corresponds to one player
+        num_actions (int): The number of actions
+
+    Returns:
+        (list): For each player, a tuple of arrays (states, actions, rewards,
+          next_states, legal_actions, dones) with one row per transition, where
+          legal_actions are boolean masks of the legal actions of the next states.
+          It can be fed into `DQNAgent.feed_many`.
+    '''
+    new_trajectories = []
+    for player, trajectory in enumerate(trajectories):
+        obs = np.stack([trajectory[i]['obs'] for i in range(0, len(trajectory), 2)]).astype(np.float32)
+        num_transitions = len(obs) - 1
+
+        actions = np.array(trajectory[1::2], dtype=np.int64)
+        rewards = np.zeros(num_transitions, dtype=np.float32)
+        dones = np.zeros(num_transitions, dtype=bool)
+        if num_transitions > 0:
+            rewards[-1] = payoffs[player]
+            dones[-1] = True
+
+        legal_actions = np.zeros((num_transitions, num_actions), dtype=bool)
+        rows, cols = [], []
+        for i in range(num_transitions):
+            next_legal_actions = list(trajectory[2*i+2]['legal_actions'].keys())
+            rows.extend([i] * len(next_legal_actions))
+            cols.extend(next_legal_actions)
+        legal_actions[rows, cols] = True
+
+        new_trajectories.append((obs[:-1], actions, rewards, obs[1:], legal_actions, dones))
+    return new_trajectories
+
+def n_step_returns(rewards, dones, n_step, discount_factor):
+    ''' Compute the n-step returns of consecutive transitions. The returns
+        do not cross the end of the episodes.
+
+    Args:
+        rewards (numpy.array): The rewards of the transitions
+        dones (numpy.array): Whether each transition ends an episode. The last one should.
+        n_step (int): The number of steps
+        discount_factor (float): The discount factor
+
+    Returns:
+        (tuple): Tuple containing:
+
+            (numpy.array): The discounted sum of the rewards of the next n_step
+              transitions of each transition, in the same episode
+            (numpy.array): The index of the last of these transitions, whose next
+              state should be used to bootstrap
+    '''
+    ends = np.flatnonzero(dones)
+    if len(ends) == 0 or ends[-1] != len(rewards) - 1:
+        raise ValueError('The transitions should end with the end of an episode.')
+    t = np.arange(len(rewards))
+    last = np.minimum(t + n_step - 1, ends[np.searchsorted(ends, t)])
+
+    returns = np.zeros(len(rewards), dtype=np.float32)
+    for k in range(n_step):
+        valid = t + k <= last
+        returns[valid] += discount_factor ** k * rewards[t[valid] + k]
+    return returns, last
+
 def remove_illegal(action_probs, legal_actions):
     ''' Remove illegal actions and normalize the
         probability vector
@@ -3,6 +3,7 @@ import numpy as np
 
 import rlcard
 from rlcard.agents.cfr_agent import CFRAgent
+from rlcard.agents.cfr_table import CFRTable
 
 class TestNFSP(unittest.TestCase):
 
@@ -34,4 +35,89 @@ class TestNFSP(unittest.TestCase):
         self.assertEqual(len(agent.average_policy), len(new_agent.average_policy))
         self.assertEqual(len(agent.regrets), len(new_agent.regrets))
         self.assertEqual(agent.iteration, new_agent.iteration)
+        # The accumulators are restored exactly, so that training can be resumed
+        self.assertTrue(np.array_equal(agent.table.regrets[:len(agent.table)], new_agent.table.regrets[:len(new_agent.table)]))
+        self.assertTrue(np.array_equal(agent.table.average_policy[:len(agent.table)], new_agent.table.average_policy[:len(new_agent.table)]))
 
+        # The policies are also dict-like, keyed by the information sets
+        for key in agent.average_policy:
+            self.assertTrue(np.array_equal(agent.average_policy[key], new_agent.average_policy[key]))
+        self.assertNotIn(b'unknown', new_agent.policy)
+        with self.assertRaises(KeyError):
+            new_agent.policy[b'unknown']
+
+        mapped_agent = CFRAgent(env, model_path='experiments/cfr_model')
+        mapped_agent.load(mmap_mode='r')
+        self.assertTrue(np.allclose(agent.table.average_policy[:len(agent.table)], mapped_agent.table.average_policy[:len(mapped_agent.table)]))
+        state = {'obs': np.array([1., 1., 0., 0., 0., 0.]), 'legal_actions': {0: None,2: None}, 'raw_legal_actions': ['call', 'fold']}
+        action, _ = mapped_agent.eval_step(state)
+        self.assertIn(action, [0, 2])
+
+    def test_table(self):
+        table = CFRTable(num_actions=3, capacity=1)
+        for i in range(5):
+            self.assertEqual(table.intern(str(i).encode()), i)
+        self.assertEqual(table.intern(b'0'), 0)
+        self.assertEqual(len(table), 5)
+        self.assertIsNone(table.lookup(b'5'))
+
+        table.regrets[1] = [1., -1., 3.]
+        table.regrets[2] = [-1., -1., 0.]
+        table.update_policy()
+        self.assertTrue(np.allclose(table.policy[1], [0.25, 0., 0.75]))
+        self.assertTrue(np.allclose(table.policy[2], [1/3, 1/3, 1/3]))
+
+        new_table = CFRTable.from_dicts(3, *table.to_dicts())
+        self.assertEqual(new_table.keys, table.keys)
+        self.assertTrue(np.array_equal(new_table.policy[:5], table.policy[:5]))
+
+    def test_checkpoint(self):
+        path = 'experiments/cfr_table'
+        table = CFRTable(num_actions=3, capacity=1)
+        for i in range(5):
+            idx = table.intern(str(i).encode())
+            table.regrets[idx] = i
+        table.update_policy()
+        self.assertEqual(table.save(path, metadata={'iteration': 1}), 5)
+
+        # Only the changed and the new rows are written
+        table.regrets[2] = [1., 2., 3.]
+        idx = table.intern(b'long key')
+        table.regrets[idx] = 5
+        self.assertEqual(table.save(path), 2)
+        self.assertEqual(table.save(path), 0)
+
+        for mmap_mode in [None, 'r']:
+            new_table = CFRTable.load(path, mmap_mode=mmap_mode)
+            self.assertEqual(len(new_table), 6)
+            self.assertEqual(list(new_table.keys), table.keys)
+            for key in table.keys:
+                self.assertEqual(new_table.lookup(key), table.lookup(key))
+            self.assertIsNone(new_table.lookup(b'5'))
+            self.assertTrue(np.array_equal(new_table.regrets[:6], table.regrets[:6]))
+            self.assertEqual(new_table.metadata, {})
+        with self.assertRaises(ValueError):
+            new_table.intern(b'5')
+
+        # A different table is written from scratch
+        table = CFRTable(num_actions=3)
+        table.intern(b'5')
+        self.assertEqual(table.save(path), 1)
+        self.assertEqual(CFRTable.load(path).keys, [b'5'])
+
+    def test_variants(self):
+        env = rlcard.make('leduc-holdem', config={'allow_step_back':True})
+        for variant in ['cfr+', 'linear', 'dcfr']:
+            agent = CFRAgent(env, model_path='experiments/cfr_model', variant=variant)
+            for _ in range(10):
+                agent.train()
+            self.assertTrue(np.allclose(agent.table.policy[:len(agent.table)].sum(axis=1), 1))
+            if variant == 'cfr+':
+                self.assertTrue((agent.table.regrets[:len(agent.table)] >= 0).all())
+
+            state = {'obs': np.array([1., 1., 0., 0., 0., 0.]), 'legal_actions': {0: None,2: None}, 'raw_legal_actions': ['call', 'fold']}
+            action, _ = agent.eval_step(state)
+            self.assertIn(action, [0, 2])
+
+        with self.assertRaises(ValueError):
+            CFRAgent(env, variant='unknown')
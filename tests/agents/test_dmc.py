@@ -0,0 +1,162 @@
+import unittest
+import multiprocessing
+import numpy as np
+import torch
+
+import rlcard
+from rlcard.envs import VecEnv
+from rlcard.agents.dmc_agent.model import DMCAgent, DMCModel
+from rlcard.agents.dmc_agent.utils import StagingBuffer
+from rlcard.agents.dmc_agent.inference_server import InferenceServer
+from rlcard.agents.dmc_agent.parameter_store import ParameterStore
+from rlcard.agents.dmc_agent.metrics import Metrics, TimedAgent
+from rlcard.agents.random_agent import RandomAgent
+
+class TestDMC(unittest.TestCase):
+
+    def test_predict_batch(self):
+        env = rlcard.make('doudizhu', config={'seed': 0})
+        table = env.get_action_feature_table()
+        agent = DMCAgent(env.state_shape[0], env.action_shape[0], mlp_layers=[16], device='cpu')
+        table_agent = DMCAgent(env.state_shape[0], env.action_shape[0], mlp_layers=[16], device='cpu', action_features=table)
+        table_agent.load_state_dict(agent.state_dict())
+
+        states = []
+        for _ in range(3):
+            state, _ = env.reset()
+            states.append(state)
+        predictions = agent.predict_batch(states)
+        self.assertEqual(len(predictions), 3)
+        for state, (action_keys, values), (table_keys, table_values) in zip(states, predictions, table_agent.predict_batch(states)):
+            self.assertEqual(list(action_keys), list(state['legal_actions'].keys()))
+            self.assertTrue(np.array_equal(action_keys, table_keys))
+            self.assertTrue(np.allclose(values, table_values, atol=1e-6))
+            _, single_values = agent.predict(state)
+            self.assertTrue(np.allclose(values, single_values, atol=1e-6))
+
+            # Same values as the forward pass on the repeated observation
+            obs = torch.from_numpy(np.repeat(state['obs'][np.newaxis].astype(np.float32), len(action_keys), axis=0))
+            actions = torch.from_numpy(table[action_keys].astype(np.float32))
+            self.assertTrue(np.allclose(values, agent.forward(obs, actions).detach().numpy(), atol=1e-5))
+
+        actions = table_agent.step_batch(states)
+        for state, action in zip(states, actions):
+            self.assertIn(action, state['legal_actions'])
+        actions, infos = table_agent.eval_step_batch(states)
+        for state, action, info in zip(states, actions, infos):
+            self.assertIn(action, state['legal_actions'])
+            self.assertEqual(len(info['values']), len(state['legal_actions']))
+
+    def test_one_hot(self):
+        env = VecEnv('leduc-holdem', 4, config={'seed': 0})
+        action_shape = [[env.num_actions] for _ in range(env.num_players)]
+        model = DMCModel(env.state_shape, action_shape, mlp_layers=[16], device='cpu',
+                         action_features=env.envs[0].get_action_feature_table())
+        env.set_agents(model.get_agents())
+        trajectories, payoffs = env.run(is_training=True)
+        self.assertEqual(len(trajectories), 4)
+
+        agent = model.get_agent(0)
+        one_hot_agent = DMCAgent(env.state_shape[0], action_shape[0], mlp_layers=[16], device='cpu')
+        one_hot_agent.load_state_dict(agent.state_dict())
+        state = trajectories[0][0][0]
+        self.assertTrue(np.allclose(agent.predict(state)[1], one_hot_agent.predict(state)[1]))
+
+    def test_staging_buffer(self):
+        T = 4
+        staging = StagingBuffer(dict(target=((), np.float32), state=((2,), np.int8)), capacity=3)
+        buffers = dict(target=[torch.zeros(T) for _ in range(2)], state=[torch.zeros((T, 2), dtype=torch.int8) for _ in range(2)])
+        steps = []
+        for n in [3, 1, 5, 2]:
+            targets = np.arange(len(steps), len(steps) + n, dtype=np.float32)
+            steps.extend(targets)
+            staging.append(dict(target=targets, state=np.stack([targets, -targets], axis=1)))
+        self.assertEqual(len(staging), 11)
+
+        for chunk in range(2):
+            staging.pop(buffers, chunk, T)
+            expected = steps[chunk*T:(chunk+1)*T]
+            self.assertTrue(np.array_equal(buffers['target'][chunk].numpy(), expected))
+            self.assertTrue(np.array_equal(buffers['state'][chunk][:, 1].numpy(), -np.array(expected)))
+        self.assertEqual(len(staging), 3)
+
+        # The pending steps are kept when the arrays are compacted
+        staging.append(dict(target=np.array([11.], dtype=np.float32), state=np.array([[11, -11]])))
+        staging.pop(buffers, 0, T)
+        self.assertTrue(np.array_equal(buffers['target'][0].numpy(), [8., 9., 10., 11.]))
+        self.assertEqual(len(staging), 0)
+
+    def test_inference_server(self):
+        env = rlcard.make('leduc-holdem', config={'seed': 0})
+        action_shape = [[env.num_actions] for _ in range(env.num_players)]
+        model = DMCModel(env.state_shape, action_shape, mlp_layers=[16], device='cpu',
+                         action_features=env.get_action_feature_table())
+        model.share_memory()
+        server = InferenceServer(multiprocessing.get_context('fork'), model, num_actors=2, max_latency=0.01)
+        server.start()
+        try:
+            clients = [server.get_client(i) for i in range(2)]
+            for client in clients:
+                agents = client.get_agents(env.num_players, exp_epsilon=0)
+                state, player_id = env.reset()
+                action_keys, values = agents[player_id].predict(state)
+                _, expected_values = model.get_agent(player_id).predict(state)
+                self.assertTrue(np.allclose(values, expected_values, atol=1e-6))
+                self.assertIn(agents[player_id].step(state), state['legal_actions'])
+
+            # The weights updated by the learner are used by the server
+            for parameter in model.get_agent(player_id).parameters():
+                parameter.data.zero_()
+            _, values = agents[player_id].predict(state)
+            self.assertTrue(np.allclose(values, 0))
+        finally:
+            server.close()
+
+    def test_parameter_store(self):
+        env = rlcard.make('leduc-holdem')
+        action_shape = [[env.num_actions] for _ in range(env.num_players)]
+        learner_model = DMCModel(env.state_shape, action_shape, mlp_layers=[16], device='cpu')
+        actor_model = DMCModel(env.state_shape, action_shape, mlp_layers=[16], device='cpu')
+        store = ParameterStore(learner_model, sync_interval=2)
+
+        learner, actor = learner_model.get_agent(1), actor_model.get_agent(1)
+        self.assertEqual(store.pull(1, actor, 0), 0)
+        for step in range(1, 6):
+            for parameter in learner.parameters():
+                parameter.data.fill_(step)
+            store.update(1, learner)
+        # Published after the steps 2 and 4
+        self.assertEqual(store.pull(1, actor, 0), 2)
+        for parameter in actor.parameters():
+            self.assertTrue((parameter == 4).all())
+        self.assertEqual(store.pull(1, actor, 2), 2)
+        self.assertEqual(store.pull(0, actor_model.get_agent(0), 0), 0)
+
+    def test_metrics(self):
+        metrics = Metrics(num_writers=2)
+        actor, learner = metrics.writer(0), metrics.writer(1)
+        env = rlcard.make('leduc-holdem')
+        env.set_agents([TimedAgent(RandomAgent(env.num_actions), actor) for _ in range(env.num_players)])
+        trajectories, _ = env.run(is_training=True)
+        actor.add('episodes')
+        actor.add('free_gets', 3)
+        actor.add('full_puts', 3)
+        learner.add('full_gets', 2)
+        learner.observe('batch_wait', 0.003)
+
+        report = metrics.report(num_buffers=10)
+        self.assertEqual(actor.get('decisions'), sum(len(trajectory) // 2 for trajectory in trajectories))
+        self.assertGreater(report['episodes_per_second'], 0)
+        self.assertEqual(report['free_queue_depth'], 7)
+        self.assertEqual(report['full_queue_depth'], 1)
+        self.assertEqual(report['batch_wait_p50'], 2.0 ** -8)
+        self.assertEqual(report['pull_p95'], 0)
+
+        # The rates and the latencies are computed since the last report
+        report = metrics.report(num_buffers=10)
+        self.assertEqual(report['episodes_per_second'], 0)
+        self.assertEqual(report['batch_wait_p50'], 0)
+        self.assertEqual(report['full_queue_depth'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,7 @@ import unittest
 import torch
 import numpy as np
 
-from rlcard.agents.dqn_agent import DQNAgent
+from rlcard.agents.dqn_agent import DQNAgent, Memory, PrioritizedMemory
 
 class TestDQN(unittest.TestCase):
 
@@ -51,3 +51,109 @@ class TestDQN(unittest.TestCase):
         predicted_action = agent.step({'obs': np.random.random_sample((2,)), 'legal_actions': {0: None, 1: None}})
         self.assertGreaterEqual(predicted_action, 0)
         self.assertLessEqual(predicted_action, 1)
+
+    def test_step_batch(self):
+
+        agent = DQNAgent(state_shape=[2],
+                         mlp_layers=[10,10],
+                         device=torch.device('cpu'))
+        states = [{'obs': np.random.random_sample((2,)), 'legal_actions': {1: None}, 'raw_legal_actions': ['raise']} for _ in range(8)]
+
+        actions = agent.step_batch(states)
+        self.assertEqual(actions, [1] * 8)
+
+        actions, infos = agent.eval_step_batch(states)
+        self.assertEqual(actions, [1] * 8)
+        self.assertEqual(len(infos), 8)
+
+    def test_memory(self):
+        memory = Memory(memory_size=4, batch_size=3, num_actions=10)
+        for i in range(6):
+            memory.save(np.full(2, i), i, float(i), np.full(2, i+1), [i, 9], i == 5)
+        self.assertEqual(len(memory), 4)
+
+        # The oldest transitions are replaced
+        state_batch, action_batch, reward_batch, next_state_batch, legal_actions_batch, done_batch = memory.sample()
+        self.assertEqual(state_batch.shape, (3, 2))
+        self.assertEqual(legal_actions_batch.shape, (3, 10))
+        self.assertEqual(len(set(action_batch)), 3)
+        for state, action, reward, next_state, legal_actions, done in zip(state_batch, action_batch, reward_batch, next_state_batch, legal_actions_batch, done_batch):
+            self.assertIn(action, [2, 3, 4, 5])
+            self.assertTrue(np.array_equal(state, [action, action]))
+            self.assertEqual(reward, action)
+            self.assertTrue(np.array_equal(next_state, [action+1, action+1]))
+            self.assertEqual(list(np.flatnonzero(legal_actions)), [action, 9])
+            self.assertEqual(done, action == 5)
+
+    def test_memory_infers_num_actions(self):
+        memory = Memory(4, 2)
+        memory.save(np.zeros(2), 0, 0., np.zeros(2), [1, 3], False)
+        memory.save(np.zeros(2), 1, 0., np.zeros(2), [0, 12], True)
+        _, action_batch, _, _, legal_actions_batch, _ = memory.sample()
+        self.assertEqual(memory.num_actions, 13)
+        self.assertEqual(legal_actions_batch.shape, (2, 13))
+        for action, legal_actions in zip(action_batch, legal_actions_batch):
+            self.assertEqual(list(np.flatnonzero(legal_actions)), [1, 3] if action == 0 else [0, 12])
+
+    def test_prioritized_memory(self):
+        memory = PrioritizedMemory(memory_size=5, batch_size=1000, num_actions=2, alpha=1.0, eps=0.)
+        for i in range(7):
+            memory.save(np.full(2, i), i, 0., np.full(2, i), [0], False)
+        self.assertEqual(len(memory), 5)
+        self.assertAlmostEqual(memory.tree[1], 5)
+
+        memory.update_priorities(np.arange(5), np.array([1., 0., 2., 0., 1.]))
+        self.assertAlmostEqual(memory.tree[1], 4)
+        batch = memory.sample(beta=1.)
+        action_batch, weight_batch, indices = batch[1], batch[6], batch[7]
+        self.assertTrue(set(indices) <= {0, 2, 4})
+        self.assertAlmostEqual(np.mean(indices == 2), 0.5, places=2)
+        self.assertTrue(np.array_equal(action_batch, np.array([5, 6, 2, 3, 4])[indices]))
+        self.assertTrue(np.allclose(weight_batch[indices == 2], 0.5))
+        self.assertTrue(np.allclose(weight_batch[indices != 2], 1.))
+
+    def test_train_prioritized(self):
+
+        agent = DQNAgent(replay_memory_size=200,
+                         replay_memory_init_size=100,
+                         update_target_estimator_every=10,
+                         state_shape=[2],
+                         mlp_layers=[10,10],
+                         prioritized_replay=True,
+                         device=torch.device('cpu'))
+
+        for _ in range(300):
+            ts = [{'obs': np.random.random_sample((2,)), 'legal_actions': {0: None, 1: None}}, np.random.randint(2), np.random.random_sample(), {'obs': np.random.random_sample((2,)), 'legal_actions': {0: None, 1: None}, 'raw_legal_actions': ['call', 'raise']}, True]
+            agent.feed(ts)
+        self.assertEqual(agent.train_t, 201)
+        self.assertNotEqual(agent.memory.max_priority, 1.0)
+
+    def test_feed_many(self):
+        trajectories = []
+        for _ in range(20):
+            obs = np.random.random_sample((4, 2)).astype(np.float32)
+            trajectories.append((obs[:-1], np.random.randint(2, size=3), np.array([0., 0., 1.], dtype=np.float32),
+                                 obs[1:], np.array([[True, True], [True, False], [False, False]]), np.array([False, False, True])))
+
+        agents = [DQNAgent(replay_memory_size=100, replay_memory_init_size=40, state_shape=[2], mlp_layers=[10], device=torch.device('cpu')) for _ in range(2)]
+        for transitions in trajectories:
+            agents[0].feed_many(transitions)
+            for ts in zip(*transitions):
+                agents[1].feed([{'obs': ts[0]}, ts[1], ts[2], {'obs': ts[3], 'legal_actions': {a: None for a in np.flatnonzero(ts[4])}}, ts[5]])
+        self.assertEqual(agents[0].total_t, agents[1].total_t)
+        self.assertEqual(agents[0].train_t, agents[1].train_t)
+        for name in ['states', 'actions', 'rewards', 'next_states', 'legal_actions', 'dones']:
+            self.assertTrue(np.array_equal(getattr(agents[0].memory, name), getattr(agents[1].memory, name)))
+
+        # With n-step returns, the transitions fed one by one are stored at the end of the episode
+        agent = DQNAgent(replay_memory_size=100, replay_memory_init_size=40, state_shape=[2], mlp_layers=[10], device=torch.device('cpu'), n_step=2, discount_factor=0.5)
+        transitions = trajectories[0]
+        for ts in list(zip(*transitions))[:2]:
+            agent.feed([{'obs': ts[0]}, ts[1], ts[2], {'obs': ts[3], 'legal_actions': {a: None for a in np.flatnonzero(ts[4])}}, ts[5]])
+        self.assertEqual(len(agent.memory), 0)
+        ts = list(zip(*transitions))[2]
+        agent.feed([{'obs': ts[0]}, ts[1], ts[2], {'obs': ts[3], 'legal_actions': {}}, ts[5]])
+        self.assertEqual(len(agent.memory), 3)
+        self.assertTrue(np.allclose(agent.memory.rewards[:3], [0., 0.5, 1.]))
+        self.assertTrue(np.array_equal(agent.memory.next_states[:3], transitions[3][[1, 2, 2]]))
+        self.assertTrue(np.array_equal(agent.memory.dones[:3], [False, True, True]))
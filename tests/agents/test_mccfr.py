@@ -0,0 +1,54 @@
+import unittest
+import numpy as np
+
+import rlcard
+from rlcard.agents.mccfr_agent import MCCFRAgent
+
+class TestMCCFR(unittest.TestCase):
+
+    def test_train(self):
+        env = rlcard.make('leduc-holdem', config={'allow_step_back':True})
+        for sampling in ['external', 'outcome']:
+            agent = MCCFRAgent(env, model_path='experiments/mccfr_model', sampling=sampling)
+
+            for _ in range(100):
+                agent.train()
+            self.assertEqual(agent.iteration, 100)
+            self.assertGreater(agent.iterations_per_second, 0)
+            self.assertTrue(np.allclose(agent.table.policy[:len(agent.table)].sum(axis=1), 1))
+
+            state = {'obs': np.array([1., 1., 0., 0., 0., 0.]), 'legal_actions': {0: None,2: None}, 'raw_legal_actions': ['call', 'fold']}
+            action, _ = agent.eval_step(state)
+            self.assertIn(action, [0, 2])
+
+        with self.assertRaises(ValueError):
+            MCCFRAgent(env, sampling='unknown')
+
+    def test_train_limit_holdem(self):
+        env = rlcard.make('limit-holdem', config={'allow_step_back':True})
+        agent = MCCFRAgent(env, model_path='experiments/mccfr_model', sampling='outcome')
+        for _ in range(10):
+            agent.train()
+        self.assertGreater(len(agent.table), 0)
+
+    def test_save_and_load(self):
+        env = rlcard.make('leduc-holdem', config={'allow_step_back':True})
+        agent = MCCFRAgent(env, model_path='experiments/mccfr_model')
+        for _ in range(10):
+            agent.train()
+        agent.save()
+
+        new_agent = MCCFRAgent(env, model_path='experiments/mccfr_model')
+        new_agent.load()
+        self.assertEqual(len(agent.table), len(new_agent.table))
+        self.assertTrue(np.array_equal(agent.table.regrets[:len(agent.table)], new_agent.table.regrets[:len(new_agent.table)]))
+        self.assertTrue(np.array_equal(agent.table.average_policy[:len(agent.table)], new_agent.table.average_policy[:len(new_agent.table)]))
+        self.assertEqual(agent.iteration, new_agent.iteration)
+
+        # float32 is only for serving
+        agent.save(dtype=np.float32)
+        new_agent.load()
+        self.assertTrue(np.allclose(agent.table.average_policy[:len(agent.table)], new_agent.table.average_policy[:len(new_agent.table)]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,7 @@ import unittest
 import torch
 import numpy as np
 
-from rlcard.agents.nfsp_agent import NFSPAgent
+from rlcard.agents.nfsp_agent import NFSPAgent, ReservoirBuffer
 
 class TestNFSP(unittest.TestCase):
 
@@ -45,3 +45,45 @@ class TestNFSP(unittest.TestCase):
 
             ts = [{'obs': np.random.random_sample((2,)), 'legal_actions': {0: None, 1: None}}, np.random.randint(2), 0, {'obs': np.random.random_sample((2,)), 'legal_actions': {0: None, 1: None}, 'raw_legal_actions': ['call', 'raise']}, True]
             agent.feed(ts)
+
+    def test_step_batch(self):
+
+        agent = NFSPAgent(num_actions=2,
+                          state_shape=[2],
+                          hidden_layers_sizes=[10,10],
+                          q_mlp_layers=[10,10],
+                          device=torch.device('cpu'))
+        states = [{'obs': np.random.random_sample((2,)), 'legal_actions': {0: None, 1: None}, 'raw_legal_actions': ['call', 'raise']} for _ in range(8)]
+
+        for _ in range(10):
+            agent.sample_episode_policy()
+            actions = agent.step_batch(states)
+            self.assertEqual(len(actions), 8)
+            for action in actions:
+                self.assertIn(action, [0, 1])
+
+        actions, infos = agent.eval_step_batch(states)
+        self.assertEqual(len(actions), 8)
+        self.assertEqual(len(infos), 8)
+
+    def test_reservoir_buffer(self):
+        buffer = ReservoirBuffer(10, state_shape=[1], num_actions=2, probs_dtype=np.float16)
+        with self.assertRaises(ValueError):
+            buffer.sample(1)
+
+        counts = np.zeros(100)
+        for _ in range(500):
+            buffer.clear()
+            for start in range(0, 100, 7):
+                stop = min(start + 7, 100)
+                states = np.arange(start, stop, dtype=np.float32).reshape(-1, 1)
+                buffer.add_many(states, np.tile([0.25, 0.75], (stop - start, 1)))
+            self.assertEqual(len(buffer), 10)
+            info_states, action_probs = buffer.sample(10)
+            self.assertEqual(len(set(info_states[:, 0])), 10)
+            self.assertEqual(action_probs.dtype, np.float16)
+            counts[info_states[:, 0].astype(int)] += 1
+
+        # Every transition of the stream is kept with probability 10 / 100
+        self.assertTrue(np.all(np.abs(counts / 500 - 0.1) < 0.07))
+        self.assertAlmostEqual(counts[:50].sum() / counts.sum(), 0.5, places=1)
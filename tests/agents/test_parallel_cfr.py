@@ -0,0 +1,54 @@
+import os
+import unittest
+import numpy as np
+
+import rlcard
+from rlcard.agents.parallel_cfr_agent import ParallelCFRAgent
+from rlcard.utils.exploitability import leduc_holdem_deals
+
+class TestParallelCFR(unittest.TestCase):
+
+    def test_train(self):
+        env = rlcard.make('leduc-holdem', config={'allow_step_back':True})
+        deals = leduc_holdem_deals(env)[::10]
+        for variant in ['vanilla', 'cfr+']:
+            regrets = []
+            for num_workers in [1, 3]:
+                with ParallelCFRAgent(env, model_path='experiments/parallel_cfr_model', variant=variant, num_workers=num_workers, deals=deals) as agent:
+                    agent.train()
+                    regrets.append(agent.table.regrets[:len(agent.table)].copy())
+                    agent.train()
+                    self.assertEqual(agent.iteration, 2)
+                    self.assertTrue(np.allclose(agent.table.policy[:len(agent.table)].sum(axis=1), 1))
+
+                    state = {'obs': np.array([1., 1., 0., 0., 0., 0.]), 'legal_actions': {0: None,2: None}, 'raw_legal_actions': ['call', 'fold']}
+                    action, _ = agent.eval_step(state)
+                    self.assertIn(action, [0, 2])
+
+            # The updates do not depend on the number of workers
+            self.assertTrue(np.allclose(regrets[0], regrets[1]))
+
+    def test_unknown_deals(self):
+        env = rlcard.make('limit-holdem', config={'allow_step_back':True})
+        with self.assertRaises(ValueError):
+            ParallelCFRAgent(env)
+
+    def test_dead_worker(self):
+        env = rlcard.make('leduc-holdem', config={'allow_step_back':True})
+        prob, set_deal = leduc_holdem_deals(env)[0]
+        master = os.getpid()
+
+        def exit_in_worker(env):
+            # Kill the worker, as a signal or the OOM killer would
+            if os.getpid() != master:
+                os._exit(1)
+            set_deal(env)
+
+        agent = ParallelCFRAgent(env, model_path='experiments/parallel_cfr_model', num_workers=2,
+                                 deals=[(prob, exit_in_worker)] * 2, poll_interval=0.1)
+        with self.assertRaises(RuntimeError):
+            agent.train()
+        self.assertEqual(agent._workers, [])
+
+if __name__ == '__main__':
+    unittest.main()
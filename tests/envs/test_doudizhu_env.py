@@ -72,5 +72,43 @@ class TestDoudizhuEnv(unittest.TestCase):
         env = rlcard.make('doudizhu')
         _, player_id = env.reset()
         self.assertEqual(player_id, env.get_perfect_information()['current_player'])
+
+    def test_get_action_feature_table(self):
+        env = rlcard.make('doudizhu')
+        table = env.get_action_feature_table()
+        self.assertEqual(table.shape, (env.num_actions, 54))
+        state, _ = env.reset()
+        for action, feature in state['legal_actions'].items():
+            self.assertTrue((table[action] == feature).all())
+            self.assertTrue((table[action] == env.get_action_feature(action)).all())
+    def test_extract_state_incremental(self):
+        env = rlcard.make('doudizhu', config={'allow_step_back': True, 'seed': 0})
+        state, _ = env.reset()
+        action = max(state['legal_actions'], key=lambda action: env.get_action_feature(action).sum())
+        state, _ = env.step(action)
+        # The last action and the last of the 9 actions of the peasant
+        self.assertTrue((state['obs'][108:162] == env.get_action_feature(action)).all())
+        self.assertTrue((state['obs'][594:648] == env.get_action_feature(action)).all())
+        self.assertEqual(state['obs'][162:594].sum(), 0)
+
+        observations = []
+        while not env.is_over() and len(observations) < 20:
+            observations.append(state['obs'])
+            state, _ = env.step(sorted(state['legal_actions'])[0])
+        while observations:
+            state, _ = env.step_back()
+            self.assertTrue((state['obs'] == observations.pop()).all())
+
+        # A new game is encoded from scratch
+        env.seed(1)
+        state, _ = env.reset()
+        other_env = rlcard.make('doudizhu', config={'seed': 1})
+        other_state, _ = other_env.reset()
+        for _ in range(3):
+            self.assertTrue((state['obs'] == other_state['obs']).all())
+            action = sorted(state['legal_actions'])[0]
+            state, _ = env.step(action)
+            other_state, _ = other_env.step(action)
+
 if __name__ == '__main__':
     unittest.main()
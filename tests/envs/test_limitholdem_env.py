@@ -1,7 +1,12 @@
+import os
+import tempfile
 import unittest
 
+import numpy as np
+
 import rlcard
 from rlcard.agents.random_agent import RandomAgent
+from rlcard.games.limitholdem.abstraction import CardAbstraction, get_bucket_boundaries
 from .determism_util import is_deterministic
 
 
@@ -79,5 +84,42 @@ class TestLimitholdemEnv(unittest.TestCase):
         num_players = env.game.get_num_players()
         self.assertEqual(num_players, 5)
 
+    def test_isomorphic_abstraction(self):
+        env = rlcard.make('limit-holdem', config={'card_abstraction': 'isomorphic', 'seed': 0})
+        self.assertEqual(env.state_shape, [[72], [72]])
+        # The 1326 hole cards are 169 hands up to the suits
+        infosets = set()
+        for _ in range(3000):
+            state, _ = env.reset()
+            self.assertEqual(state['obs'][:52].sum(), 2)
+            infosets.add(state['obs'].tobytes())
+        self.assertLessEqual(len(infosets), 169)
+        abstraction = env.card_abstraction
+        self.assertEqual(abstraction.get_card_indices(['SA', 'HK'], ['D7', 'S2', 'C2']),
+                         abstraction.get_card_indices(['DK', 'CA'], ['H2', 'S7', 'C2']))
+
+    def test_bucket_abstraction(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'buckets.npz')
+            abstraction = CardAbstraction('bucket', num_buckets=4, bucket_path=path, num_samples=200)
+            self.assertEqual(abstraction.boundaries.shape, (4, 3))
+            self.assertTrue(os.path.isfile(path))
+            self.assertTrue((CardAbstraction('bucket', num_buckets=4, bucket_path=path, num_samples=200).boundaries == abstraction.boundaries).all())
+            # The boundaries are computed again with other parameters
+            boundaries = get_bucket_boundaries(4, path=path, num_deals=50, num_samples=100)
+            self.assertFalse((boundaries == abstraction.boundaries).all())
+            self.assertTrue((get_bucket_boundaries(4, path=path, num_deals=50, num_samples=100) == boundaries).all())
+        self.assertEqual(abstraction.get_buckets(['SA', 'HA'], ['D7', 'C2', 'S9', 'ST']), [3, 3, 3])
+        self.assertEqual(abstraction.get_buckets(['S7', 'H2'], [])[0], 0)
+
+        env = rlcard.make('limit-holdem', config={'card_abstraction': abstraction, 'allow_step_back': True})
+        self.assertEqual(env.state_shape, [[36], [36]])
+        state, _ = env.reset()
+        self.assertEqual(state['obs'][:16].sum(), 1)
+        while env.game.round_counter == 0 and not env.is_over():
+            state, _ = env.step(np.random.choice(list(state['legal_actions'])))
+        if not env.is_over():
+            self.assertEqual(state['obs'][:16].sum(), 2)
+
 if __name__ == '__main__':
     unittest.main()
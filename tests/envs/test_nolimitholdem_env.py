@@ -87,5 +87,14 @@ class TestNolimitholdemEnv(unittest.TestCase):
             chips.append(players[i].remained_chips + players[i].in_chips)
         self.assertEqual(chips, [100, 100, 100, 100, 100])
 
+    def test_isomorphic_abstraction(self):
+        env = rlcard.make('no-limit-holdem', config={'card_abstraction': 'isomorphic'})
+        self.assertEqual(env.state_shape, [[54], [54]])
+        state, _ = env.reset()
+        hand = state['raw_obs']['hand']
+        self.assertEqual(state['obs'][:52].sum(), 2)
+        self.assertEqual(list(state['obs'][:52].nonzero()[0]), env.card_abstraction.get_card_indices(hand, []))
+        self.assertEqual(state['obs'][52], state['raw_obs']['my_chips'])
+
 if __name__ == '__main__':
     unittest.main()
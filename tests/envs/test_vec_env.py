@@ -0,0 +1,64 @@
+import unittest
+import torch
+import numpy as np
+
+import rlcard
+from rlcard.envs import VecEnv
+from rlcard.agents.random_agent import RandomAgent
+from rlcard.agents.dqn_agent import DQNAgent
+from rlcard.utils.utils import tournament
+
+
+class TestVecEnv(unittest.TestCase):
+
+    def test_init(self):
+        env = VecEnv('leduc-holdem', 4, config={'seed': 0})
+        self.assertEqual(len(env.envs), 4)
+        self.assertEqual(env.num_players, 2)
+        self.assertEqual(env.num_actions, rlcard.make('leduc-holdem').num_actions)
+
+    def test_from_envs(self):
+        envs = [rlcard.make('leduc-holdem', config={'seed': i}) for i in range(3)]
+        env = VecEnv.from_envs(envs)
+        self.assertEqual(env.num_envs, 3)
+        self.assertEqual(env.env_id, 'leduc-holdem')
+        env.set_agents([RandomAgent(env.num_actions) for _ in range(env.num_players)])
+        trajectories, payoffs = env.run(is_training=True)
+        self.assertEqual(len(trajectories), 3)
+
+    def test_run(self):
+        env = VecEnv('leduc-holdem', 8, config={'seed': 0})
+        env.set_agents([RandomAgent(env.num_actions) for _ in range(env.num_players)])
+        trajectories, payoffs = env.run(is_training=True)
+        self.assertEqual(len(trajectories), 8)
+        self.assertEqual(len(payoffs), 8)
+        for _trajectories, _payoffs in zip(trajectories, payoffs):
+            self.assertEqual(len(_trajectories), 2)
+            self.assertEqual(sum(_payoffs), 0)
+            for trajectory in _trajectories:
+                self.assertEqual(len(trajectory) % 2, 1)
+
+    def test_run_batched_agent(self):
+        env = VecEnv('leduc-holdem', 16, config={'seed': 0})
+        agent = DQNAgent(num_actions=env.num_actions,
+                         state_shape=env.state_shape[0],
+                         mlp_layers=[10, 10],
+                         device=torch.device('cpu'))
+        env.set_agents([agent, agent])
+        for is_training in [True, False]:
+            trajectories, _ = env.run(is_training=is_training)
+            for _trajectories in trajectories:
+                for trajectory in _trajectories:
+                    for action in trajectory[1::2]:
+                        self.assertLess(action, env.num_actions)
+
+    def test_tournament(self):
+        env = VecEnv('leduc-holdem', 4)
+        env.set_agents([RandomAgent(env.num_actions) for _ in range(env.num_players)])
+        payoffs = tournament(env, 100)
+        self.assertEqual(len(payoffs), 2)
+        self.assertAlmostEqual(sum(payoffs), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 import numpy as np
 import functools
@@ -5,7 +7,10 @@ import functools
 from rlcard.games.doudizhu.game import DoudizhuGame as Game
 from rlcard.games.doudizhu.utils import get_landlord_score, encode_cards
 from rlcard.games.doudizhu.utils import doudizhu_sort_str
+from rlcard.games.doudizhu.utils import get_gt_cards, cards2counts, counts2str, contains_cards, CARD_TYPE
+from rlcard.games.doudizhu.utils import cards2str
 from rlcard.games.doudizhu.judger import DoudizhuJudger as Judger
+from rlcard.games.base import Card
 
 
 class TestDoudizhuGame(unittest.TestCase):
@@ -137,6 +142,72 @@ class TestDoudizhuGame(unittest.TestCase):
         self.assertEqual(plane[1][13], 1)
         self.assertEqual(plane[1][14], 1)
 
+    def test_cards2counts(self):
+        counts = cards2counts('3336TTBR')
+        self.assertEqual(list(counts[[0, 3, 7, 13, 14]]), [3, 1, 2, 1, 1])
+        self.assertEqual(counts.sum(), 8)
+
+    def test_counts2str(self):
+        self.assertEqual(counts2str(cards2counts('3336TTBR')), '3336TTBR')
+        self.assertEqual(counts2str(cards2counts('')), '')
+
+    def test_hand_counts(self):
+        game = Game(allow_step_back=True)
+        state, player_id = game.init_game()
+        player = game.players[player_id]
+        hand_counts = player.hand_counts.copy()
+        self.assertEqual(state['current_hand'], cards2str(player.current_hand))
+        self.assertEqual(player.hand_counts.sum(), 20)
+        action = sorted(state['actions'], key=len)[-1]
+        game.step(action)
+        self.assertTrue((player.hand_counts == hand_counts - cards2counts(action)).all())
+        self.assertEqual(player.current_hand_str, cards2str(player.current_hand))
+        game.step_back()
+        self.assertTrue((player.hand_counts == hand_counts).all())
+        self.assertEqual(player.current_hand_str, state['current_hand'])
+
+    def test_get_gt_cards(self):
+        game = Game()
+        game.init_game()
+        player = game.players[0]
+        greater_player = game.players[1]
+        hand = '3456789TTTJJQQQKA2R'
+        player.set_current_hand([Card('RJ', '') if card == 'R' else Card('S', card) for card in hand])
+        for target in ['5', '66', '9TTT', '34567', '5555', 'BR']:
+            greater_player.played_cards = target
+            gt_cards = get_gt_cards(player, greater_player)
+            self.assertEqual(gt_cards[0], 'pass')
+            self.assertEqual(len(gt_cards), len(set(gt_cards)))
+            target_type, target_weight = CARD_TYPE[0][target][0]
+            for cards in gt_cards[1:]:
+                self.assertTrue(contains_cards(hand, cards))
+                types = dict(CARD_TYPE[0][cards])
+                self.assertTrue(int(types.get(target_type, -1)) > int(target_weight) or 'bomb' in types or 'rocket' in types)
+        self.assertEqual(get_gt_cards(player, greater_player), ['pass'])
+        greater_player.played_cards = '5'
+        self.assertIn('2', get_gt_cards(player, greater_player))
+        self.assertIn('R', get_gt_cards(player, greater_player))
+        self.assertNotIn('4', get_gt_cards(player, greater_player))
+
+    def test_playable_cards_from_counts(self):
+        hand = '33345667788TJQKKA2R'
+        playable_cards = Judger.playable_cards_from_counts(cards2counts(hand))
+        self.assertEqual(set(playable_cards), Judger.playable_cards_from_hand(hand))
+        self.assertIs(Judger.playable_cards_from_counts(cards2counts(hand)), playable_cards)
+
+    def test_playable_cards_table(self):
+        hands = ['33345667788TJQKKA2R', '4445566789TJJQKAA']
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'playable_cards.npy')
+            Judger.save_playable_cards_table(path, hands)
+            Judger.load_playable_cards_table(path)
+            try:
+                for hand in hands:
+                    self.assertEqual(set(Judger.playable_cards_from_counts(cards2counts(hand))), Judger.playable_cards_from_hand(hand))
+                self.assertEqual(Judger.playable_cards_from_counts(cards2counts('3')), ('3',))
+            finally:
+                Judger.load_playable_cards_table(None)
+
     def test_judge_payoffs(self):
         payoffs = Judger.judge_payoffs(0, 0)
         self.assertEqual(payoffs[0], 1)
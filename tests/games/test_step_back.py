@@ -0,0 +1,86 @@
+import unittest
+from copy import deepcopy
+from enum import Enum
+
+import numpy as np
+
+import rlcard
+
+GAMES = [
+    ('limit-holdem', {}),
+    ('limit-holdem', {'game_num_players': 3}),
+    ('no-limit-holdem', {}),
+    ('no-limit-holdem', {'game_num_players': 3}),
+    ('uno', {}),
+    ('mahjong', {}),
+    ('blackjack', {}),
+    ('blackjack', {'game_num_players': 3}),
+    ('wizard', {}),
+]
+
+
+def snapshot(obj):
+    ''' Convert the state of a game into nested built-in values that
+        can be compared. The step back log is skipped.
+    '''
+    if isinstance(obj, np.random.RandomState):
+        return snapshot(obj.get_state())
+    if obj is None or isinstance(obj, (bool, int, float, str, Enum, np.generic)):
+        return obj
+    if isinstance(obj, np.ndarray):
+        return ('ndarray', obj.tolist())
+    if isinstance(obj, (list, tuple)):
+        return (type(obj).__name__, [snapshot(o) for o in obj])
+    if isinstance(obj, dict):
+        return ('dict', [(snapshot(k), snapshot(v)) for k, v in obj.items()])
+    return (type(obj).__name__, [(k, snapshot(v)) for k, v in sorted(vars(obj).items())
+                                 if k != 'history'])
+
+
+class TestStepBack(unittest.TestCase):
+
+    def _check_game(self, env_id, config, num_games, seed):
+        config = dict(config, allow_step_back=True, seed=seed)
+        env = rlcard.make(env_id, config=config)
+        np.random.seed(seed)
+        for _ in range(num_games):
+            state, _ = env.reset()
+            root = deepcopy(env.game)
+            path = []
+            # Some games update their attributes in `is_over`
+            while not env.is_over():
+                path.append(snapshot(env.game))
+                # Every legal action is undone to exactly the state before it,
+                # and replaying it gives the same state as a copy of the game
+                for action in state['legal_actions']:
+                    reference = deepcopy(env)
+                    reference.step(action)
+                    reference.is_over()
+                    env.step(action)
+                    env.step_back()
+                    env.is_over()
+                    self.assertEqual(snapshot(env.game), path[-1], env_id)
+                    env.step(action)
+                    env.is_over()
+                    self.assertEqual(snapshot(env.game), snapshot(reference.game), env_id)
+                    env.step_back()
+                    env.is_over()
+                action = np.random.choice(list(state['legal_actions'].keys()))
+                state, _ = env.step(action)
+
+            # Undo the whole game down to the root
+            while path:
+                env.step_back()
+                env.is_over()
+                self.assertEqual(snapshot(env.game), path.pop(), env_id)
+            root.is_over()
+            self.assertEqual(snapshot(env.game), snapshot(root), env_id)
+            self.assertFalse(env.game.step_back())
+
+    def test_step_back(self):
+        for env_id, config in GAMES:
+            self._check_game(env_id, config, num_games=5, seed=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
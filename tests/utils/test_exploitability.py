@@ -0,0 +1,49 @@
+import unittest
+import numpy as np
+
+import rlcard
+from rlcard.agents import CFRAgent, RandomAgent
+from rlcard.utils.exploitability import GameTree, nash_conv, exploitability, _trees
+
+class TestExploitability(unittest.TestCase):
+
+    def test_game_tree(self):
+        env = rlcard.make('leduc-holdem', config={'allow_step_back':True, 'seed':0})
+        tree = GameTree(env)
+        self.assertEqual(len(tree.roots), 240)
+        self.assertAlmostEqual(tree.root_probs.sum(), 1)
+        self.assertEqual(env.timestep, 0)
+
+        agent = RandomAgent(num_actions=env.num_actions)
+        policy = tree.policy([agent, agent])
+        self.assertTrue(np.allclose(policy.sum(axis=1), 1))
+
+        values = tree.values(policy)
+        br_values = tree.best_response_values(policy)
+        self.assertAlmostEqual(values.sum(), 0)
+        self.assertTrue(np.all(br_values >= values))
+        self.assertAlmostEqual(tree.nash_conv([agent, agent]), np.sum(br_values - values))
+        self.assertAlmostEqual(tree.exploitability([agent, agent]), np.sum(br_values - values) / 2)
+
+    def test_cfr(self):
+        env = rlcard.make('leduc-holdem', config={'allow_step_back':True, 'seed':0})
+        agent = CFRAgent(env, model_path='experiments/cfr_model')
+        random_agent = RandomAgent(num_actions=env.num_actions)
+
+        random_nash_conv = nash_conv(env, random_agent)
+        for _ in range(50):
+            agent.train()
+        self.assertLess(nash_conv(env, agent), random_nash_conv)
+        self.assertAlmostEqual(exploitability(env, [agent, agent]), nash_conv(env, agent) / 2)
+        self.assertEqual(len(_trees), 1)
+
+    def test_unsupported(self):
+        env = rlcard.make('leduc-holdem')
+        with self.assertRaises(ValueError):
+            GameTree(env)
+        env = rlcard.make('limit-holdem', config={'allow_step_back':True})
+        with self.assertRaises(ValueError):
+            GameTree(env)
+
+if __name__ == '__main__':
+    unittest.main()
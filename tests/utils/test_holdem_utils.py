@@ -4,6 +4,8 @@ import unittest
 from rlcard.games.limitholdem.judger import LimitHoldemJudger
 from rlcard.games.limitholdem.utils import compare_hands
 from rlcard.games.limitholdem.utils import Hand as Hand
+from rlcard.games.limitholdem.evaluator import evaluate_hand, evaluate_hands, get_hand_category
+from rlcard.games.limitholdem.equity import calc_equity, canonicalize
 import numpy as np
 ''' Combinations selected for testing compare_hands function
 Royal straight flush ['CJ', 'CT', 'CQ', 'CK', 'C9', 'C8', 'CA']
@@ -291,6 +293,82 @@ class TestHoldemUtils(unittest.TestCase):
                                 ])
         self.assertEqual(winner, [0, 0, 1, 1])
 
+    def test_evaluate_hand(self):
+        hands = [['CJ', 'CT', 'CQ', 'CK', 'C9', 'C8', 'CA'],  # straight flush
+                 ['CJ', 'SJ', 'HJ', 'DJ', 'C9', 'C8', 'C7'],  # four of a kind
+                 ['CJ', 'SJ', 'HJ', 'D9', 'C9', 'S9', 'C7'],  # full house
+                 ['CA', 'CQ', 'CT', 'C8', 'C6', 'C4', 'H2'],  # flush
+                 ['CJ', 'ST', 'HQ', 'DK', 'D9', 'C8', 'C7'],  # straight
+                 ['CJ', 'SJ', 'HJ', 'D9', 'C2', 'C7', 'C4'],  # three of a kind
+                 ['CJ', 'SJ', 'H9', 'D9', 'C2', 'C8', 'C7'],  # two pairs
+                 ['CJ', 'SJ', 'H9', 'D3', 'C2', 'C8', 'C7'],  # one pair
+                 ['CJ', 'S5', 'H9', 'D4', 'C2', 'C8', 'C7']]  # high card
+        values = [evaluate_hand(hand) for hand in hands]
+        self.assertEqual(values, sorted(values, reverse=True))
+        self.assertEqual([get_hand_category(value) for value in values], list(range(9, 0, -1)))
+        for hand, value in zip(hands, values):
+            h = Hand(hand)
+            h.evaluateHand()
+            self.assertEqual(get_hand_category(value), h.category)
+
+        # The wheel is the lowest straight, and the kickers break the ties
+        self.assertLess(evaluate_hand(['SA', 'H2', 'D3', 'C4', 'S5', 'HK', 'DK']), evaluate_hand(['S2', 'H3', 'D4', 'C5', 'S6', 'HK', 'DQ']))
+        self.assertLess(evaluate_hand(['SJ', 'HJ', 'D9', 'C3', 'S2', 'H5', 'D7']), evaluate_hand(['SJ', 'HJ', 'D9', 'C3', 'S2', 'H5', 'DT']))
+        self.assertEqual(evaluate_hand(['SJ', 'HJ', 'D9', 'C3', 'S2', 'H5', 'D7']), evaluate_hand(['SJ', 'HJ', 'D9', 'C3', 'S4', 'H5', 'D7']))
+
+    def test_evaluate_hands(self):
+        deck = ['SA', 'S2', 'S3', 'S4', 'S5', 'S6', 'S7', 'S8', 'S9', 'ST', 'SJ', 'SQ', 'SK',
+                'HA', 'H2', 'H3', 'H4', 'H5', 'H6', 'H7', 'H8', 'H9', 'HT', 'HJ', 'HQ', 'HK',
+                'DA', 'D2', 'D3', 'D4', 'D5', 'D6', 'D7', 'D8', 'D9', 'DT', 'DJ', 'DQ', 'DK',
+                'CA', 'C2', 'C3', 'C4', 'C5', 'C6', 'C7', 'C8', 'C9', 'CT', 'CJ', 'CQ', 'CK']
+        np_random = np.random.RandomState(0)
+        cards = np.array([np_random.choice(52, 7, replace=False) for _ in range(500)])
+        cards[0] = [0, 9, 10, 11, 12, 20, 30]  # a royal flush
+        values = evaluate_hands(cards)
+        for row, value in zip(cards, values):
+            self.assertEqual(value, evaluate_hand(list(row)))
+            self.assertEqual(value, evaluate_hand([deck[card] for card in row]))
+        self.assertEqual(get_hand_category(values[0]), 9)
+        self.assertTrue((evaluate_hands(cards.reshape(5, 100, 7)) == values.reshape(5, 100)).all())
+        self.assertTrue((evaluate_hands(cards[:, :5]) == [evaluate_hand(list(row[:5])) for row in cards]).all())
+
+    def test_canonicalize(self):
+        self.assertEqual(canonicalize(['SA', 'HK'], ['D7', 'S2']), canonicalize(['CK', 'DA'], ['D2', 'H7']))
+        self.assertNotEqual(canonicalize(['SA', 'HK'], ['D7', 'S2']), canonicalize(['SA', 'HK'], ['D7', 'H2']))
+        self.assertEqual(canonicalize(['SA', 'HA']), canonicalize([39, 26]))
+        with self.assertRaises(ValueError):
+            canonicalize(['XA'])
+
+    def test_calc_equity(self):
+        # Exhaustive on the river, against all the hands of the opponent
+        hole_cards, board = ['SA', 'HK'], ['D7', 'C2', 'S9', 'ST', 'H3']
+        deck = [suit + rank for suit in 'SHDC' for rank in '23456789TJQKA']
+        rest = [card for card in deck if card not in hole_cards + board]
+        shares = []
+        for hand in itertools.combinations(rest, 2):
+            winners = compare_hands([hole_cards + board, list(hand) + board])
+            shares.append(winners[0] / sum(winners))
+        self.assertAlmostEqual(calc_equity(hole_cards, board), np.mean(shares))
+
+        # Monte Carlo on the turn, and with several processes
+        np.random.seed(0)
+        equity = calc_equity(hole_cards, board[:4])
+        self.assertAlmostEqual(calc_equity(hole_cards, board[:4], max_exhaustive=0, num_samples=200000), equity, delta=0.005)
+        self.assertAlmostEqual(calc_equity(hole_cards, board[:4], max_exhaustive=0, num_samples=20000, num_processes=2), equity, delta=0.02)
+        self.assertAlmostEqual(calc_equity(['SA', 'HA'], num_opponents=2, num_samples=200000), 0.735, delta=0.01)
+
+        # Against a range
+        opponent_range = [['HQ', 'DQ'], ['CJ', 'DJ'], ['SK', 'DK'], ['SA', 'DK']]
+        equity = calc_equity(['SA', 'HA'], ['D7', 'C2', 'S9'], opponent_range=opponent_range)
+        self.assertAlmostEqual(calc_equity(['SA', 'HA'], ['D7', 'C2', 'S9'], opponent_range=opponent_range, max_exhaustive=0), equity, delta=0.01)
+        with self.assertRaises(ValueError):
+            calc_equity(['SA', 'HA'], ['SA'])
+        # No two opponents can hold disjoint hands of the range
+        with self.assertRaises(ValueError):
+            calc_equity(['SA', 'HA'], [], 2, opponent_range=[['SK', 'HK']])
+        with self.assertRaises(ValueError):
+            calc_equity(['SA', 'HA'], ['D7', 'C2', 'S9', 'ST', 'H3'], 2, opponent_range=[['SK', 'HK']])
+
     def test_split_pots_among_players(self):
         j = LimitHoldemJudger(np.random.RandomState(seed=7))
 
@@ -0,0 +1,58 @@
+import os
+import unittest
+import torch
+import numpy as np
+
+from rlcard.agents.random_agent import RandomAgent
+from rlcard.agents.dqn_agent import DQNAgent
+from rlcard.utils.rollout_pool import RolloutPool
+
+
+class ExitAgent(RandomAgent):
+    ''' An agent that kills its process, as a signal or the OOM killer would
+    '''
+
+    def step(self, state):
+        os._exit(1)
+
+class TestRolloutPool(unittest.TestCase):
+
+    def test_run(self):
+        agents = [RandomAgent(4), RandomAgent(4)]
+        with RolloutPool('leduc-holdem', agents, 2, seed=0) as pool:
+            trajectories, payoffs = pool.run(11, is_training=True)
+        self.assertEqual(len(trajectories), 11)
+        self.assertEqual(len(payoffs), 11)
+        for _trajectories, _payoffs in zip(trajectories, payoffs):
+            self.assertEqual(len(_trajectories), 2)
+            self.assertEqual(sum(_payoffs), 0)
+
+    def test_is_deterministic(self):
+        agents = [RandomAgent(4), RandomAgent(4)]
+        results = []
+        for _ in range(2):
+            with RolloutPool('leduc-holdem', agents, 2, seed=42) as pool:
+                _, payoffs = pool.run(20)
+            results.append(np.array(payoffs))
+        self.assertTrue(np.array_equal(results[0], results[1]))
+
+    def test_shared_weights(self):
+        agent = DQNAgent(num_actions=4,
+                         state_shape=[36],
+                         mlp_layers=[10, 10],
+                         device=torch.device('cpu'))
+        with RolloutPool('leduc-holdem', [agent, RandomAgent(4)], 2, seed=0) as pool:
+            payoffs = pool.tournament(10)
+            self.assertEqual(len(payoffs), 2)
+            for p in agent.q_estimator.qnet.parameters():
+                self.assertTrue(p.is_shared())
+
+    def test_dead_worker(self):
+        agents = [ExitAgent(4), ExitAgent(4)]
+        pool = RolloutPool('leduc-holdem', agents, 2, seed=0, poll_interval=0.1)
+        with self.assertRaises(RuntimeError):
+            pool.run(4)
+        self.assertEqual(pool._workers, [])
+
+if __name__ == '__main__':
+    unittest.main()
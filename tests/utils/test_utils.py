@@ -1,6 +1,6 @@
 import unittest
 import numpy as np
-from rlcard.utils.utils import init_54_deck, init_standard_deck, rank2int, print_card, elegent_form, reorganize, tournament
+from rlcard.utils.utils import init_54_deck, init_standard_deck, rank2int, print_card, elegent_form, reorganize, reorganize_arrays, n_step_returns, tournament
 import rlcard
 from rlcard.agents.random_agent import RandomAgent
 
@@ -35,6 +35,37 @@ class TestUtils(unittest.TestCase):
         trajectories = reorganize([[[1,2],1,[4,5]]], [1])
         self.assertEqual(np.array(trajectories).shape, (1, 1, 5))
 
+    def test_reorganize_arrays(self):
+        trajectories = [[{'obs': np.array([0., 1.]), 'legal_actions': {0: None}}, 1,
+                         {'obs': np.array([2., 3.]), 'legal_actions': {0: None, 2: None}}, 0,
+                         {'obs': np.array([4., 5.]), 'legal_actions': {}}],
+                        [{'obs': np.array([6., 7.]), 'legal_actions': {1: None}}]]
+        (states, actions, rewards, next_states, legal_actions, dones), empty = reorganize_arrays(trajectories, [1, -1], 3)
+        self.assertTrue(np.array_equal(states, [[0., 1.], [2., 3.]]))
+        self.assertTrue(np.array_equal(actions, [1, 0]))
+        self.assertTrue(np.array_equal(rewards, [0, 1]))
+        self.assertTrue(np.array_equal(next_states, [[2., 3.], [4., 5.]]))
+        self.assertTrue(np.array_equal(legal_actions, [[True, False, True], [False, False, False]]))
+        self.assertTrue(np.array_equal(dones, [False, True]))
+        self.assertEqual(len(empty[0]), 0)
+
+        # Same transitions as reorganize
+        for transition, ts in zip(zip(states, actions, rewards, next_states, dones), reorganize(trajectories, [1, -1])[0]):
+            self.assertTrue(np.array_equal(transition[0], ts[0]['obs']))
+            self.assertEqual(list(transition[1:3]) + [transition[4]], [ts[1], ts[2], ts[4]])
+
+    def test_n_step_returns(self):
+        rewards = np.array([1., 0., 2., 0., 0., 3.])
+        dones = np.array([False, False, True, False, False, True])
+        returns, last = n_step_returns(rewards, dones, 2, 0.5)
+        self.assertTrue(np.allclose(returns, [1., 1., 2., 0., 1.5, 3.]))
+        self.assertTrue(np.array_equal(last, [1, 2, 2, 4, 5, 5]))
+        returns, last = n_step_returns(rewards, dones, 1, 0.5)
+        self.assertTrue(np.allclose(returns, rewards))
+        self.assertTrue(np.array_equal(last, np.arange(6)))
+        with self.assertRaises(ValueError):
+            n_step_returns(rewards[:-1], dones[:-1], 2, 0.5)
+
     def test_tournament(self):
         env = rlcard.make('leduc-holdem')
         env.set_agents([RandomAgent(env.num_actions), RandomAgent(env.num_actions)])